@@ -1,7 +1,9 @@
 """Base classes used by backend implementations."""
 
+from concurrent import futures
 from dataclasses import dataclass
-from typing import List
+from itertools import repeat
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
 
 
 @dataclass
@@ -11,6 +13,8 @@ class OcrWord:
     top: float
     width: float
     height: float
+    # Backend-specific recognition confidence, if available.
+    confidence: Optional[float] = None
 
 
 @dataclass
@@ -23,9 +27,262 @@ class OcrResult:
     lines: List[OcrLine]
 
 
+# Text, left, top, width, height and confidence of a word.
+WordRow = Tuple[str, float, float, float, float, Optional[float]]
+
+
+class ColumnarOcrResult(OcrResult):
+    """OcrResult stored as flat NumPy arrays, which is much more compact than
+    OcrWord objects for results with many words.
+
+    lines is built from the arrays on first access. Changes to it aren't
+    reflected in the arrays.
+    """
+
+    def __init__(
+        self,
+        text: str,
+        text_offsets,
+        boxes,
+        line_starts,
+        confidences=None,
+    ):
+        import numpy as np
+
+        # The texts of all words, concatenated. Word i is
+        # text[text_offsets[i]:text_offsets[i + 1]].
+        self.text = text
+        self.text_offsets = _integer_array(text_offsets)
+        # Array of shape (4, words): left, top, width and height. float32
+        # unless a float64 array is passed, e.g. when decoding dataclass results.
+        if not (isinstance(boxes, np.ndarray) and boxes.dtype == np.float64):
+            boxes = np.asarray(boxes, np.float32)
+        self.boxes = boxes.reshape(4, -1)
+        # Line i has words line_starts[i]:line_starts[i + 1].
+        self.line_starts = _integer_array(line_starts)
+        # float64, so that confidences read back exactly as the backend
+        # reported them.
+        self.confidences = (
+            None if confidences is None else np.asarray(confidences, np.float64)
+        )
+        self._lines: Optional[List[OcrLine]] = None
+
+    @classmethod
+    def from_rows(
+        cls, lines: Iterable[Sequence[WordRow]], has_confidences: bool = True
+    ) -> "ColumnarOcrResult":
+        """Return the result with lines of word tuples."""
+        line_starts = [0]
+        texts = []
+        columns: Tuple[List[Any], ...] = ([], [], [], [], [])
+        for line in lines:
+            for text, *values in line:
+                texts.append(text)
+                for column, value in zip(columns, values):
+                    column.append(value)
+            line_starts.append(len(texts))
+        text_offsets = [0]
+        for text in texts:
+            text_offsets.append(text_offsets[-1] + len(text))
+        return cls(
+            "".join(texts),
+            text_offsets,
+            columns[:4],
+            line_starts,
+            columns[4] if has_confidences else None,
+        )
+
+    @classmethod
+    def from_result(cls, result: OcrResult) -> "ColumnarOcrResult":
+        if isinstance(result, ColumnarOcrResult):
+            return result
+        return cls.from_rows(
+            [
+                [
+                    (
+                        word.text,
+                        word.left,
+                        word.top,
+                        word.width,
+                        word.height,
+                        word.confidence,
+                    )
+                    for word in line.words
+                ]
+                for line in result.lines
+            ],
+            has_confidences=all(
+                word.confidence is not None
+                for line in result.lines
+                for word in line.words
+            ),
+        )
+
+    @property
+    def lines(self) -> List[OcrLine]:
+        if self._lines is None:
+            offsets = self.text_offsets.tolist()
+            words = [
+                OcrWord(self.text[start:end], *values)
+                for start, end, *values in zip(
+                    offsets,
+                    offsets[1:],
+                    *self.boxes.tolist(),
+                    (
+                        repeat(None)
+                        if self.confidences is None
+                        else self.confidences.tolist()
+                    ),
+                )
+            ]
+            starts = self.line_starts.tolist()
+            self._lines = [
+                OcrLine(words[start:end]) for start, end in zip(starts, starts[1:])
+            ]
+        return self._lines
+
+    @property
+    def left(self):
+        return self.boxes[0]
+
+    @property
+    def top(self):
+        return self.boxes[1]
+
+    @property
+    def width(self):
+        return self.boxes[2]
+
+    @property
+    def height(self):
+        return self.boxes[3]
+
+    def line_rows(self) -> List[List[Tuple[str, float, float, float, float]]]:
+        """Return the text, left, top, width and height of each word, by line,
+        without building OcrWord views."""
+        offsets = self.text_offsets.tolist()
+        rows = [
+            (self.text[start:end], *box)
+            for start, end, box in zip(offsets, offsets[1:], self.boxes.T.tolist())
+        ]
+        starts = self.line_starts.tolist()
+        return [rows[start:end] for start, end in zip(starts, starts[1:])]
+
+    def sorted_lines(self) -> "ColumnarOcrResult":
+        """Return the result with lines sorted by the top and then left of their
+        first words. Lines must not be empty."""
+        import numpy as np
+
+        line_starts = self.line_starts[:-1]
+        order = np.lexsort((self.boxes[0, line_starts], self.boxes[1, line_starts]))
+        counts = np.diff(self.line_starts)[order]
+        new_line_starts = np.concatenate(([0], np.cumsum(counts)))
+        # Index of the original word at each new position.
+        words = np.arange(new_line_starts[-1]) + np.repeat(
+            line_starts[order] - new_line_starts[:-1], counts
+        )
+        offsets = self.text_offsets.tolist()
+        ends = self.line_starts[1:].tolist()
+        text = "".join(
+            self.text[offsets[start] : offsets[ends[line]]]
+            for line, start in zip(order.tolist(), line_starts[order].tolist())
+        )
+        text_lengths = np.diff(self.text_offsets)[words]
+        return ColumnarOcrResult(
+            text,
+            np.concatenate(([0], np.cumsum(text_lengths))),
+            self.boxes[:, words],
+            new_line_starts,
+            None if self.confidences is None else self.confidences[words],
+        )
+
+    def copy(self) -> "ColumnarOcrResult":
+        """Return a copy with its own coordinates, sharing the text and layout,
+        which are never modified."""
+        return ColumnarOcrResult(
+            self.text,
+            self.text_offsets,
+            self.boxes.copy(),
+            self.line_starts,
+            self.confidences,
+        )
+
+    def translate(self, x: float, y: float) -> None:
+        """Move all boxes by (x, y), in place."""
+        self.boxes[0] += x
+        self.boxes[1] += y
+        self._lines = None
+
+    def unscale(self, factor: float) -> None:
+        """Divide all coordinates by factor, in place, e.g. to undo resizing the
+        image by it."""
+        self.boxes /= factor
+        self._lines = None
+
+    def __eq__(self, other):
+        if isinstance(other, OcrResult):
+            return self.lines == other.lines
+        return NotImplemented
+
+    def __repr__(self):
+        return f"ColumnarOcrResult(lines={self.lines!r})"
+
+    def __getstate__(self):
+        # The views are rebuilt on demand.
+        return dict(self.__dict__, _lines=None)
+
+
+def _integer_array(values):
+    """Return values as an integer array, without copying integer arrays of any
+    size, e.g. views of an encoded result."""
+    import numpy as np
+
+    array = np.asarray(values)
+    if array.dtype.kind not in "iu":
+        array = array.astype(np.intp)
+    return array
+
+
 class OcrBackend:
     """Base class for backend used to perform OCR."""
 
+    # If True, Reader passes preprocessed images to run_ocr as NumPy arrays
+    # (height x width x channels, uint8) instead of PIL images.
+    accepts_arrays = False
+
     def run_ocr(self, image) -> OcrResult:
         """Return the OcrResult corresponding to the image."""
         raise NotImplementedError()
+
+    def run_ocr_batch(self, images: Sequence[Any]) -> List[OcrResult]:
+        """Return the OcrResult corresponding to each image.
+
+        By default, calls run_ocr on each image in turn. Backends override this if
+        they can recognize several images at once more efficiently.
+        """
+        return [self.run_ocr(image) for image in images]
+
+    def cache_key(self) -> Optional[str]:
+        """Return a string identifying the backend and all settings that affect
+        its results, which is the same in every process, or None if it can't be
+        identified. Results of backends that return None are not stored in
+        persistent caches.
+        """
+        return None
+
+    async def run_ocr_async(
+        self, image, executor: Optional[futures.Executor] = None
+    ) -> OcrResult:
+        """Return the OcrResult corresponding to the image without blocking the
+        event loop.
+
+        By default, runs run_ocr in the provided executor (or the event loop's
+        default executor if None). Backends override this if they can wait for
+        results natively.
+        """
+        # Imported here to keep import screen_ocr fast.
+        import asyncio
+
+        return await asyncio.get_running_loop().run_in_executor(
+            executor, self.run_ocr, image
+        )
@@ -0,0 +1,124 @@
+"""Parallel OCR of many images using a process pool."""
+
+import os
+from collections import deque
+from concurrent import futures
+from multiprocessing import shared_memory
+from typing import Any, Iterable, Iterator, Mapping, Tuple
+
+import numpy as np
+from PIL import Image
+
+from . import _base
+
+# Reader used by each worker process.
+_worker_reader = None
+
+
+class _SharedImage:
+    """Copy of an image's pixels in shared memory, owned by the parent process.
+
+    Supports PIL images, and NumPy arrays as normalized by Reader. For arrays,
+    mode is the dtype and size is the shape.
+    """
+
+    def __init__(self, image):
+        if isinstance(image, Image.Image):
+            data = image.tobytes()
+            self.mode = image.mode
+            self.size = image.size
+            self.is_array = False
+        else:
+            # Copied directly into shared memory if already contiguous.
+            data = np.ascontiguousarray(image).data.cast("B")
+            self.mode = image.dtype.str
+            self.size = image.shape
+            self.is_array = True
+        self.nbytes = len(data)
+        self._memory = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+        self._memory.buf[: len(data)] = data
+
+    @property
+    def descriptor(self) -> Tuple[str, str, Tuple[int, ...], int, bool]:
+        return self._memory.name, self.mode, self.size, self.nbytes, self.is_array
+
+    def close(self) -> None:
+        self._memory.close()
+        self._memory.unlink()
+
+
+def read_images(
+    images: Iterable[Any],
+    reader_args: Mapping[str, Any],
+    max_workers: int,
+    ordered: bool = True,
+) -> Iterator[Tuple[Any, _base.OcrResult]]:
+    """Yield (image, backend result) pairs, reading images in worker processes.
+
+    reader_args are passed to the Reader constructor in each worker and must be
+    picklable. At most a few images per worker are held in shared memory at once.
+    """
+    with futures.ProcessPoolExecutor(
+        max_workers, initializer=_init_worker, initargs=(reader_args,)
+    ) as executor:
+        pending = deque()
+        try:
+            for image in images:
+                shared_image = _SharedImage(image)
+                future = executor.submit(_read_shared_image, *shared_image.descriptor)
+                pending.append((image, shared_image, future))
+                if len(pending) >= 2 * max_workers:
+                    yield _next_result(pending, ordered)
+            while pending:
+                yield _next_result(pending, ordered)
+        finally:
+            for _, shared_image, future in pending:
+                future.cancel()
+                shared_image.close()
+
+
+def _next_result(pending: deque, ordered: bool) -> Tuple[Any, _base.OcrResult]:
+    if ordered:
+        entry = pending[0]
+    else:
+        done = futures.wait(
+            [future for _, _, future in pending],
+            return_when=futures.FIRST_COMPLETED,
+        ).done
+        entry = next(entry for entry in pending if entry[2] in done)
+    image, shared_image, future = entry
+    try:
+        result = future.result()
+    finally:
+        pending.remove(entry)
+        shared_image.close()
+    return image, result
+
+
+def _init_worker(reader_args: Mapping[str, Any]) -> None:
+    global _worker_reader
+    # Parallelism comes from the pool, so avoid oversubscribing cores with
+    # Tesseract's own OpenMP threads.
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+    from ._screen_ocr import Reader
+
+    _worker_reader = Reader(**reader_args)
+
+
+def _read_shared_image(
+    name: str, mode: str, size: Tuple[int, ...], nbytes: int, is_array: bool
+) -> _base.OcrResult:
+    memory = shared_memory.SharedMemory(name=name)
+    try:
+        if is_array:
+            # Read in place. The array must be released before closing.
+            array = np.ndarray(size, dtype=mode, buffer=memory.buf)
+            try:
+                return _worker_reader._run_ocr(array)
+            finally:
+                del array
+        with memory.buf[:nbytes] as data:
+            image = Image.frombytes(mode, size, data)
+    finally:
+        memory.close()
+    return _worker_reader._run_ocr(image)
@@ -0,0 +1,363 @@
+"""Caching of OCR results keyed on screenshot contents."""
+
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, NamedTuple, Optional, Tuple
+
+from . import _base, _serialization
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+class CacheKey(NamedTuple):
+    """Identifies a screenshot and the parameters used to OCR it."""
+
+    params: Hashable
+    mode: str
+    size: Tuple[int, int]
+    digest: bytes
+    # Perceptual hash, only computed when the cache has a tolerance.
+    average_hash: Optional[int]
+
+
+class ResultCache:
+    """LRU cache of backend results, keyed on screenshot pixels.
+
+    Results are stored before they are adjusted to screen coordinates, so the same
+    pixels read at a different offset still hit the cache.
+
+    Arguments:
+    max_entries: Maximum number of results to keep.
+    max_bytes: Approximate maximum memory used by cached results.
+    hash_tolerance: If nonzero, a screenshot whose average hash differs from a
+      cached screenshot of the same size by at most this many bits is treated as
+      identical. Useful for ignoring e.g. a blinking cursor.
+    hash_size: Width and height of the average hash.
+    """
+
+    # Whether entries outlive the process, so that keys must not depend on the
+    # identity of the backend object.
+    persistent = False
+
+    def __init__(
+        self,
+        max_entries: int = 64,
+        max_bytes: int = 16 * 1024 * 1024,
+        hash_tolerance: int = 0,
+        hash_size: int = 10,
+    ):
+        if hash_tolerance and not Image:
+            raise ValueError("hash_tolerance requires Pillow.")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hash_tolerance = hash_tolerance
+        self.hash_size = hash_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nbytes = 0
+        self._entries: "OrderedDict[CacheKey, Tuple[_base.OcrResult, int]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(self, image, params: Hashable) -> Optional[CacheKey]:
+        """Return the key for the image, or None if it cannot be cached."""
+        fingerprint = _fingerprint(image)
+        if not fingerprint:
+            return None
+        mode, size, data = fingerprint
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        average_hash = (
+            _average_hash(image, self.hash_size) if self.hash_tolerance else None
+        )
+        return CacheKey(params, mode, size, digest, average_hash)
+
+    def get(self, key: CacheKey) -> Optional[_base.OcrResult]:
+        """Return the cached result for the key, or None on a miss."""
+        with self._lock:
+            entry_key = key if key in self._entries else self._find_similar(key)
+            if entry_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(entry_key)
+            self.hits += 1
+            return self._entries[entry_key][0]
+
+    def put(self, key: CacheKey, result: _base.OcrResult) -> None:
+        """Store the result, evicting least recently used entries as needed."""
+        size = _result_size(result)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            self._entries[key] = (result, size)
+            self.nbytes += size
+            while len(self._entries) > self.max_entries or self.nbytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def _find_similar(self, key: CacheKey) -> Optional[CacheKey]:
+        if key.average_hash is None:
+            return None
+        # Search most recently used entries first.
+        for entry_key in reversed(self._entries):
+            if (
+                entry_key.params == key.params
+                and entry_key.mode == key.mode
+                and entry_key.size == key.size
+                and entry_key.average_hash is not None
+                and bin(entry_key.average_hash ^ key.average_hash).count("1")
+                <= self.hash_tolerance
+            ):
+                return entry_key
+        return None
+
+
+class PersistentCache:
+    """Cache of backend results in a SQLite database, so that results survive
+    restarts and are shared by processes on the same machine.
+
+    Has the same interface as ResultCache and is passed to Reader in the same way.
+    Keys include OcrBackend.cache_key, so results are only stored for backends
+    that implement it. The database uses write-ahead logging so that readers and
+    a writer in different processes don't block each other.
+
+    Arguments:
+    path: Path of the database file. Created if it doesn't exist.
+    max_entries: Maximum number of results to keep.
+    max_bytes: Approximate maximum size of the encoded results.
+    timeout: Seconds to wait for another process to release the database.
+    touch_interval: Minimum seconds between updates of an entry's last use time
+      on hits. Hits within the interval don't write to the database.
+    """
+
+    persistent = True
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 10000,
+        max_bytes: int = 256 * 1024 * 1024,
+        timeout: float = 5.0,
+        touch_interval: float = 60.0,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.touch_interval = touch_interval
+        # Counts for this instance only.
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # SQLite connections can only be used by the thread that created them.
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key BLOB PRIMARY KEY, result BLOB NOT NULL, "
+            "size INTEGER NOT NULL, last_used INTEGER NOT NULL)"
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)"
+        )
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT count(*) FROM results").fetchone()[0]
+
+    @property
+    def nbytes(self) -> int:
+        return int(
+            self._connection().execute("SELECT total(size) FROM results").fetchone()[0]
+        )
+
+    def key(self, image, params: Optional[Hashable]) -> Optional[CacheKey]:
+        """Return the key for the image, or None if it cannot be cached, e.g.
+        because params is None."""
+        if params is None:
+            return None
+        fingerprint = _fingerprint(image)
+        if not fingerprint:
+            return None
+        mode, size, data = fingerprint
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        return CacheKey(params, mode, size, digest, None)
+
+    def get(self, key: CacheKey) -> Optional[_base.OcrResult]:
+        """Return the cached result for the key, or None on a miss."""
+        import sqlite3
+
+        connection = self._connection()
+        database_key = _database_key(key)
+        result = None
+        try:
+            row = connection.execute(
+                "SELECT result, last_used FROM results WHERE key = ?",
+                (database_key,),
+            ).fetchone()
+            if row:
+                try:
+                    result = _serialization.decode_result(row[0])
+                except ValueError:
+                    # Written by an incompatible version.
+                    connection.execute(
+                        "DELETE FROM results WHERE key = ?", (database_key,)
+                    )
+                else:
+                    now = time.time_ns()
+                    # Writes take the database lock, so recency is only
+                    # refreshed occasionally.
+                    if now - row[1] > self.touch_interval * 1e9:
+                        connection.execute(
+                            "UPDATE results SET last_used = ? WHERE key = ?",
+                            (now, database_key),
+                        )
+        except sqlite3.OperationalError:
+            # E.g. another process held a lock for longer than the timeout. The
+            # result is simply recomputed.
+            pass
+        with self._stats_lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def put(self, key: CacheKey, result: _base.OcrResult) -> None:
+        """Store the result, evicting least recently used entries as needed."""
+        import sqlite3
+
+        data = _serialization.encode_result(result)
+        if len(data) > self.max_bytes:
+            return
+        connection = self._connection()
+        database_key = _database_key(key)
+        try:
+            with connection:
+                # Take the write lock up front so that the size check and
+                # eviction see a consistent database.
+                connection.execute("BEGIN IMMEDIATE")
+                connection.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                    (database_key, data, len(data), time.time_ns()),
+                )
+                evicted = self._evict(connection, database_key)
+        except sqlite3.OperationalError:
+            return
+        with self._stats_lock:
+            self.evictions += evicted
+
+    def clear(self) -> None:
+        with self._connection() as connection:
+            connection.execute("DELETE FROM results")
+
+    def close(self) -> None:
+        """Close the connection of the calling thread."""
+        connection = getattr(self._local, "connection", None)
+        if connection:
+            connection.close()
+            self._local.connection = None
+
+    def _evict(self, connection, kept_key: bytes) -> int:
+        """Delete least recently used entries other than kept_key until the
+        cache is within its limits, and return the number deleted."""
+        entries, nbytes = connection.execute(
+            "SELECT count(*), total(size) FROM results"
+        ).fetchone()
+        evicted = []
+        if entries > self.max_entries or nbytes > self.max_bytes:
+            for key, size in connection.execute(
+                "SELECT key, size FROM results WHERE key != ? ORDER BY last_used",
+                (kept_key,),
+            ):
+                if entries <= self.max_entries and nbytes <= self.max_bytes:
+                    break
+                evicted.append((key,))
+                entries -= 1
+                nbytes -= size
+            connection.executemany("DELETE FROM results WHERE key = ?", evicted)
+        return len(evicted)
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Imported here to keep import screen_ocr fast.
+            import sqlite3
+
+            # Transactions are managed explicitly.
+            connection = sqlite3.connect(
+                self.path, timeout=self.timeout, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            # Durable enough for a cache, and much faster than FULL with WAL.
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+
+def _database_key(key: CacheKey) -> bytes:
+    """Return a digest of the key, which must not depend on the process."""
+    description = repr((key.params, key.mode, key.size)).encode("utf-8")
+    return hashlib.blake2b(description + key.digest, digest_size=20).digest()
+
+
+def _fingerprint(image) -> Optional[Tuple[str, Tuple[int, int], Any]]:
+    # Pillow images and NumPy arrays are supported; Talon images are not cached.
+    if Image and isinstance(image, Image.Image):
+        return image.mode, image.size, image.tobytes()
+    # An array can only exist if NumPy was imported.
+    np = sys.modules.get("numpy")
+    if np and isinstance(image, np.ndarray):
+        # Hashed in place if already contiguous.
+        data = np.ascontiguousarray(image).data
+        return f"{image.dtype.str}{image.shape[2:]}", image.shape[1::-1], data
+    return None
+
+
+def _average_hash(image, hash_size: int) -> int:
+    """Same algorithm as imagehash.average_hash, packed into an int."""
+    if not isinstance(image, Image.Image):
+        image = Image.fromarray(image)
+    small = image.convert("L").resize((hash_size, hash_size), Image.Resampling.LANCZOS)
+    pixels = small.tobytes()
+    mean = sum(pixels) / len(pixels)
+    bits = 0
+    for pixel in pixels:
+        bits = (bits << 1) | (pixel > mean)
+    return bits
+
+
+def _result_size(result: _base.OcrResult) -> int:
+    """Approximate memory used by the result."""
+    if isinstance(result, _base.ColumnarOcrResult):
+        size = sys.getsizeof(result) + sys.getsizeof(result.text)
+        for array in (result.text_offsets, result.boxes, result.line_starts):
+            size += array.nbytes
+        if result.confidences is not None:
+            size += result.confidences.nbytes
+        return size
+    size = sys.getsizeof(result) + sys.getsizeof(result.lines)
+    for line in result.lines:
+        size += sys.getsizeof(line) + sys.getsizeof(line.words)
+        for word in line.words:
+            # Object, text, and four coordinates.
+            size += sys.getsizeof(word) + sys.getsizeof(word.text) + 4 * 24
+    return size
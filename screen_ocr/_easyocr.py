@@ -1,3 +1,5 @@
+from typing import Optional
+
 import easyocr
 import numpy as np
 
@@ -5,11 +7,56 @@ from . import _base
 
 
 class EasyOcrBackend(_base.OcrBackend):
-    def __init__(self):
+    accepts_arrays = True
+
+    def __init__(
+        self,
+        threads: Optional[int] = None,
+        batch_size: int = 1,
+        canvas_size: int = 2560,
+    ):
+        if threads:
+            # Applies to the whole process; torch is otherwise free to use every
+            # core, which oversubscribes the CPU alongside other work.
+            import torch
+
+            torch.set_num_threads(threads)
+        self.batch_size = batch_size
+        # Images larger than this are downscaled by the text detector.
+        self.canvas_size = canvas_size
         self._easyocr = easyocr.Reader(["en"])
 
+    def cache_key(self):
+        # Batch size only affects speed.
+        return repr(("easyocr", easyocr.__version__, self.canvas_size))
+
     def run_ocr(self, image):
-        result = self._easyocr.readtext(np.array(image))
+        result = self._easyocr.readtext(
+            np.asarray(image),
+            batch_size=self.batch_size,
+            canvas_size=self.canvas_size,
+        )
+        return self._convert_result(result)
+
+    def run_ocr_batch(self, images):
+        # readtext_batched requires images of the same shape, so group by shape.
+        arrays = [np.asarray(image) for image in images]
+        groups = {}
+        for index, array in enumerate(arrays):
+            groups.setdefault(array.shape, []).append(index)
+        results = [None] * len(arrays)
+        for indices in groups.values():
+            batch_results = self._easyocr.readtext_batched(
+                [arrays[index] for index in indices],
+                batch_size=self.batch_size,
+                canvas_size=self.canvas_size,
+            )
+            for index, result in zip(indices, batch_results):
+                results[index] = self._convert_result(result)
+        return results
+
+    @staticmethod
+    def _convert_result(result) -> _base.OcrResult:
         lines = [
             _base.OcrLine(
                 [
@@ -0,0 +1,396 @@
+"""Incremental OCR that only re-reads the parts of an image that changed."""
+
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from PIL import Image, ImageChops
+
+from . import _base
+
+# Represented as [left, top, right, bottom] pixel coordinates
+BoundingBox = Tuple[int, int, int, int]
+
+
+@dataclass
+class _Tile:
+    # Region whose words are owned by this tile.
+    cell: BoundingBox
+    # Region actually OCR'd, which overlaps neighboring tiles.
+    crop: BoundingBox
+    # Words owned by this tile, in image coordinates.
+    lines: List[_base.OcrLine]
+
+
+@dataclass
+class _Frame:
+    image: Image.Image
+    tiles: List[_Tile]
+
+
+class TiledReader:
+    """Splits images into overlapping tiles and only re-reads tiles that changed.
+
+    A frame is remembered for each distinct image size, so alternating between
+    e.g. full screen and nearby reads doesn't discard state.
+    """
+
+    def __init__(self, tile_size: int, overlap: int, max_frames: int = 4):
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.max_frames = max_frames
+        self.tiles_read = 0
+        self.tiles_reused = 0
+        self._frames: "OrderedDict[Tuple[str, Tuple[int, int]], _Frame]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def read(
+        self,
+        image: Image.Image,
+        read_tiles: Callable[
+            [List[Tuple[Image.Image, Tuple[int, int]]]], List[_base.OcrResult]
+        ],
+    ) -> _base.OcrResult:
+        """Return the result for the image, in image coordinates.
+
+        read_tiles is called once with a list of each changed tile and its offset
+        within the image, so that they can be recognized as a batch, and must
+        return their results in image coordinates.
+        """
+        with self._lock:
+            key = (image.mode, image.size)
+            previous = self._frames.pop(key, None)
+            diff = self._difference(previous.image, image) if previous else None
+            tiles = []
+            changed = []
+            for index, (cell, crop) in enumerate(self._layout(image.size)):
+                if diff is not None and not diff.crop(crop).getbbox():
+                    tiles.append(previous.tiles[index])
+                    self.tiles_reused += 1
+                else:
+                    tiles.append(None)
+                    changed.append((index, cell, crop))
+            results = read_tiles(
+                [(image.crop(crop), crop[0:2]) for _, _, crop in changed]
+            )
+            for (index, cell, crop), result in zip(changed, results):
+                tiles[index] = _Tile(cell, crop, self._owned_lines(result, cell))
+            self.tiles_read += len(changed)
+            self._frames[key] = _Frame(image.copy(), tiles)
+            while len(self._frames) > self.max_frames:
+                self._frames.popitem(last=False)
+        return _base.OcrResult(_merge_lines([tile.lines for tile in tiles]))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._frames.clear()
+
+    def _layout(self, size: Tuple[int, int]) -> List[Tuple[BoundingBox, BoundingBox]]:
+        width, height = size
+        layout = []
+        for top in range(0, max(height, 1), self.tile_size):
+            for left in range(0, max(width, 1), self.tile_size):
+                cell = (
+                    left,
+                    top,
+                    min(width, left + self.tile_size),
+                    min(height, top + self.tile_size),
+                )
+                crop = (
+                    max(0, cell[0] - self.overlap),
+                    max(0, cell[1] - self.overlap),
+                    min(width, cell[2] + self.overlap),
+                    min(height, cell[3] + self.overlap),
+                )
+                layout.append((cell, crop))
+        return layout
+
+    @staticmethod
+    def _difference(previous: Image.Image, image: Image.Image) -> Image.Image:
+        # getbbox() ignores color channels of RGBA images, so compare as RGB.
+        if image.mode not in ("RGB", "L"):
+            previous = previous.convert("RGB")
+            image = image.convert("RGB")
+        return ImageChops.difference(previous, image)
+
+    @staticmethod
+    def _owned_lines(result: _base.OcrResult, cell: BoundingBox) -> List[_base.OcrLine]:
+        # Words in the overlap are read by multiple tiles. Keep each word only in
+        # the tile whose cell contains its center.
+        lines = []
+        for line in result.lines:
+            words = [
+                word
+                for word in line.words
+                if cell[0] <= word.left + word.width / 2 < cell[2]
+                and cell[1] <= word.top + word.height / 2 < cell[3]
+            ]
+            if words:
+                lines.append(_base.OcrLine(words))
+        return lines
+
+
+@dataclass
+class _ScrollFrame:
+    image: Image.Image
+    # Result in image coordinates.
+    result: _base.OcrResult
+    row_hashes: List[int]
+    column_hashes: Optional[List[int]] = None
+
+
+class ScrollReader:
+    """Reuses the previous result when an image is a translation of the previous one.
+
+    The translation is estimated by matching hashes of unique pixel rows (or
+    columns) between consecutive frames. Cached words are shifted into place and
+    only rows that don't match the shifted previous frame, such as the newly
+    exposed strip, are read. An unchanged or partly edited image is a translation
+    by zero.
+    """
+
+    def __init__(
+        self,
+        strip_overlap: int = 20,
+        min_votes: int = 3,
+        min_reused_fraction: float = 0.5,
+        max_frames: int = 4,
+    ):
+        self.strip_overlap = strip_overlap
+        self.min_votes = min_votes
+        self.min_reused_fraction = min_reused_fraction
+        self.max_frames = max_frames
+        self.scrolls_detected = 0
+        self._frames: "OrderedDict[Tuple[str, Tuple[int, int]], _ScrollFrame]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def read(
+        self,
+        image: Image.Image,
+        read_region: Callable[[Image.Image, Tuple[int, int]], _base.OcrResult],
+        read_full: Callable[[Image.Image], _base.OcrResult],
+    ) -> _base.OcrResult:
+        """Return the result for the image, in image coordinates.
+
+        read_region is called with each region that must be read and its offset
+        within the image, and must return a result in image coordinates. read_full
+        is called when the image is not a translation of the previous frame.
+        """
+        with self._lock:
+            key = (image.mode, image.size)
+            previous = self._frames.pop(key, None)
+            frame = _ScrollFrame(image.copy(), None, _line_hashes(image))
+            result = previous and self._read_scrolled(previous, frame, read_region)
+            if result is None:
+                result = read_full(image)
+            else:
+                self.scrolls_detected += 1
+            frame.result = result
+            self._frames[key] = frame
+            while len(self._frames) > self.max_frames:
+                self._frames.popitem(last=False)
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._frames.clear()
+
+    def _read_scrolled(
+        self,
+        previous: _ScrollFrame,
+        frame: _ScrollFrame,
+        read_region: Callable[[Image.Image, Tuple[int, int]], _base.OcrResult],
+    ) -> Optional[_base.OcrResult]:
+        # Try vertical scrolling first since it is far more common. A translation
+        # by zero is only used if neither direction has a nonzero translation.
+        horizontal = False
+        if previous.row_hashes == frame.row_hashes:
+            # Unchanged, even if no row is unique.
+            shift = 0
+        else:
+            shift = self._estimate_shift(previous.row_hashes, frame.row_hashes)
+            if not shift:
+                previous.column_hashes = previous.column_hashes or _line_hashes(
+                    previous.image.transpose(Image.Transpose.TRANSPOSE)
+                )
+                frame.column_hashes = _line_hashes(
+                    frame.image.transpose(Image.Transpose.TRANSPOSE)
+                )
+                column_shift = self._estimate_shift(
+                    previous.column_hashes, frame.column_hashes
+                )
+                if column_shift or shift is None:
+                    horizontal, shift = True, column_shift
+        if shift is None:
+            return None
+        previous_hashes = previous.column_hashes if horizontal else previous.row_hashes
+        hashes = frame.column_hashes if horizontal else frame.row_hashes
+        length = len(hashes)
+        dirty = [
+            not (0 <= i - shift < length and previous_hashes[i - shift] == hash_)
+            for i, hash_ in enumerate(hashes)
+        ]
+        if dirty.count(False) < self.min_reused_fraction * length:
+            return None
+
+        # Shift the cached words. Words that were cut off by the edge of the
+        # previous frame are read again.
+        cached_words = []
+        for line in previous.result.lines:
+            words = []
+            for word in line.words:
+                start, size = (
+                    (word.left, word.width) if horizontal else (word.top, word.height)
+                )
+                start += shift
+                # Also read words that are now cut off by the edge of the frame.
+                if shift and (
+                    start - shift <= 0
+                    or start - shift + size >= length
+                    or start < 0
+                    or start + size > length
+                ):
+                    for i in range(
+                        max(0, int(start)), min(length, int(start + size) + 1)
+                    ):
+                        dirty[i] = True
+                words.append((start, size, word))
+            cached_words.append(words)
+
+        lines = []
+        for words in cached_words:
+            kept = [
+                _base.OcrWord(
+                    word.text,
+                    start if horizontal else word.left,
+                    word.top if horizontal else start,
+                    word.width,
+                    word.height,
+                    word.confidence,
+                )
+                for start, size, word in words
+                if 0 <= start + size / 2 < length and not dirty[int(start + size / 2)]
+            ]
+            if kept:
+                lines.append(_base.OcrLine(kept))
+
+        # Lines of the cached words, then of each region that was read.
+        groups = [lines]
+        width, height = frame.image.size
+        for run_start, run_end in _runs(dirty):
+            start = max(0, run_start - self.strip_overlap)
+            end = min(length, run_end + self.strip_overlap)
+            box = (start, 0, end, height) if horizontal else (0, start, width, end)
+            result = read_region(frame.image.crop(box), box[0:2])
+            region_lines = []
+            for line in result.lines:
+                # Words in the overlap belong to the cached result.
+                kept = [
+                    word
+                    for word in line.words
+                    if run_start
+                    <= (
+                        word.left + word.width / 2
+                        if horizontal
+                        else word.top + word.height / 2
+                    )
+                    < run_end
+                ]
+                if kept:
+                    region_lines.append(_base.OcrLine(kept))
+            groups.append(region_lines)
+        # After a horizontal scroll, lines continue across the edges of regions.
+        return _base.OcrResult(_merge_lines(groups))
+
+    def _estimate_shift(
+        self, previous_hashes: Sequence[int], hashes: Sequence[int]
+    ) -> Optional[int]:
+        """Return the most common offset between matching unique lines, or None if
+        there is no translation."""
+        previous_counts = Counter(previous_hashes)
+        previous_positions = {
+            hash_: i
+            for i, hash_ in enumerate(previous_hashes)
+            if previous_counts[hash_] == 1
+        }
+        counts = Counter(hashes)
+        votes = Counter(
+            i - previous_positions[hash_]
+            for i, hash_ in enumerate(hashes)
+            if counts[hash_] == 1 and hash_ in previous_positions
+        )
+        if not votes:
+            return None
+        shift, count = votes.most_common(1)[0]
+        return shift if count >= self.min_votes else None
+
+
+def _merge_lines(groups: Sequence[Sequence[_base.OcrLine]]) -> List[_base.OcrLine]:
+    """Join lines that were split across groups read separately, such as tiles."""
+    pieces = sorted(
+        (
+            (group_index, line)
+            for group_index, lines in enumerate(groups)
+            for line in lines
+        ),
+        key=lambda piece: piece[1].words[0].left,
+    )
+    merged: List[Tuple[int, _base.OcrLine]] = []
+    for group_index, line in pieces:
+        target = _find_continued_line(merged, group_index, line)
+        if target is None:
+            merged.append((group_index, _base.OcrLine(list(line.words))))
+        else:
+            merged_line = merged[target][1]
+            merged_line.words.extend(line.words)
+            merged[target] = (group_index, merged_line)
+    lines = [line for _, line in merged]
+    lines.sort(key=lambda line: (line.words[0].top, line.words[0].left))
+    return lines
+
+
+def _find_continued_line(
+    merged: List[Tuple[int, _base.OcrLine]], group_index: int, line: _base.OcrLine
+) -> Optional[int]:
+    first = line.words[0]
+    for index, (last_group_index, candidate) in enumerate(merged):
+        # Lines within a group were already separated by the backend.
+        if last_group_index == group_index:
+            continue
+        last = candidate.words[-1]
+        gap = first.left - (last.left + last.width)
+        height = max(first.height, last.height)
+        vertical_overlap = min(first.top + first.height, last.top + last.height) - max(
+            first.top, last.top
+        )
+        if (
+            -first.width / 2 <= gap <= 2 * height
+            and vertical_overlap >= min(first.height, last.height) / 2
+        ):
+            return index
+    return None
+
+
+def _line_hashes(image: Image.Image) -> List[int]:
+    """Return a hash of each row of pixels."""
+    data = image.tobytes()
+    stride = len(data) // image.height
+    return [hash(data[i : i + stride]) for i in range(0, len(data), stride)]
+
+
+def _runs(flags: Sequence[bool]) -> List[Tuple[int, int]]:
+    """Return [start, end) ranges of consecutive True values."""
+    runs = []
+    start = None
+    for i, flag in enumerate(flags):
+        if flag and start is None:
+            start = i
+        elif not flag and start is not None:
+            runs.append((start, i))
+            start = None
+    if start is not None:
+        runs.append((start, len(flags)))
+    return runs
@@ -0,0 +1,239 @@
+"""In-process Tesseract engine using the libtesseract C API through ctypes.
+
+Avoids the per-call cost of spawning the tesseract binary, reloading traineddata
+and round-tripping the image and results through temporary files.
+"""
+
+import ctypes
+import ctypes.util
+import sys
+import threading
+from typing import Optional
+
+import numpy as np
+
+from . import _base
+
+# TessPageIteratorLevel
+_RIL_TEXTLINE = 2
+_RIL_WORD = 3
+# TessPageSegMode. The tesseract binary uses PSM_AUTO, while TessBaseAPI defaults
+# to PSM_SINGLE_BLOCK, which groups multi-column text differently.
+_PSM_AUTO = 3
+
+
+def _default_library_names():
+    if sys.platform == "win32":
+        return ["libtesseract-5", "libtesseract-4", "tesseract"]
+    return ["tesseract"]
+
+
+def load_library(library_path: Optional[str] = None) -> ctypes.CDLL:
+    """Load libtesseract and declare the functions used by LibraryEngine."""
+    if not library_path:
+        for name in _default_library_names():
+            library_path = ctypes.util.find_library(name)
+            if library_path:
+                break
+        else:
+            raise ImportError("Could not find the libtesseract shared library")
+    lib = ctypes.CDLL(library_path)
+    handle = ctypes.c_void_p
+    c_int_p = ctypes.POINTER(ctypes.c_int)
+    for name, restype, argtypes in [
+        ("TessVersion", ctypes.c_char_p, []),
+        ("TessBaseAPICreate", handle, []),
+        ("TessBaseAPIDelete", None, [handle]),
+        ("TessBaseAPIEnd", None, [handle]),
+        (
+            "TessBaseAPIInit3",
+            ctypes.c_int,
+            [handle, ctypes.c_char_p, ctypes.c_char_p],
+        ),
+        ("TessBaseAPISetPageSegMode", None, [handle, ctypes.c_int]),
+        (
+            "TessBaseAPISetImage",
+            None,
+            [
+                handle,
+                ctypes.c_void_p,
+                ctypes.c_int,
+                ctypes.c_int,
+                ctypes.c_int,
+                ctypes.c_int,
+            ],
+        ),
+        ("TessBaseAPIRecognize", ctypes.c_int, [handle, handle]),
+        ("TessBaseAPIGetIterator", handle, [handle]),
+        ("TessBaseAPIClear", None, [handle]),
+        ("TessResultIteratorDelete", None, [handle]),
+        ("TessResultIteratorNext", ctypes.c_int, [handle, ctypes.c_int]),
+        ("TessResultIteratorGetPageIterator", handle, [handle]),
+        ("TessResultIteratorGetUTF8Text", handle, [handle, ctypes.c_int]),
+        ("TessResultIteratorConfidence", ctypes.c_float, [handle, ctypes.c_int]),
+        ("TessDeleteText", None, [handle]),
+        ("TessPageIteratorIsAtBeginningOf", ctypes.c_int, [handle, ctypes.c_int]),
+        (
+            "TessPageIteratorBoundingBox",
+            ctypes.c_int,
+            [handle, ctypes.c_int, c_int_p, c_int_p, c_int_p, c_int_p],
+        ),
+    ]:
+        function = getattr(lib, name)
+        function.restype = restype
+        function.argtypes = argtypes
+    return lib
+
+
+class _Api:
+    """Initialized TessBaseAPI handle, owned by a single thread."""
+
+    def __init__(self, lib: ctypes.CDLL, data_path: str, language: str):
+        self._lib = lib
+        self.handle = lib.TessBaseAPICreate()
+        if lib.TessBaseAPIInit3(
+            self.handle, data_path.encode("utf-8"), language.encode("utf-8")
+        ):
+            lib.TessBaseAPIDelete(self.handle)
+            self.handle = None
+            raise RuntimeError(
+                f"Could not initialize Tesseract with data path {data_path!r}"
+            )
+        # Same layout analysis as the subprocess engine.
+        lib.TessBaseAPISetPageSegMode(self.handle, _PSM_AUTO)
+
+    def __del__(self):
+        if self.handle:
+            self._lib.TessBaseAPIEnd(self.handle)
+            self._lib.TessBaseAPIDelete(self.handle)
+            self.handle = None
+
+
+class LibraryEngine:
+    """Runs Tesseract in-process, keeping one initialized API per thread."""
+
+    def __init__(
+        self,
+        data_path: str,
+        language: str = "eng",
+        library_path: Optional[str] = None,
+    ):
+        self._lib = load_library(library_path)
+        self.data_path = data_path
+        self.language = language
+        self._local = threading.local()
+
+    def __getstate__(self):
+        # Handles can't be shared across processes; reinitialize after unpickling.
+        state = self.__dict__.copy()
+        del state["_lib"], state["_local"]
+        state["library_path"] = self.library_path
+        return state
+
+    def __setstate__(self, state):
+        library_path = state.pop("library_path")
+        self.__dict__.update(state)
+        self._lib = load_library(library_path)
+        self._local = threading.local()
+
+    @property
+    def library_path(self) -> str:
+        return self._lib._name
+
+    @property
+    def version(self) -> str:
+        return self._lib.TessVersion().decode("utf-8")
+
+    def recognize(self, image) -> _base.ColumnarOcrResult:
+        """Return the words in the image, grouped into lines in reading order.
+
+        The image may be a PIL image or a uint8 array with shape (height, width)
+        or (height, width, 3 or 4). Arrays with contiguous rows are read in place.
+        """
+        api = getattr(self._local, "api", None)
+        if not api:
+            api = _Api(self._lib, self.data_path, self.language)
+            self._local.api = api
+        if isinstance(image, np.ndarray):
+            # Must stay alive until recognition completes.
+            data = image
+            if data.strides[-1] != data.itemsize or (
+                data.ndim == 3 and data.strides[1] != data.shape[2]
+            ):
+                data = np.ascontiguousarray(data)
+            height, width = data.shape[:2]
+            bytes_per_pixel = data.shape[2] if data.ndim == 3 else 1
+            bytes_per_line = data.strides[0]
+            pointer = data.ctypes.data
+        else:
+            if image.mode not in ("L", "RGB", "RGBA"):
+                image = image.convert("L")
+            width, height = image.size
+            bytes_per_pixel = len(image.getbands())
+            bytes_per_line = width * bytes_per_pixel
+            # Must stay alive until recognition completes.
+            data = image.tobytes()
+            pointer = data
+        lib = self._lib
+        lib.TessBaseAPISetImage(
+            api.handle,
+            pointer,
+            width,
+            height,
+            bytes_per_pixel,
+            bytes_per_line,
+        )
+        try:
+            if lib.TessBaseAPIRecognize(api.handle, None):
+                raise RuntimeError("Tesseract recognition failed")
+            return self._read_results(api.handle)
+        finally:
+            lib.TessBaseAPIClear(api.handle)
+
+    def _read_results(self, handle) -> _base.ColumnarOcrResult:
+        lib = self._lib
+        lines = []
+        words = []
+        iterator = lib.TessBaseAPIGetIterator(handle)
+        if not iterator:
+            return _base.ColumnarOcrResult.from_rows(lines)
+        try:
+            page_iterator = lib.TessResultIteratorGetPageIterator(iterator)
+            left, top, right, bottom = (ctypes.c_int() for _ in range(4))
+            while True:
+                if lib.TessPageIteratorIsAtBeginningOf(page_iterator, _RIL_TEXTLINE):
+                    if words:
+                        lines.append(words)
+                    words = []
+                text_pointer = lib.TessResultIteratorGetUTF8Text(iterator, _RIL_WORD)
+                # Empty words are omitted, as in Tesseract's TSV output.
+                if text_pointer:
+                    try:
+                        text = ctypes.string_at(text_pointer).decode("utf-8")
+                    finally:
+                        lib.TessDeleteText(text_pointer)
+                    lib.TessPageIteratorBoundingBox(
+                        page_iterator,
+                        _RIL_WORD,
+                        ctypes.byref(left),
+                        ctypes.byref(top),
+                        ctypes.byref(right),
+                        ctypes.byref(bottom),
+                    )
+                    words.append(
+                        (
+                            text,
+                            left.value,
+                            top.value,
+                            right.value - left.value,
+                            bottom.value - top.value,
+                            lib.TessResultIteratorConfidence(iterator, _RIL_WORD),
+                        )
+                    )
+                if not lib.TessResultIteratorNext(iterator, _RIL_WORD):
+                    break
+        finally:
+            lib.TessResultIteratorDelete(iterator)
+        if words:
+            lines.append(words)
+        return _base.ColumnarOcrResult.from_rows(lines)
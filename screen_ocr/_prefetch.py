@@ -0,0 +1,180 @@
+"""Background reading of the screen near a moving point of interest."""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Tuple
+
+from . import _base
+
+# Represented as [left, top, right, bottom] pixel coordinates
+BoundingBox = Tuple[int, int, int, int]
+
+
+@dataclass
+class PrefetchedResult:
+    screenshot: Any
+    bounding_box: BoundingBox
+    # Result in screen coordinates.
+    result: _base.OcrResult
+    # time.monotonic() when the screenshot was last confirmed to be current.
+    timestamp: float
+
+
+class Prefetcher:
+    """Repeatedly reads the screen around coordinates supplied by a provider.
+
+    Arguments:
+    read: Called with a screenshot and its bounding box and returns the result in
+      screen coordinates.
+    screenshot: Called with a bounding box and returns a (screenshot, bounding box)
+      tuple.
+    coordinate_provider: Returns the current point of interest, e.g. the mouse or
+      gaze position, or None to pause.
+    interval: Minimum seconds between reads.
+    max_staleness: Maximum age in seconds of a result that can be used.
+    cpu_budget: Maximum fraction of wall time spent reading. Reads that take
+      longer are followed by a proportionally longer pause.
+    """
+
+    def __init__(
+        self,
+        read: Callable[[Any, BoundingBox], _base.OcrResult],
+        screenshot: Callable[[BoundingBox], Tuple[Any, BoundingBox]],
+        coordinate_provider: Callable[[], Optional[Tuple[int, int]]],
+        radius: int,
+        interval: float = 0.1,
+        max_staleness: float = 0.5,
+        cpu_budget: float = 0.5,
+    ):
+        if not 0 < cpu_budget <= 1:
+            raise ValueError("cpu_budget must be in (0, 1]")
+        self._read = read
+        self._screenshot = screenshot
+        self.coordinate_provider = coordinate_provider
+        self.radius = radius
+        self.interval = interval
+        self.max_staleness = max_staleness
+        self.cpu_budget = cpu_budget
+        self.reads = 0
+        self.hits = 0
+        self.misses = 0
+        self.last_error: Optional[Exception] = None
+        self._latest: Optional[PrefetchedResult] = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="screen_ocr prefetch", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the worker and wait for any in-progress read to finish."""
+        self._stop_event.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        with self._lock:
+            self._latest = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive() and not self._stop_event.is_set()
+
+    def lookup(
+        self, screenshot, bounding_box: BoundingBox
+    ) -> Optional[_base.OcrResult]:
+        """Return the words within the bounding box if a fresh prefetched result
+        covers it and its pixels match the screenshot."""
+        with self._lock:
+            latest = self._latest
+        if (
+            not latest
+            or time.monotonic() - latest.timestamp > self.max_staleness
+            or not _contains(latest.bounding_box, bounding_box)
+            or not _same_pixels(_crop(latest, bounding_box), screenshot)
+        ):
+            self.misses += 1
+            return None
+        self.hits += 1
+        lines = []
+        for line in latest.result.lines:
+            words = [
+                word
+                for word in line.words
+                if bounding_box[0] <= word.left + word.width / 2 < bounding_box[2]
+                and bounding_box[1] <= word.top + word.height / 2 < bounding_box[3]
+            ]
+            if words:
+                lines.append(_base.OcrLine(words))
+        return _base.OcrResult(lines)
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            start = time.monotonic()
+            try:
+                self._prefetch()
+            except Exception as e:
+                self.last_error = e
+            elapsed = time.monotonic() - start
+            # Stay within the CPU budget: pause for elapsed * (1 - budget) / budget.
+            pause = max(
+                self.interval - elapsed,
+                elapsed * (1 - self.cpu_budget) / self.cpu_budget,
+            )
+            self._stop_event.wait(pause)
+
+    def _prefetch(self) -> None:
+        coordinates = self.coordinate_provider()
+        if not coordinates:
+            return
+        timestamp = time.monotonic()
+        screenshot, bounding_box = self._screenshot(
+            (
+                coordinates[0] - self.radius,
+                coordinates[1] - self.radius,
+                coordinates[0] + self.radius,
+                coordinates[1] + self.radius,
+            )
+        )
+        with self._lock:
+            latest = self._latest
+        # Skip the read if nothing changed since the last one.
+        if (
+            latest
+            and _contains(latest.bounding_box, bounding_box)
+            and _same_pixels(_crop(latest, bounding_box), screenshot)
+        ):
+            with self._lock:
+                latest.timestamp = timestamp
+            return
+        result = self._read(screenshot, bounding_box)
+        self.reads += 1
+        with self._lock:
+            self._latest = PrefetchedResult(screenshot, bounding_box, result, timestamp)
+
+
+def _crop(prefetched: PrefetchedResult, bounding_box: BoundingBox):
+    left, top = prefetched.bounding_box[0:2]
+    return prefetched.screenshot.crop(
+        (
+            bounding_box[0] - left,
+            bounding_box[1] - top,
+            bounding_box[2] - left,
+            bounding_box[3] - top,
+        )
+    )
+
+
+def _contains(outer: BoundingBox, inner: BoundingBox) -> bool:
+    return (
+        outer[0] <= inner[0]
+        and outer[1] <= inner[1]
+        and outer[2] >= inner[2]
+        and outer[3] >= inner[3]
+    )
+
+
+def _same_pixels(a, b) -> bool:
+    return a.size == b.size and a.mode == b.mode and a.tobytes() == b.tobytes()
@@ -1,15 +1,24 @@
 """Library for processing screen contents using OCR."""
 
+import functools
+import importlib
+import importlib.util
 import os
 import re
-from collections import deque
+import sys
+import threading
+from collections import Counter, OrderedDict, deque
+from concurrent import futures
 from dataclasses import dataclass
 from itertools import islice
 from typing import (
     Any,
     Callable,
+    Dict,
+    Hashable,
     Iterable,
     Iterator,
+    List,
     Mapping,
     Optional,
     Sequence,
@@ -25,25 +34,51 @@ except ImportError:
     os.environ["JAROWINKLER_IMPLEMENTATION"] = "python"
     from rapidfuzz import fuzz
 
-from . import _base
+from . import _base, _prefetch, _serialization
+from ._cache import PersistentCache, ResultCache
+from ._serialization import decode_result, encode_result
 
-# Optional backends.
-try:
-    from . import _tesseract
-except (ImportError, SyntaxError):
-    _tesseract = None
-try:
-    from . import _easyocr
-except ImportError:
-    _easyocr = None
+# Optional backends. These are imported on first use because their dependencies
+# (e.g. torch, scikit-image) can take seconds to import.
+_BACKEND_DEPENDENCIES = {
+    "tesseract": ("numpy", "pytesseract", "skimage"),
+    "easyocr": ("easyocr", "numpy"),
+    "talon": ("talon",),
+    "winrt": ("winrt",),
+}
+
+
+def _backend_available(name: str) -> bool:
+    """Return whether the backend's dependencies are installed, without importing
+    them."""
+    try:
+        return all(
+            importlib.util.find_spec(module) for module in _BACKEND_DEPENDENCIES[name]
+        )
+    except (ImportError, ValueError):
+        return False
+
+
+def _load_backend(name: str):
+    """Import and return the backend module, or None if it is unavailable."""
+    if not _backend_available(name):
+        return None
+    try:
+        return importlib.import_module(f"._{name}", __package__)
+    except (ImportError, SyntaxError):
+        return None
+
+
+def _loaded_backend(name: str):
+    """Return the backend module if it has already been imported."""
+    return sys.modules.get(f"{__package__}._{name}")
+
+
+# Requires Pillow.
 try:
-    from . import _talon
+    from . import _incremental
 except ImportError:
-    _talon = None
-try:
-    from . import _winrt
-except (ImportError, SyntaxError):
-    _winrt = None
+    _incremental = None
 
 # Optional packages needed for certain backends.
 try:
@@ -66,7 +101,7 @@ class Reader:
 
         See constructor for full argument list.
         """
-        if _winrt:
+        if _backend_available("winrt"):
             return cls.create_reader(backend="winrt", **kwargs)
         else:
             return cls.create_reader(backend="tesseract", **kwargs)
@@ -77,7 +112,7 @@ class Reader:
 
         See constructor for full argument list.
         """
-        if _winrt:
+        if _backend_available("winrt"):
             return cls.create_reader(backend="winrt", **kwargs)
         else:
             defaults = {
@@ -93,6 +128,12 @@ class Reader:
         backend: Union[str, _base.OcrBackend],
         tesseract_data_path=None,
         tesseract_command=None,
+        tesseract_engine="subprocess",
+        tesseract_library_path=None,
+        tesseract_bands=1,
+        easyocr_threads=None,
+        easyocr_batch_size=1,
+        easyocr_canvas_size=2560,
         threshold_function="local_otsu",
         threshold_block_size=41,
         correction_block_size=31,
@@ -106,6 +147,7 @@ class Reader:
         if isinstance(backend, _base.OcrBackend):
             return cls(backend, **kwargs)
         if backend == "tesseract":
+            _tesseract = _load_backend("tesseract")
             if not _tesseract:
                 raise ValueError(
                     "Tesseract backend unavailable. To install, run pip install screen-ocr[tesseract]."
@@ -119,6 +161,9 @@ class Reader:
                 convert_grayscale=convert_grayscale,
                 shift_channels=shift_channels,
                 debug_image_callback=debug_image_callback,
+                engine=tesseract_engine,
+                library_path=tesseract_library_path,
+                bands=tesseract_bands,
             )
             defaults = {
                 "resize_factor": 2,
@@ -130,13 +175,19 @@ class Reader:
                 **dict(defaults, **kwargs),
             )
         if backend == "easyocr":
+            _easyocr = _load_backend("easyocr")
             if not _easyocr:
                 raise ValueError(
                     "EasyOCR backend unavailable. To install, run pip install screen-ocr[easyocr]."
                 )
-            backend = _easyocr.EasyOcrBackend()
+            backend = _easyocr.EasyOcrBackend(
+                threads=easyocr_threads,
+                batch_size=easyocr_batch_size,
+                canvas_size=easyocr_canvas_size,
+            )
             return cls(backend, debug_image_callback=debug_image_callback, **kwargs)
         if backend == "winrt":
+            _winrt = _load_backend("winrt")
             if not _winrt:
                 raise ValueError(
                     "WinRT backend unavailable. To install, run pip install screen-ocr[winrt]."
@@ -153,6 +204,7 @@ class Reader:
                 **dict({"resize_factor": 2}, **kwargs),
             )
         if backend == "talon":
+            _talon = _load_backend("talon")
             if not _talon:
                 raise ValueError(
                     "Talon backend unavailable. Requires installing and running in Talon (see talonvoice.com)."
@@ -172,6 +224,11 @@ class Reader:
         radius: int = 200,  # screenshot "radius"
         search_radius: int = 125,
         homophones: Optional[Mapping[str, Iterable[str]]] = None,
+        cache: Optional[Union[ResultCache, PersistentCache]] = None,
+        tile_size: Optional[int] = None,
+        tile_overlap: int = 100,
+        scroll_detection: bool = False,
+        executor: Optional[futures.Executor] = None,
     ):
         self._backend = backend
         self.margin = margin
@@ -190,6 +247,26 @@ class Reader:
             if homophones
             else default_homophones()
         )
+        self.cache = cache
+        # If enabled, images are read in tiles and unchanged tiles are reused
+        # from the previous read of an image with the same size.
+        if tile_size:
+            assert _incremental
+            self._tiled_reader = _incremental.TiledReader(tile_size, tile_overlap)
+        else:
+            self._tiled_reader = None
+        # If enabled, images that are translations of the previous image with the
+        # same size reuse its result and only read the newly exposed region.
+        if scroll_detection:
+            assert _incremental
+            self._scroll_reader = _incremental.ScrollReader()
+        else:
+            self._scroll_reader = None
+        self._prefetcher: Optional[_prefetch.Prefetcher] = None
+        # Used for CPU-bound work in the async API. Defaults to the event loop's
+        # default executor.
+        self.executor = executor
+        self._canvases = _CanvasCache()
 
     # Represented as [left, top, right, bottom] pixel coordinates
     BoundingBox = Tuple[int, int, int, int]
@@ -210,6 +287,16 @@ class Reader:
             screen_coordinates[1] + crop_radius,
         )
         screenshot, bounding_box = self._clean_screenshot(bounding_box)
+        if self._prefetcher:
+            result = self._prefetcher.lookup(screenshot, bounding_box)
+            if result:
+                return self._screen_contents(
+                    screenshot,
+                    result,
+                    bounding_box[0:2],
+                    screen_coordinates,
+                    search_radius,
+                )
         return self.read_image(
             screenshot,
             offset=bounding_box[0:2],
@@ -217,6 +304,52 @@ class Reader:
             search_radius=search_radius,
         )
 
+    def start_prefetching(
+        self,
+        coordinate_provider: Callable[[], Optional[Tuple[int, int]]],
+        radius: Optional[int] = None,
+        interval: float = 0.1,
+        max_staleness: float = 0.5,
+        cpu_budget: float = 0.5,
+    ) -> None:
+        """Start reading the screen in the background so that read_nearby can
+        return immediately.
+
+        Arguments:
+        coordinate_provider: Returns the current point of interest, e.g. the mouse
+          or gaze position, or None to pause. Called from a background thread.
+        radius: Radius of the region read around the point. Defaults to 1.5 times
+          the reader radius so that small movements are still covered.
+        interval: Minimum seconds between reads.
+        max_staleness: Maximum age in seconds of a background result used by
+          read_nearby. Results are also only used if the pixels still match.
+        cpu_budget: Maximum fraction of wall time spent reading in the background.
+        """
+        if self._is_talon_backend():
+            raise ValueError("Prefetching is not supported with the Talon backend.")
+        self.stop_prefetching()
+        self._prefetcher = _prefetch.Prefetcher(
+            read=self._read_prefetched_region,
+            screenshot=self._screenshot,
+            coordinate_provider=coordinate_provider,
+            radius=radius or int(self.radius * 1.5),
+            interval=interval,
+            max_staleness=max_staleness,
+            cpu_budget=cpu_budget,
+        )
+        self._prefetcher.start()
+
+    def stop_prefetching(self, timeout: Optional[float] = None) -> None:
+        """Stop background reading, waiting for any in-progress read to finish."""
+        if self._prefetcher:
+            self._prefetcher.stop(timeout)
+            self._prefetcher = None
+
+    def _read_prefetched_region(
+        self, screenshot, bounding_box: BoundingBox
+    ) -> _base.OcrResult:
+        return self.read_image(screenshot, offset=bounding_box[0:2]).result
+
     def read_screen(self, bounding_box: Optional[BoundingBox] = None):
         """Return ScreenContents for the entire screen."""
         screenshot, bounding_box = self._clean_screenshot(bounding_box)
@@ -234,11 +367,199 @@ class Reader:
         screen_coordinates: Optional[Tuple[int, int]] = None,
         search_radius: Optional[int] = None,
     ):
-        """Return ScreenContents of the provided image."""
+        """Return ScreenContents of the provided image.
+
+        The image may be a PIL image, or a NumPy array or other object supporting
+        the buffer protocol with shape (height, width[, channels]) and dtype uint8.
+        Arrays are not copied, except as needed to resize or add a margin, or to
+        compare tiles and detect scrolling.
+        """
+        image = self._image_or_array(image)
+        search_radius = search_radius or self.search_radius
+        if (self._scroll_reader or self._tiled_reader) and not self._is_talon_backend():
+            # Tiles and scrolled regions are cropped from PIL images.
+            assert Image
+            pil_image = (
+                image if isinstance(image, Image.Image) else Image.fromarray(image)
+            )
+            result = self._translate_result(self._read_incremental(pil_image), offset)
+        else:
+            result = self._run_ocr(image)
+            result = self._adjust_result(result, offset)
+        return self._screen_contents(
+            image, result, offset, screen_coordinates, search_radius
+        )
+
+    def read_images(
+        self,
+        images: Iterable[Any],
+        max_workers: Optional[int] = None,
+        ordered: bool = True,
+        batch_size: int = 8,
+    ) -> Iterator["ScreenContents"]:
+        """Return ScreenContents of each of the provided images.
+
+        With the Tesseract backend, images are read in parallel by a pool of
+        max_workers processes (defaults to the number of CPUs). Pixels are passed to
+        the workers through shared memory, and the result cache and incremental
+        modes are not used. Other backends read images in sequence, passing up to
+        batch_size images at a time to backends that support batched recognition,
+        such as EasyOCR.
+
+        Arguments:
+        images: Iterable of images. Consumed lazily, so it may be a generator.
+        max_workers: Maximum number of worker processes.
+        ordered: If True, results are returned in the order of the images.
+          Otherwise, they are returned as they complete; use
+          ScreenContents.screenshot to identify the image.
+        batch_size: Maximum number of images read in one backend call when not
+          using a process pool.
+        """
+        max_workers = max_workers or os.cpu_count() or 1
+        if (
+            max_workers == 1
+            or not self._is_tesseract_backend()
+            # Callbacks generally can't be pickled.
+            or self.debug_image_callback
+            or self._backend.debug_image_callback
+        ):
+            if self._scroll_reader or self._tiled_reader:
+                for image in images:
+                    yield self.read_image(image)
+                return
+            images = iter(images)
+            if not self._recognizes_batches():
+                batch_size = 1
+            while True:
+                batch = [
+                    self._image_or_array(image) for image in islice(images, batch_size)
+                ]
+                if not batch:
+                    return
+                for image, result in zip(batch, self._run_ocr_batch(batch)):
+                    yield self._screen_contents(
+                        image,
+                        self._adjust_result(result, (0, 0)),
+                        (0, 0),
+                        None,
+                        self.search_radius,
+                    )
+        from . import _batch
+
+        images = (self._image_or_array(image) for image in images)
+
+        reader_args = {
+            "backend": self._backend,
+            "margin": self.margin,
+            "resize_factor": self.resize_factor,
+            "resize_method": self.resize_method,
+        }
+        for image, result in _batch.read_images(
+            images, reader_args, max_workers, ordered
+        ):
+            yield self._screen_contents(
+                image,
+                self._adjust_result(result, (0, 0)),
+                (0, 0),
+                None,
+                self.search_radius,
+            )
+
+    async def read_nearby_async(
+        self,
+        screen_coordinates: Tuple[int, int],
+        search_radius: Optional[int] = None,
+        crop_radius: Optional[int] = None,
+    ):
+        """Awaitable version of read_nearby."""
+        search_radius = search_radius or self.search_radius
+        crop_radius = crop_radius or self.radius
+        bounding_box = (
+            screen_coordinates[0] - crop_radius,
+            screen_coordinates[1] - crop_radius,
+            screen_coordinates[0] + crop_radius,
+            screen_coordinates[1] + crop_radius,
+        )
+        screenshot, bounding_box = await self._run_in_executor(
+            self._clean_screenshot, bounding_box
+        )
+        if self._prefetcher:
+            result = self._prefetcher.lookup(screenshot, bounding_box)
+            if result:
+                return self._screen_contents(
+                    screenshot,
+                    result,
+                    bounding_box[0:2],
+                    screen_coordinates,
+                    search_radius,
+                )
+        return await self.read_image_async(
+            screenshot,
+            offset=bounding_box[0:2],
+            screen_coordinates=screen_coordinates,
+            search_radius=search_radius,
+        )
+
+    async def read_screen_async(self, bounding_box: Optional[BoundingBox] = None):
+        """Awaitable version of read_screen."""
+        screenshot, bounding_box = await self._run_in_executor(
+            self._clean_screenshot, bounding_box
+        )
+        return await self.read_image_async(
+            screenshot,
+            offset=bounding_box[0:2],
+            screen_coordinates=None,
+            search_radius=None,
+        )
+
+    async def read_image_async(
+        self,
+        image,
+        offset: Tuple[int, int] = (0, 0),
+        screen_coordinates: Optional[Tuple[int, int]] = None,
+        search_radius: Optional[int] = None,
+    ):
+        """Awaitable version of read_image.
+
+        CPU-bound stages run in the reader's executor, and the backend is invoked
+        through OcrBackend.run_ocr_async, so several reads can run concurrently.
+        """
+        image = self._image_or_array(image)
+        if (self._scroll_reader or self._tiled_reader) and not self._is_talon_backend():
+            # Incremental reads depend on the previous frame, so run them in order.
+            return await self._run_in_executor(
+                self.read_image, image, offset, screen_coordinates, search_radius
+            )
         search_radius = search_radius or self.search_radius
-        preprocessed_image = self._preprocess(image)
-        result = self._backend.run_ocr(preprocessed_image)
+        result = await self._run_ocr_async(image)
         result = self._adjust_result(result, offset)
+        return self._screen_contents(
+            image, result, offset, screen_coordinates, search_radius
+        )
+
+    def _image_or_array(self, image):
+        """Return PIL and Talon images as-is, and other images as NumPy arrays
+        sharing their memory, with a single channel squeezed out."""
+        if (Image and isinstance(image, Image.Image)) or self._is_talon_backend():
+            return image
+        import numpy as np
+
+        array = np.asarray(image)
+        if array.dtype != np.uint8 or array.ndim not in (2, 3):
+            raise TypeError(f"Unsupported image: {type(image).__name__}")
+        if array.ndim == 3 and array.shape[2] == 1:
+            # PIL can't convert (height, width, 1) arrays.
+            array = array[:, :, 0]
+        return array
+
+    def _screen_contents(
+        self,
+        image,
+        result: _base.OcrResult,
+        offset: Tuple[int, int],
+        screen_coordinates: Optional[Tuple[int, int]],
+        search_radius: Optional[int],
+    ) -> "ScreenContents":
         return ScreenContents(
             screen_coordinates=screen_coordinates,
             screen_offset=offset,
@@ -249,10 +570,132 @@ class Reader:
             search_radius=search_radius,
         )
 
+    async def _run_ocr_async(self, image) -> _base.OcrResult:
+        """Awaitable version of _run_ocr."""
+        key = None
+        if self.cache is not None:
+            key = await self._run_in_executor(
+                self.cache.key, image, self._cache_params()
+            )
+            # Persistent caches may wait on the database.
+            result = (
+                None
+                if key is None
+                else await self._run_in_executor(self.cache.get, key)
+            )
+            if result is not None:
+                return result
+        # The backend may still be using the image after another read on the same
+        # executor thread begins, so a reused canvas isn't safe.
+        preprocessed_image = await self._run_in_executor(self._preprocess, image, False)
+        result = await self._backend.run_ocr_async(preprocessed_image, self.executor)
+        if key is not None:
+            await self._run_in_executor(self.cache.put, key, result)
+        return result
+
+    def _run_in_executor(self, function, *args) -> "asyncio.Future":
+        # Imported here to keep import screen_ocr fast.
+        import asyncio
+
+        return asyncio.get_running_loop().run_in_executor(
+            self.executor, function, *args
+        )
+
+    def _run_ocr(self, image) -> _base.OcrResult:
+        """Return the backend result for the image, using the cache if enabled."""
+        if self.cache is None:
+            return self._backend.run_ocr(self._preprocess(image))
+        key = self.cache.key(image, self._cache_params())
+        if key is None:
+            return self._backend.run_ocr(self._preprocess(image))
+        result = self.cache.get(key)
+        if result is None:
+            result = self._backend.run_ocr(self._preprocess(image))
+            self.cache.put(key, result)
+        return result
+
+    def _run_ocr_batch(self, images: Sequence[Any]) -> List[_base.OcrResult]:
+        """Return the backend result for each image, recognizing those not in the
+        cache as one batch.
+
+        Backends that don't recognize batches natively read the images one at a
+        time instead, so that only one preprocessed image is held at once and
+        canvases are reused.
+        """
+        if not self._recognizes_batches():
+            return [self._run_ocr(image) for image in images]
+        keys = [
+            None if self.cache is None else self.cache.key(image, self._cache_params())
+            for image in images
+        ]
+        results = [None if key is None else self.cache.get(key) for key in keys]
+        misses = [i for i, result in enumerate(results) if result is None]
+        if misses:
+            # All images are preprocessed before the backend runs, so canvases
+            # can't be reused.
+            batch_results = self._backend.run_ocr_batch(
+                [self._preprocess(images[i], reuse_canvas=False) for i in misses]
+            )
+            for i, result in zip(misses, batch_results):
+                results[i] = result
+                if keys[i] is not None:
+                    self.cache.put(keys[i], result)
+        return results
+
+    def _recognizes_batches(self) -> bool:
+        return type(self._backend).run_ocr_batch is not _base.OcrBackend.run_ocr_batch
+
+    def _read_incremental(self, image) -> _base.OcrResult:
+        """Return the result for the image in image coordinates, reusing previous
+        results where possible."""
+        if self._scroll_reader:
+            return self._scroll_reader.read(
+                image, self._read_tile, self._read_unscrolled
+            )
+        return self._read_unscrolled(image)
+
+    def _read_unscrolled(self, image) -> _base.OcrResult:
+        if self._tiled_reader:
+            return self._tiled_reader.read(image, self._read_tiles)
+        return self._read_tile(image, (0, 0))
+
+    def _read_tile(self, tile, offset: Tuple[int, int]) -> _base.OcrResult:
+        return self._adjust_result(self._run_ocr(tile), offset)
+
+    def _read_tiles(
+        self, tiles: Sequence[Tuple[Any, Tuple[int, int]]]
+    ) -> List[_base.OcrResult]:
+        results = self._run_ocr_batch([tile for tile, _ in tiles])
+        return [
+            self._adjust_result(result, offset)
+            for result, (_, offset) in zip(results, tiles)
+        ]
+
+    def _cache_params(self) -> Optional[Hashable]:
+        # Everything that affects the backend result besides the pixels.
+        if self.cache.persistent:
+            # The backend must be identified the same way in every process.
+            backend_key = self._backend.cache_key()
+            if backend_key is None:
+                return None
+        else:
+            backend_key = id(self._backend)
+        return (
+            backend_key,
+            self.margin,
+            self.resize_factor,
+            self.resize_method,
+        )
+
     # TODO: Refactor methods into backend instead of using this.
     def _is_talon_backend(self):
+        _talon = _loaded_backend("talon")
         return _talon and isinstance(self._backend, _talon.TalonBackend)
 
+    def _is_tesseract_backend(self):
+        _tesseract = _loaded_backend("tesseract")
+        return _tesseract and isinstance(self._backend, _tesseract.TesseractBackend)
+
     def _clean_screenshot(
         self, bounding_box: Optional[BoundingBox]
     ) -> Tuple[Any, BoundingBox]:
@@ -317,6 +760,13 @@ class Reader:
     def _adjust_result(
         self, result: _base.OcrResult, offset: Tuple[int, int]
     ) -> _base.OcrResult:
+        if isinstance(result, _base.ColumnarOcrResult):
+            # Results may be cached, so adjust a copy.
+            result = result.copy()
+            result.translate(-self.margin, -self.margin)
+            result.unscale(self.resize_factor)
+            result.translate(*offset)
+            return result
         lines = []
         for line in result.lines:
             words = []
@@ -325,11 +775,57 @@ class Reader:
                 top = (word.top - self.margin) / self.resize_factor + offset[1]
                 width = word.width / self.resize_factor
                 height = word.height / self.resize_factor
-                words.append(_base.OcrWord(word.text, left, top, width, height))
+                words.append(
+                    _base.OcrWord(word.text, left, top, width, height, word.confidence)
+                )
             lines.append(_base.OcrLine(words))
         return _base.OcrResult(lines)
 
-    def _preprocess(self, image):
+    @staticmethod
+    def _translate_result(
+        result: _base.OcrResult, offset: Tuple[int, int]
+    ) -> _base.OcrResult:
+        if isinstance(result, _base.ColumnarOcrResult):
+            result = result.copy()
+            result.translate(*offset)
+            return result
+        return _base.OcrResult(
+            [
+                _base.OcrLine(
+                    [
+                        _base.OcrWord(
+                            word.text,
+                            word.left + offset[0],
+                            word.top + offset[1],
+                            word.width,
+                            word.height,
+                            word.confidence,
+                        )
+                        for word in line.words
+                    ]
+                )
+                for line in result.lines
+            ]
+        )
+
+    def _preprocess(self, image, reuse_canvas: bool = True):
+        """Return the resized image with a white margin, as the backend expects.
+
+        Backends that accept arrays receive a NumPy array. An array that doesn't
+        need to be resized is passed through, or copied once to add the margin.
+
+        If reuse_canvas is True, the returned image may be overwritten by the next
+        call on the same thread with the same output size, so it must not be used
+        after the backend returns.
+        """
+        if (
+            not (Image and isinstance(image, Image.Image))
+            and not self._is_talon_backend()
+        ):
+            if self.resize_factor == 1 and self._backend.accepts_arrays:
+                return self._preprocess_array(image, reuse_canvas)
+            assert Image
+            image = Image.fromarray(image)
         if self.resize_factor != 1:
             new_size = (
                 image.size[0] * self.resize_factor,
@@ -338,14 +834,92 @@ class Reader:
             image = image.resize(new_size, self.resize_method)
         if self.debug_image_callback:
             self.debug_image_callback("debug_resized", image)
-        if self.margin:
+        if self._is_talon_backend():
+            if self.margin:
+                assert ImageOps
+                image = ImageOps.expand(image, self.margin, "white")
+            return image
+        if self.margin and image.mode not in _CANVAS_MODES:
+            # Pasting into a new image would lose the palette of e.g. "P" images.
             assert ImageOps
             image = ImageOps.expand(image, self.margin, "white")
-        if not self._is_talon_backend():
+        elif self.margin:
+            size = (
+                image.size[0] + 2 * self.margin,
+                image.size[1] + 2 * self.margin,
+            )
+            assert Image
+            create = functools.partial(Image.new, image.mode, size, "white")
+            canvas = (
+                self._canvases.get((image.mode, size), create)
+                if reuse_canvas
+                else create()
+            )
+            # Only the interior is overwritten, so the margin stays white.
+            canvas.paste(image, (self.margin, self.margin))
+            image = canvas
+        else:
             # Ensure consistent performance measurements.
             image.load()
+        if self._backend.accepts_arrays:
+            # Already imported by the backend.
+            import numpy as np
+
+            return np.asarray(image)
         return image
 
+    def _preprocess_array(self, array, reuse_canvas: bool):
+        if self.debug_image_callback:
+            self.debug_image_callback("debug_resized", Image.fromarray(array))
+        if not self.margin:
+            return array
+        # Already imported by the backend.
+        import numpy as np
+
+        height, width = array.shape[:2]
+        shape = (height + 2 * self.margin, width + 2 * self.margin) + array.shape[2:]
+        create = functools.partial(np.full, shape, 255, array.dtype)
+        canvas = (
+            self._canvases.get((array.dtype.str, shape), create)
+            if reuse_canvas
+            else create()
+        )
+        # Only the interior is overwritten, so the margin stays white.
+        canvas[
+            self.margin : self.margin + height, self.margin : self.margin + width
+        ] = array
+        return canvas
+
+
+# Image modes whose margin canvas can be reused. Images in other modes, e.g. with
+# a palette, are expanded instead.
+_CANVAS_MODES = ("RGB", "RGBA", "L")
+
+
+class _CanvasCache(threading.local):
+    """White images or arrays used to add a margin without allocating, by mode
+    and size.
+
+    Thread-local, since each canvas is overwritten by the next read of the same
+    size on the thread.
+    """
+
+    max_entries = 4
+
+    def __init__(self):
+        self._canvases = OrderedDict()
+
+    def get(self, key: Hashable, create: Callable[[], Any]):
+        canvas = self._canvases.get(key)
+        if canvas is None:
+            canvas = create()
+            self._canvases[key] = canvas
+            if len(self._canvases) > self.max_entries:
+                self._canvases.popitem(last=False)
+        else:
+            self._canvases.move_to_end(key)
+        return canvas
+
 
 def default_homophones() -> Mapping[str, Iterable[str]]:
     homophone_list = [
@@ -436,6 +1010,55 @@ class ScreenContents:
             self._search_radius_squared = search_radius * search_radius
         else:
             self.search_radius = None
+        self._index: Optional[_CandidateIndex] = None
+
+    def to_bytes(self) -> bytes:
+        """Return a compact binary encoding of the result and metadata, for
+        storage or passing to other processes. The screenshot and homophones are
+        not included; see from_bytes."""
+        return _serialization.encode_contents(
+            self.result,
+            self.screen_offset,
+            self.screen_coordinates,
+            self.confidence_threshold,
+            self.search_radius,
+        )
+
+    @classmethod
+    def from_bytes(
+        cls,
+        buffer,
+        homophones: Optional[Mapping[str, Iterable[str]]] = None,
+        screenshot=None,
+    ) -> "ScreenContents":
+        """Return the contents encoded by to_bytes.
+
+        Arguments:
+        buffer: A bytes-like object, e.g. bytes, a memoryview or an mmap. The
+          result may be a view of it rather than a copy; see decode_result.
+        homophones: As passed to Reader. Defaults to default_homophones().
+        screenshot: The screenshot, if available.
+        """
+        (
+            result,
+            screen_offset,
+            screen_coordinates,
+            confidence_threshold,
+            search_radius,
+        ) = _serialization.decode_contents(buffer)
+        return cls(
+            screen_coordinates=screen_coordinates,
+            screen_offset=screen_offset,
+            screenshot=screenshot,
+            result=result,
+            confidence_threshold=confidence_threshold,
+            homophones=(
+                cls._normalize_homophones(homophones)
+                if homophones
+                else default_homophones()
+            ),
+            search_radius=search_radius,
+        )
 
     def as_string(self) -> str:
         """Return the contents formatted as a string."""
@@ -513,6 +1136,34 @@ class ScreenContents:
         ]
         return min(distance_to_words, key=lambda x: x[0])[1]
 
+    def nearest_word_locations(
+        self, k: int = 1, coordinates: Optional[Tuple[int, int]] = None
+    ) -> Sequence[WordLocation]:
+        """Return the locations of the k subwords nearest the coordinates, nearest
+        first.
+
+        Arguments:
+        k: Maximum number of locations to return.
+        coordinates: Defaults to screen_coordinates.
+        """
+        coordinates = coordinates or self.screen_coordinates
+        if not coordinates:
+            # "Nearest" is undefined.
+            return []
+        index = self._candidate_index()
+        if _vectorized_scoring_available():
+            nearest = index.arrays().grid(1).nearest(*coordinates, k).tolist()
+        else:
+            nearest = sorted(
+                range(len(index.locations)),
+                key=lambda i: self._distance_squared(
+                    (index.locations[i].left + index.locations[i].right) / 2.0,
+                    (index.locations[i].top + index.locations[i].bottom) / 2.0,
+                    *coordinates,
+                ),
+            )[:k]
+        return [index.locations[i] for i in nearest]
+
     # Special-case "0k" which frequently shows up instead of the correct "OK".
     _SUBWORD_REGEX = re.compile(r"(\b0[Kk]\b|[A-Z][A-Z]+|[A-Za-z'][a-z']*|.)")
 
@@ -521,34 +1172,57 @@ class ScreenContents:
 
         Uses fuzzy matching.
         """
-        if not target:
+        return self.find_matching_words_batch([target])[target]
+
+    def find_matching_words_batch(
+        self, targets: Iterable[str]
+    ) -> Mapping[str, Sequence[Sequence[WordLocation]]]:
+        """Return the locations of all sequences of each of the provided targets,
+        as find_matching_words would.
+
+        Faster than calling find_matching_words for each target, because
+        candidates are scored against all the targets at once.
+        """
+        targets = list(dict.fromkeys(targets))
+        if not all(targets):
             raise ValueError("target is empty")
-        target_words = list(
-            map(
-                self._normalize,
-                (
-                    subword
-                    for word in target.split()
-                    for subword in re.findall(self._SUBWORD_REGEX, word)
-                ),
-            )
-        )
+        if not targets:
+            return {}
+        targets_words = [
+            [
+                self._normalize(subword)
+                for word in target.split()
+                for subword in re.findall(self._SUBWORD_REGEX, word)
+            ]
+            for target in targets
+        ]
         # First, find all matches tied for highest score.
-        scored_words = [
-            (self._score_words(candidates, target_words), candidates)
-            for candidates in self._generate_candidates(self.result, len(target_words))
+        index = self._candidate_index()
+        if _vectorized_scoring_available():
+            # Already limited to the search radius.
+            targets_windows = self._best_windows_vectorized(index, targets_words)
+            return {
+                target: [index.candidates(start, end) for start, end in best_windows]
+                for target, best_windows in zip(targets, targets_windows)
+            }
+        targets_windows = [
+            self._best_windows(index, target_words) for target_words in targets_words
         ]
-        # print("\n".join(map(str, scored_words)))
-        scored_words = [words for words in scored_words if words[0]]
-        if not scored_words:
-            return []
-        max_score = max(score for score, _ in scored_words)
-        best_matches = [words for score, words in scored_words if score == max_score]
+        return {
+            target: self._filter_by_search_radius(
+                [index.candidates(start, end) for start, end in best_windows]
+            )
+            for target, best_windows in zip(targets, targets_windows)
+        }
+
+    def _filter_by_search_radius(
+        self, matches: List[Sequence[WordLocation]]
+    ) -> List[Sequence[WordLocation]]:
         if not self.search_radius or not self.screen_coordinates:
-            return best_matches
+            return matches
         return [
             words
-            for words in best_matches
+            for words in matches
             if self._distance_squared(
                 (words[0].left + words[-1].right) / 2.0,
                 (words[0].top + words[-1].bottom) / 2.0,
@@ -557,6 +1231,273 @@ class ScreenContents:
             <= self._search_radius_squared
         ]
 
+    def _best_windows(
+        self, index: "_CandidateIndex", target_words: Sequence[str], prune: bool = True
+    ) -> List[Tuple[int, int]]:
+        """Return the candidate ranges tied for the highest score, in order.
+
+        If prune is True, windows that provably can't reach the threshold are
+        skipped without scoring them. Only disabled for benchmarking.
+        """
+        texts = index.texts
+        threshold = self.confidence_threshold
+        max_length = index.max_length
+        joined_length = sum(map(len, target_words))
+        # Upper bounds on _score_word by candidate length, to skip windows that
+        # can't reach the threshold without scoring them.
+        single_bounds = self._score_bounds("".join(target_words), max_length)
+        word_bounds = [
+            self._score_bounds(target_word, max_length) for target_word in target_words
+        ]
+        scored_windows = []
+        for start, end in index.windows(len(target_words)):
+            window_texts = texts[start:end]
+            if prune:
+                if end - start == 1:
+                    bound = single_bounds[len(window_texts[0])]
+                else:
+                    bound = 0.0
+                    for bounds, text, target_word in zip(
+                        word_bounds, window_texts, target_words
+                    ):
+                        bound += bounds[len(text)] * len(target_word)
+                    bound /= joined_length
+                if bound < threshold:
+                    continue
+            score = self._score_words(window_texts, target_words)
+            if score:
+                scored_windows.append((score, start, end))
+        if not scored_windows:
+            return []
+        max_score = max(score for score, _, _ in scored_windows)
+        return [
+            (start, end) for score, start, end in scored_windows if score == max_score
+        ]
+
+    def _best_windows_vectorized(
+        self,
+        index: "_CandidateIndex",
+        targets_words: Sequence[Sequence[str]],
+        prune: bool = True,
+    ) -> List[List[Tuple[int, int]]]:
+        """Equivalent to _best_windows followed by _filter_by_search_radius for
+        each target, but scores each distinct candidate text against all the
+        target subwords once with rapidfuzz.process.cdist, and assembles window
+        scores with NumPy."""
+        import numpy as np
+        from rapidfuzz import process
+
+        arrays = index.arrays()
+        # Each target is scored against its words smashed together (for single
+        # candidates) and, if it has several, each of its words. Each query is
+        # scored in row query_rows[query] of scores.
+        query_rows: Dict[str, int] = {}
+        targets_rows = []
+        single_queries = set()
+        window_queries = set()
+        for target_words in targets_words:
+            joined = "".join(target_words)
+            rows = [query_rows.setdefault(joined, len(query_rows))]
+            if len(target_words) > 1:
+                window_queries.add(joined)
+                window_queries.update(target_words)
+                rows.extend(
+                    query_rows.setdefault(word, len(query_rows))
+                    for word in target_words
+                )
+            else:
+                single_queries.add(joined)
+            targets_rows.append(rows)
+        query_homophones = [
+            self.homophones.get(query, (query,)) for query in query_rows
+        ]
+        homophones = list(dict.fromkeys(h for hs in query_homophones for h in hs))
+        homophone_rows = {homophone: i for i, homophone in enumerate(homophones)}
+        # Don't filter to full confidence threshold yet in case of multiple words.
+        cutoff = self.confidence_threshold / 2 * 100
+
+        def score_ratios(queries, choices):
+            return process.cdist(
+                queries,
+                choices,
+                scorer=fuzz.ratio,
+                score_cutoff=cutoff,
+                dtype=np.float64,
+                # Starting threads costs more than typical queries take.
+                workers=(
+                    -1 if len(queries) * len(choices) >= _PARALLEL_SCORING_PAIRS else 1
+                ),
+            )
+
+        # Single candidates must reach the full threshold on their own, which
+        # few texts can, so only texts that might are scored against homophones
+        # used just for them. The others score 0. Pruning windows of several
+        # words at half the threshold doesn't pay for itself.
+        pruned_homophones = set()
+        if prune:
+            pruned_homophones.update(
+                *(self.homophones.get(query, (query,)) for query in single_queries)
+            )
+            pruned_homophones.difference_update(
+                *(self.homophones.get(query, (query,)) for query in window_queries)
+            )
+        if pruned_homophones:
+            ratios = np.zeros((len(homophones), len(arrays.texts)))
+            rows = []
+            for row, homophone in enumerate(homophones):
+                if homophone not in pruned_homophones:
+                    rows.append(row)
+                    continue
+                text_ids = arrays.possible_matches(homophone, cutoff * 2)
+                if len(text_ids):
+                    ratios[row, text_ids] = score_ratios(
+                        [homophone], arrays.texts[text_ids]
+                    )[0]
+            if rows:
+                ratios[rows] = score_ratios(
+                    [homophones[row] for row in rows], index.distinct_texts
+                )
+        else:
+            ratios = score_ratios(homophones, index.distinct_texts)
+        # scores[i, j] is _score_word(texts[j], query), where i is
+        # query_rows[query] and j is a candidate.
+        scores = (
+            np.stack(
+                [
+                    ratios[[homophone_rows[h] for h in hs]].max(axis=0)
+                    for hs in query_homophones
+                ]
+            )
+            / 100.0
+        )[:, arrays.text_ids]
+        # Targets are scored in groups with the same number of words, which
+        # share windows.
+        groups: Dict[int, List[int]] = {}
+        for i, target_words in enumerate(targets_words):
+            groups.setdefault(len(target_words), []).append(i)
+        targets_windows: List[List[Tuple[int, int]]] = [[] for _ in targets_words]
+        for length, members in groups.items():
+            rows = np.array([targets_rows[i] for i in members], np.intp)
+            window_scores = [scores[rows[:, 0]]]
+            window_starts = [arrays.window_starts(1)]
+            if length > 1:
+                starts = arrays.window_starts(length)
+                word_lengths = np.array(
+                    [list(map(len, targets_words[i])) for i in members], np.intp
+                )
+                # Accumulate in the same order as _score_words for identical
+                # results.
+                total = scores[rows[:, 1:2], starts] * word_lengths[:, 0:1]
+                for k in range(1, length):
+                    total += (
+                        scores[rows[:, k + 1 : k + 2], starts + k]
+                        * word_lengths[:, k : k + 1]
+                    )
+                window_scores.append(total / word_lengths.sum(axis=1, keepdims=True))
+                window_starts.append(starts)
+            for i, best_windows in zip(
+                members,
+                self._max_windows(arrays, length, window_scores, window_starts),
+            ):
+                targets_windows[i] = best_windows
+        return targets_windows
+
+    def _max_windows(
+        self,
+        arrays: "_CandidateArrays",
+        length: int,
+        window_scores: Sequence[Any],
+        window_starts: Sequence[Any],
+    ) -> List[List[Tuple[int, int]]]:
+        """Return the ranges tied for the highest score above the threshold for
+        each row of scores, within the search radius, in the order of
+        _CandidateIndex.windows.
+
+        window_scores[0] has rows of scores of single candidates and, for targets
+        of several words, window_scores[1] has rows of scores of the windows of
+        the given length starting at window_starts[1].
+        """
+        import numpy as np
+
+        threshold = self.confidence_threshold
+        window_scores = [
+            np.where((window_score >= threshold) & (window_score != 0), window_score, 0)
+            for window_score in window_scores
+        ]
+        window_lengths = (1, length)[: len(window_scores)]
+        if self.search_radius and self.screen_coordinates:
+            # Only windows within the radius can be returned, but they must be
+            # tied for the highest score on the whole screen.
+            positions = [
+                arrays.grid(window_length).within(
+                    *self.screen_coordinates, self.search_radius
+                )
+                for window_length in window_lengths
+            ]
+            if not any(
+                window_score[:, position].any()
+                for window_score, position in zip(window_scores, positions)
+            ):
+                return [[] for _ in window_scores[0]]
+        else:
+            positions = [slice(None)] * len(window_scores)
+        max_scores = np.max(
+            [window_score.max(axis=1, initial=0) for window_score in window_scores],
+            axis=0,
+        )[:, np.newaxis]
+        targets = []
+        starts = []
+        lengths = []
+        for window_score, window_start, position, window_length in zip(
+            window_scores, window_starts, positions, window_lengths
+        ):
+            target, matched = np.nonzero(
+                (window_score[:, position] == max_scores) & (max_scores != 0)
+            )
+            targets.append(target)
+            starts.append(window_start[position][matched])
+            lengths.append(np.full(len(target), window_length))
+        targets, starts, lengths = map(np.concatenate, (targets, starts, lengths))
+        # By target, then line, with single candidates before windows.
+        order = np.lexsort((starts, lengths, arrays.line_numbers[starts], targets))
+        starts = starts[order]
+        windows = list(zip(starts.tolist(), (starts + lengths[order]).tolist()))
+        bounds = np.searchsorted(targets[order], np.arange(len(max_scores) + 1))
+        return [
+            windows[start:end]
+            for start, end in zip(bounds.tolist(), bounds[1:].tolist())
+        ]
+
+    def _score_bounds(self, normalized_target: str, max_length: int) -> List[float]:
+        """Return upper bounds on _score_word for the target and candidate texts
+        of each length up to max_length.
+
+        fuzz.ratio is 200 * LCS / (total length), and the longest common
+        subsequence is no longer than the shorter string.
+        """
+        cutoff = self.confidence_threshold / 2
+        homophone_lengths = set(
+            map(len, self.homophones.get(normalized_target, (normalized_target,)))
+        )
+        bounds = []
+        for length in range(max_length + 1):
+            # Slightly loose to be robust to rounding.
+            bound = (
+                max(
+                    2 * min(length, h) / (length + h) if length + h else 1.0
+                    for h in homophone_lengths
+                )
+                + 1e-9
+            )
+            bounds.append(bound if bound >= cutoff else 0.0)
+        return bounds
+
+    def _candidate_index(self) -> "_CandidateIndex":
+        """Return the candidate index of the result, building it on first use."""
+        if self._index is None or self._index.result is not self.result:
+            self._index = _CandidateIndex(self.result)
+        return self._index
+
     @staticmethod
     def _generate_candidates(
         result: _base.OcrResult, length: int
@@ -572,20 +1513,28 @@ class ScreenContents:
     @staticmethod
     def _generate_candidates_from_line(line: _base.OcrLine) -> Iterator[WordLocation]:
         for word in line.words:
-            left_offset = 0
-            for match in re.finditer(ScreenContents._SUBWORD_REGEX, word.text):
-                subword = match.group(0)
-                right_offset = len(word.text) - (left_offset + len(subword))
-                yield WordLocation(
-                    left=int(word.left),
-                    top=int(word.top),
-                    width=int(word.width),
-                    height=int(word.height),
-                    left_char_offset=left_offset,
-                    right_char_offset=right_offset,
-                    text=subword,
-                )
-                left_offset += len(subword)
+            yield from ScreenContents._generate_candidates_from_word(
+                word.text, word.left, word.top, word.width, word.height
+            )
+
+    @staticmethod
+    def _generate_candidates_from_word(
+        text: str, left: float, top: float, width: float, height: float
+    ) -> Iterator[WordLocation]:
+        left_offset = 0
+        for match in re.finditer(ScreenContents._SUBWORD_REGEX, text):
+            subword = match.group(0)
+            right_offset = len(text) - (left_offset + len(subword))
+            yield WordLocation(
+                left=int(left),
+                top=int(top),
+                width=int(width),
+                height=int(height),
+                left_char_offset=left_offset,
+                right_char_offset=right_offset,
+                text=subword,
+            )
+            left_offset += len(subword)
 
     @staticmethod
     def _normalize(word: str) -> str:
@@ -604,20 +1553,23 @@ class ScreenContents:
         return new_homophones
 
     def _score_words(
-        self, candidates: Sequence[WordLocation], normalized_targets: Sequence[str]
+        self, candidate_texts: Sequence[str], normalized_targets: Sequence[str]
     ) -> float:
-        if len(candidates) == 1:
+        if len(candidate_texts) == 1:
             # Handle the case where the target words are smashed together.
-            score = self._score_word(candidates[0], "".join(normalized_targets))
+            score = self._score_word(candidate_texts[0], "".join(normalized_targets))
             return score if score >= self.confidence_threshold else 0
-        scores = list(map(self._score_word, candidates, normalized_targets))
-        score = sum(
-            score * len(word) for score, word in zip(scores, normalized_targets)
-        ) / sum(map(len, normalized_targets))
+        scores = list(map(self._score_word, candidate_texts, normalized_targets))
+        # Accumulate in order rather than with sum(), which uses compensated
+        # summation on newer Pythons, so that _best_windows_vectorized matches.
+        score = 0.0
+        for word_score, word in zip(scores, normalized_targets):
+            score += word_score * len(word)
+        score /= sum(map(len, normalized_targets))
         return score if score >= self.confidence_threshold else 0
 
-    def _score_word(self, candidate: WordLocation, normalized_target: str) -> float:
-        candidate_text = self._normalize(candidate.text)
+    def _score_word(self, candidate_text: str, normalized_target: str) -> float:
+        """Score a normalized candidate text against a normalized target."""
         homophones = self.homophones.get(normalized_target, (normalized_target,))
         best_ratio = max(
             fuzz.ratio(
@@ -647,3 +1599,265 @@ class ScreenContents:
         for x in it:
             window.append(x)
             yield tuple(window)
+
+
+# Minimum number of query and candidate text pairs scored with all CPUs.
+_PARALLEL_SCORING_PAIRS = 100_000
+
+
+class _CandidateIndex:
+    """Subword candidates of an OcrResult, tokenized and normalized once so that
+    repeated queries only pay for scoring."""
+
+    def __init__(self, result: _base.OcrResult):
+        self.result = result
+        # Parallel lists indexed by candidate, in reading order.
+        self.locations: List[WordLocation] = []
+        self.texts: List[str] = []
+        # The candidates of line i are [line_starts[i], line_starts[i + 1]).
+        self.line_starts = [0]
+        if isinstance(result, _base.ColumnarOcrResult):
+            # Skip building OcrWord views.
+            lines: Iterable[Iterable[Tuple[str, float, float, float, float]]] = (
+                result.line_rows()
+            )
+        else:
+            lines = (
+                [
+                    (word.text, word.left, word.top, word.width, word.height)
+                    for word in line.words
+                ]
+                for line in result.lines
+            )
+        for words in lines:
+            for word in words:
+                for location in ScreenContents._generate_candidates_from_word(*word):
+                    self.locations.append(location)
+                    self.texts.append(ScreenContents._normalize(location.text))
+            self.line_starts.append(len(self.locations))
+        # Each distinct text is scored once per query. Sorted by length so that
+        # texts of a range of lengths have a range of IDs.
+        self.distinct_texts = sorted(dict.fromkeys(self.texts), key=len)
+        self.max_length = len(self.distinct_texts[-1]) if self.distinct_texts else 0
+        self._arrays: Optional[_CandidateArrays] = None
+
+    def windows(self, length: int) -> Iterator[Tuple[int, int]]:
+        """Yield the (start, end) candidate ranges to score against a target of
+        the given number of subwords, in the order of
+        ScreenContents._generate_candidates."""
+        for start, end in zip(self.line_starts, self.line_starts[1:]):
+            for i in range(start, end):
+                yield i, i + 1
+            if length > 1:
+                for i in range(start, end - length + 1):
+                    yield i, i + length
+
+    def arrays(self) -> "_CandidateArrays":
+        """Return NumPy arrays describing the candidates, building them on first
+        use."""
+        if self._arrays is None:
+            self._arrays = _CandidateArrays(self)
+        return self._arrays
+
+    def candidates(self, start: int, end: int) -> Sequence[WordLocation]:
+        """Return the locations in a range, as _generate_candidates would."""
+        if end - start == 1:
+            return [self.locations[start]]
+        return tuple(self.locations[start:end])
+
+
+class _CandidateArrays:
+    """Per-candidate NumPy arrays of a _CandidateIndex, for vectorized scoring."""
+
+    def __init__(self, index: _CandidateIndex):
+        import numpy as np
+
+        text_ids = {text: i for i, text in enumerate(index.distinct_texts)}
+        self.text_ids = np.array([text_ids[text] for text in index.texts], np.intp)
+        line_lengths = np.diff(index.line_starts)
+        self.line_numbers = np.repeat(np.arange(len(line_lengths)), line_lengths)
+        # End of the line containing each candidate.
+        self.line_ends = np.repeat(
+            np.array(index.line_starts[1:], np.intp), line_lengths
+        )
+        self.lefts, self.tops, self.rights, self.bottoms = (
+            np.array(
+                [
+                    (location.left, location.top, location.right, location.bottom)
+                    for location in index.locations
+                ],
+                np.float64,
+            )
+            .reshape(-1, 4)
+            .T
+        )
+        self._window_starts: Dict[int, Any] = {}
+        self._grids: Dict[int, _GridIndex] = {}
+        # Length-bucketed and character inverted indexes over the distinct texts,
+        # for bounding their scores.
+        self.texts = np.array(index.distinct_texts, object)
+        self.lengths = np.array(list(map(len, index.distinct_texts)), np.intp)
+        postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        for text_id, text in enumerate(index.distinct_texts):
+            for char, count in Counter(text).items():
+                ids, counts = postings.setdefault(char, ([], []))
+                ids.append(text_id)
+                counts.append(count)
+        self.postings = {
+            char: (np.array(ids, np.intp), np.array(counts, np.intp))
+            for char, (ids, counts) in postings.items()
+        }
+
+    def window_starts(self, length: int):
+        """Return the starts of the windows of length candidates within a line."""
+        starts = self._window_starts.get(length)
+        if starts is None:
+            import numpy as np
+
+            starts = np.flatnonzero(
+                np.arange(len(self.line_ends)) + length <= self.line_ends
+            )
+            self._window_starts[length] = starts
+        return starts
+
+    def grid(self, length: int) -> "_GridIndex":
+        """Return a spatial index over the centers of the windows of length
+        candidates, indexed by their position in window_starts(length)."""
+        grid = self._grids.get(length)
+        if grid is None:
+            starts = self.window_starts(length)
+            ends = starts + length - 1
+            # As computed in _filter_by_search_radius.
+            grid = _GridIndex(
+                (self.lefts[starts] + self.rights[ends]) / 2.0,
+                (self.tops[starts] + self.bottoms[ends]) / 2.0,
+            )
+            self._grids[length] = grid
+        return grid
+
+    def possible_matches(self, query: str, cutoff: float):
+        """Return the IDs of the distinct texts whose fuzz.ratio with query may be
+        at least cutoff.
+
+        fuzz.ratio is 200 * LCS / (total length), and the longest common
+        subsequence is bounded by the shorter length and by the characters the
+        strings have in common.
+        """
+        import numpy as np
+
+        query_length = len(query)
+        if not query_length or cutoff <= 0:
+            return np.arange(len(self.lengths))
+        # Slightly loose to be robust to rounding.
+        cutoff -= 1e-6
+        # 200 * min(query_length, length) / (query_length + length) >= cutoff
+        start = self.lengths.searchsorted(query_length * cutoff / (200 - cutoff))
+        end = self.lengths.searchsorted(
+            query_length * (200 - cutoff) / cutoff, side="right"
+        )
+        common = np.zeros(end - start, np.intp)
+        for char, count in Counter(query).items():
+            posting = self.postings.get(char)
+            if posting is None:
+                continue
+            ids, counts = posting
+            first, last = ids.searchsorted([start, end])
+            common[ids[first:last] - start] += np.minimum(counts[first:last], count)
+        bounds = 200 * common / (query_length + self.lengths[start:end])
+        return start + np.flatnonzero(bounds >= cutoff)
+
+
+class _GridIndex:
+    """Uniform grid over points, for finding the points near a location without
+    visiting the others."""
+
+    def __init__(self, xs, ys, points_per_cell: int = 4):
+        import numpy as np
+
+        self.xs = xs
+        self.ys = ys
+        if len(xs):
+            self.x0, self.y0 = xs.min(), ys.min()
+            area = max((xs.max() - self.x0) * (ys.max() - self.y0), 1.0)
+            self.cell_size = max(np.sqrt(area * points_per_cell / len(xs)), 1.0)
+            columns = ((xs - self.x0) // self.cell_size).astype(np.intp)
+            rows = ((ys - self.y0) // self.cell_size).astype(np.intp)
+            self.columns = columns.max() + 1
+            self.rows = rows.max() + 1
+            cells = rows * self.columns + columns
+        else:
+            self.x0 = self.y0 = 0.0
+            self.cell_size = 1.0
+            self.columns = self.rows = 0
+            cells = np.zeros(0, np.intp)
+        # Points sorted by cell, with the points of cell i at
+        # order[cell_starts[i]:cell_starts[i + 1]].
+        self.order = np.argsort(cells, kind="stable")
+        self.cell_starts = np.searchsorted(
+            cells[self.order], np.arange(self.rows * self.columns + 1)
+        )
+
+    def within(self, x: float, y: float, radius: float):
+        """Return the indices of the points within radius of (x, y), in order."""
+        import numpy as np
+
+        columns = self._cell_range(x - self.x0, radius, self.columns)
+        rows = self._cell_range(y - self.y0, radius, self.rows)
+        if not columns or not rows:
+            return np.zeros(0, np.intp)
+        # The cells of each row of the grid are contiguous in order.
+        points = np.concatenate(
+            [
+                self.order[
+                    self.cell_starts[
+                        row * self.columns + columns.start
+                    ] : self.cell_starts[row * self.columns + columns.stop]
+                ]
+                for row in rows
+            ]
+        )
+        x_distances = self.xs[points] - x
+        y_distances = self.ys[points] - y
+        points = points[
+            x_distances * x_distances + y_distances * y_distances <= radius * radius
+        ]
+        points.sort()
+        return points
+
+    def _cell_range(self, offset: float, radius: float, count: int) -> range:
+        """Return the range of cells along an axis within radius of offset."""
+        first = max(int((offset - radius) // self.cell_size), 0)
+        last = min(int((offset + radius) // self.cell_size), count - 1)
+        return range(first, last + 1)
+
+    def nearest(self, x: float, y: float, k: int = 1):
+        """Return the indices of the k points nearest (x, y), nearest first."""
+        import numpy as np
+
+        k = min(k, len(self.xs))
+        if not k:
+            return np.zeros(0, np.intp)
+        # Grow a search radius until it contains k points. The distance to the
+        # grid bounds the first radius that can.
+        radius = max(
+            self.cell_size,
+            np.hypot(
+                max(self.x0 - x, 0, x - (self.x0 + self.columns * self.cell_size)),
+                max(self.y0 - y, 0, y - (self.y0 + self.rows * self.cell_size)),
+            ),
+        )
+        while True:
+            points = self.within(x, y, radius)
+            if len(points) >= k:
+                break
+            radius *= 2
+        x_distances = self.xs[points] - x
+        y_distances = self.ys[points] - y
+        distances = x_distances * x_distances + y_distances * y_distances
+        # Ties are broken by index.
+        return points[np.lexsort((points, distances))[:k]]
+
+
+@functools.lru_cache(maxsize=None)
+def _vectorized_scoring_available() -> bool:
+    return importlib.util.find_spec("numpy") is not None
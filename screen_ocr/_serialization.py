@@ -0,0 +1,274 @@
+"""Compact binary encoding of OCR results.
+
+An encoded result is a fixed header followed by packed little-endian arrays and
+the UTF-8 text of all words:
+
+  header       magic b"SOCR", version, flags, word count, line count and text size
+  confidences  float64 per word, if the result has them
+  boxes        lefts, then tops, widths and heights: float32 if encoded from a
+               ColumnarOcrResult with float32 boxes, otherwise float64
+  text offsets uint32 per word plus one, in characters of the text
+  line starts  uint32 per line plus one, in words
+  text         UTF-8
+
+Coordinates are stored at the precision of the result, so they decode exactly.
+Sections start at multiples of 8 bytes, so when NumPy is installed the arrays of
+a decoded result are read-only views of the buffer rather than copies.
+"""
+
+import struct
+from typing import Any, List, Optional, Tuple
+
+from . import _base
+
+_RESULT_MAGIC = b"SOCR"
+_RESULT_VERSION = 1
+# Magic, version, flags, reserved, word count, line count, text size, reserved.
+_RESULT_HEADER = struct.Struct("<4sBBHIIII")
+_HAS_CONFIDENCES = 1
+_FLOAT64_BOXES = 2
+
+_CONTENTS_MAGIC = b"SOCC"
+_CONTENTS_VERSION = 1
+# Magic, version, flags, reserved, confidence threshold, screen offset, screen
+# coordinates, search radius, reserved. Followed by the encoded result.
+_CONTENTS_HEADER = struct.Struct("<4sBBHdiiiiII")
+_HAS_SCREEN_COORDINATES = 1
+_HAS_SEARCH_RADIUS = 2
+
+
+def encode_result(result: _base.OcrResult) -> bytes:
+    """Return the binary encoding of an OcrResult."""
+    if isinstance(result, _base.ColumnarOcrResult):
+        float64_boxes = result.boxes.dtype.itemsize == 8
+        return _encode_sections(
+            result.text,
+            len(result.text_offsets) - 1,
+            len(result.line_starts) - 1,
+            (
+                None
+                if result.confidences is None
+                else result.confidences.astype("<f8").tobytes()
+            ),
+            result.boxes.astype("<f8" if float64_boxes else "<f4").tobytes(),
+            float64_boxes,
+            result.text_offsets.astype("<u4").tobytes(),
+            result.line_starts.astype("<u4").tobytes(),
+        )
+    texts = []
+    boxes: Tuple[List[float], ...] = ([], [], [], [])
+    confidences = []
+    line_starts = [0]
+    for line in result.lines:
+        for word in line.words:
+            texts.append(word.text)
+            for column, value in zip(
+                boxes, (word.left, word.top, word.width, word.height)
+            ):
+                column.append(value)
+            confidences.append(word.confidence)
+        line_starts.append(len(texts))
+    text_offsets = [0]
+    for text in texts:
+        text_offsets.append(text_offsets[-1] + len(text))
+    words = len(texts)
+    return _encode_sections(
+        "".join(texts),
+        words,
+        len(line_starts) - 1,
+        (None if None in confidences else struct.pack(f"<{words}d", *confidences)),
+        struct.pack(f"<{4 * words}d", *boxes[0], *boxes[1], *boxes[2], *boxes[3]),
+        True,
+        struct.pack(f"<{words + 1}I", *text_offsets),
+        struct.pack(f"<{len(line_starts)}I", *line_starts),
+    )
+
+
+def _encode_sections(
+    text: str,
+    words: int,
+    lines: int,
+    confidences: Optional[bytes],
+    boxes: bytes,
+    float64_boxes: bool,
+    text_offsets: bytes,
+    line_starts: bytes,
+) -> bytes:
+    encoded_text = text.encode("utf-8")
+    parts = [
+        _RESULT_HEADER.pack(
+            _RESULT_MAGIC,
+            _RESULT_VERSION,
+            (_HAS_CONFIDENCES if confidences is not None else 0)
+            | (_FLOAT64_BOXES if float64_boxes else 0),
+            0,
+            words,
+            lines,
+            len(encoded_text),
+            0,
+        )
+    ]
+    if confidences is not None:
+        parts.append(confidences)
+    for section in (boxes, text_offsets, line_starts):
+        parts.append(section)
+        parts.append(bytes(-len(section) % 8))
+    parts.append(encoded_text)
+    return b"".join(parts)
+
+
+def _padded(size: int) -> int:
+    return size + -size % 8
+
+
+def decode_result(buffer: Any) -> _base.OcrResult:
+    """Return the OcrResult encoded at the start of a bytes-like object, e.g.
+    bytes, a memoryview or an mmap.
+
+    With NumPy, a ColumnarOcrResult is returned whose arrays are views of the
+    buffer, which must not be modified while the result is in use. Otherwise a
+    dataclass OcrResult is returned.
+    """
+    return _decode_result(memoryview(buffer).cast("B"))[0]
+
+
+def _decode_result(view: memoryview) -> Tuple[_base.OcrResult, int]:
+    """Return the result at the start of the view and its encoded size."""
+    if len(view) < _RESULT_HEADER.size:
+        raise ValueError("Encoded OcrResult is truncated.")
+    magic, version, flags, _, words, lines, text_size, _ = _RESULT_HEADER.unpack_from(
+        view
+    )
+    if magic != _RESULT_MAGIC:
+        raise ValueError("Not an encoded OcrResult.")
+    if version != _RESULT_VERSION:
+        raise ValueError(f"Unsupported OcrResult encoding version: {version}")
+    # Offsets of each section, and of the end.
+    box_type = "d" if flags & _FLOAT64_BOXES else "f"
+    offsets = [_RESULT_HEADER.size]
+    sizes = [
+        8 * words if flags & _HAS_CONFIDENCES else 0,
+        _padded(4 * words * struct.calcsize(box_type)),
+        _padded(4 * (words + 1)),
+        _padded(4 * (lines + 1)),
+        text_size,
+    ]
+    for size in sizes:
+        offsets.append(offsets[-1] + size)
+    if len(view) < offsets[-1]:
+        raise ValueError("Encoded OcrResult is truncated.")
+    text = str(view[offsets[4] : offsets[5]], "utf-8")
+    try:
+        import numpy as np
+    except ImportError:
+        return (
+            _decode_dataclasses(view, flags, box_type, words, lines, offsets, text),
+            offsets[-1],
+        )
+
+    confidences = (
+        np.frombuffer(view, "<f8", words, offsets[0])
+        if flags & _HAS_CONFIDENCES
+        else None
+    )
+    result = _base.ColumnarOcrResult(
+        text,
+        np.frombuffer(view, "<u4", words + 1, offsets[2]),
+        np.frombuffer(view, "<" + box_type, 4 * words, offsets[1]),
+        np.frombuffer(view, "<u4", lines + 1, offsets[3]),
+        confidences,
+    )
+    return result, offsets[-1]
+
+
+def _decode_dataclasses(
+    view, flags, box_type, words, lines, offsets, text
+) -> _base.OcrResult:
+    if flags & _HAS_CONFIDENCES:
+        confidences = struct.unpack_from(f"<{words}d", view, offsets[0])
+    else:
+        confidences = (None,) * words
+    boxes = struct.unpack_from(f"<{4 * words}{box_type}", view, offsets[1])
+    text_offsets = struct.unpack_from(f"<{words + 1}I", view, offsets[2])
+    line_starts = struct.unpack_from(f"<{lines + 1}I", view, offsets[3])
+    all_words = [
+        _base.OcrWord(
+            text[text_offsets[i] : text_offsets[i + 1]],
+            boxes[i],
+            boxes[words + i],
+            boxes[2 * words + i],
+            boxes[3 * words + i],
+            confidences[i],
+        )
+        for i in range(words)
+    ]
+    return _base.OcrResult(
+        [
+            _base.OcrLine(all_words[start:end])
+            for start, end in zip(line_starts, line_starts[1:])
+        ]
+    )
+
+
+def encode_contents(
+    result: _base.OcrResult,
+    screen_offset: Tuple[int, int],
+    screen_coordinates,
+    confidence_threshold: float,
+    search_radius,
+) -> bytes:
+    """Return the binary encoding of ScreenContents metadata and its result."""
+    flags = 0
+    if screen_coordinates is not None:
+        flags |= _HAS_SCREEN_COORDINATES
+    else:
+        screen_coordinates = (0, 0)
+    if search_radius:
+        flags |= _HAS_SEARCH_RADIUS
+    else:
+        search_radius = 0
+    header = _CONTENTS_HEADER.pack(
+        _CONTENTS_MAGIC,
+        _CONTENTS_VERSION,
+        flags,
+        0,
+        confidence_threshold,
+        *map(int, screen_offset),
+        *map(int, screen_coordinates),
+        int(search_radius),
+        0,
+    )
+    return header + encode_result(result)
+
+
+def decode_contents(buffer: Any):
+    """Return (result, screen_offset, screen_coordinates, confidence_threshold,
+    search_radius) encoded by encode_contents."""
+    view = memoryview(buffer).cast("B")
+    if len(view) < _CONTENTS_HEADER.size:
+        raise ValueError("Encoded ScreenContents is truncated.")
+    (
+        magic,
+        version,
+        flags,
+        _,
+        confidence_threshold,
+        offset_x,
+        offset_y,
+        x,
+        y,
+        search_radius,
+        _,
+    ) = _CONTENTS_HEADER.unpack_from(view)
+    if magic != _CONTENTS_MAGIC:
+        raise ValueError("Not an encoded ScreenContents.")
+    if version != _CONTENTS_VERSION:
+        raise ValueError(f"Unsupported ScreenContents encoding version: {version}")
+    result, _ = _decode_result(view[_CONTENTS_HEADER.size :])
+    return (
+        result,
+        (offset_x, offset_y),
+        (x, y) if flags & _HAS_SCREEN_COORDINATES else None,
+        confidence_threshold,
+        search_radius if flags & _HAS_SEARCH_RADIUS else None,
+    )
@@ -7,40 +7,164 @@ from talon.experimental import ocr
 
 from . import _base
 
+# Rects in a batch of _adjust_boxes are at most this many times as tall as the
+# shortest, which bounds the memory spent on padding.
+_MAX_HEIGHT_RATIO = 2
+
 
 class TalonBackend(_base.OcrBackend):
     def run_ocr(self, image):
         results = ocr.ocr(image)
-        array = np.array(image)
-        grayscale = (
-            0.299 * array[:, :, 0] + 0.587 * array[:, :, 1] + 0.114 * array[:, :, 2]
+        words = [
+            [
+                (
+                    match.group(),
+                    functools.reduce(
+                        operator.add,
+                        result.bounds.rects[match.start() : match.end()],
+                    ),
+                )
+                for match in re.finditer(r"\S+", result.text)
+            ]
+            for result in results
+        ]
+        boxes = iter(
+            self._adjust_boxes(
+                [rect for line in words for _, rect in line],
+                self._grayscale(np.asarray(image)),
+                image.rect.x,
+                image.rect.y,
+            )
         )
         lines = [
-            _base.OcrLine(
-                [
-                    _base.OcrWord(
-                        match.group(),
-                        *self._adjust_box(
-                            functools.reduce(
-                                operator.add,
-                                result.bounds.rects[match.start() : match.end()],
-                            ),
-                            grayscale,
-                            image.rect.x,
-                            image.rect.y,
-                        ),
-                    )
-                    for match in re.finditer(r"\S+", result.text)
-                ]
-            )
-            for result in results
+            _base.OcrLine([_base.OcrWord(text, *next(boxes)) for text, _ in line])
+            for line in words
         ]
         return _base.OcrResult(lines)
 
+    @staticmethod
+    def _grayscale(array):
+        """Return 1000 times the luma of the image, as exact integers."""
+        grayscale = np.multiply(array[:, :, 0], 299, dtype=np.int32)
+        grayscale += np.multiply(array[:, :, 1], 587, dtype=np.int32)
+        grayscale += np.multiply(array[:, :, 2], 114, dtype=np.int32)
+        return grayscale
+
+    @classmethod
+    def _adjust_boxes(cls, rects, image, x_offset, y_offset):
+        """Vectorized equivalent of _adjust_box for many rects at once. Returns a
+        list of (left, top, width, height) tuples.
+
+        Rects are adjusted in groups of similar height, since every patch in a
+        group is padded to the height of the tallest.
+        """
+        groups = []
+        for index in sorted(range(len(rects)), key=lambda i: rects[i].height):
+            if not groups or rects[index].height > _MAX_HEIGHT_RATIO * max(
+                rects[groups[-1][0]].height, 1
+            ):
+                groups.append([])
+            groups[-1].append(index)
+        boxes = [None] * len(rects)
+        for group in groups:
+            adjusted = cls._adjust_similar_boxes(
+                [rects[index] for index in group], image, x_offset, y_offset
+            )
+            for index, box in zip(group, adjusted):
+                boxes[index] = box
+        return boxes
+
+    @staticmethod
+    def _adjust_similar_boxes(rects, image, x_offset, y_offset):
+        """Vectorized equivalent of _adjust_box for rects of similar height.
+
+        Each patch is flattened into one column per (rect, image column) pair, so
+        every step is a single NumPy operation over all rects.
+        """
+        if not rects:
+            return []
+        left = np.array([rect.x for rect in rects], dtype=float) - x_offset
+        top = np.array([rect.y for rect in rects], dtype=float) - y_offset
+        width = np.array([rect.width for rect in rects], dtype=float)
+        height = np.array([rect.height for rect in rects], dtype=float)
+        # Same padding and clamping as _adjust_box.
+        padding = 2
+        max_row, max_column = image.shape[0] - 1, image.shape[1] - 1
+        left_column = np.clip(np.round(left).astype(int) - padding, 0, max_column)
+        top_row = np.clip(np.round(top).astype(int), 0, max_row)
+        right_column = np.clip(
+            np.round(left + width - 1).astype(int) + padding, 0, max_column
+        )
+        bottom_row = np.clip(np.round(top + height - 1).astype(int), 0, max_row)
+        patch_widths = np.maximum(right_column - left_column + 1, 1)
+        patch_heights = np.maximum(bottom_row - top_row + 1, 0)
+        sizes = patch_widths * patch_heights
+
+        # One row of patch pixels per (rect, column) pair.
+        starts = np.cumsum(patch_widths) - patch_widths
+        owners = np.repeat(np.arange(len(rects)), patch_widths)
+        positions = np.arange(len(owners)) - starts[owners]
+        row_offsets = np.arange(patch_heights.max())
+        valid = row_offsets < patch_heights[owners, np.newaxis]
+        # Invalid rows are past the bottom of the patch, and read as zero.
+        indices = np.minimum(top_row[owners, np.newaxis] + row_offsets, max_row)
+        indices *= image.shape[1]
+        indices += (left_column[owners] + positions)[:, np.newaxis]
+        values = np.take(image, indices)
+        values[~valid] = 0
+        # Apply mean thresholding to separate text from background. Luma is an
+        # exact integer, so comparing with the float64 mean is exact.
+        sums = np.add.reduceat(values.sum(axis=1), starts)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = sums / sizes
+        thresholded = values > means[owners, np.newaxis]
+        thresholded &= valid
+        column_counts = thresholded.sum(axis=1)
+        # Adjust polarity so that text is True and background is False.
+        inverted = np.add.reduceat(column_counts, starts) >= sizes / 2
+        columns_with_text = np.where(
+            inverted[owners],
+            column_counts < patch_heights[owners],
+            column_counts > 0,
+        )
+
+        # First text after background, from the left and from the right.
+        previous = np.concatenate([[True], columns_with_text[:-1]])
+        following = np.concatenate([columns_with_text[1:], [True]])
+        rises = columns_with_text & ~previous & (positions > 0)
+        falls = columns_with_text & ~following & (positions < patch_widths[owners] - 1)
+        first_rise = np.minimum.reduceat(
+            np.where(rises, positions, len(owners)), starts
+        )
+        first_text = np.where(first_rise < len(owners), first_rise, 0)
+        last_fall = np.maximum.reduceat(np.where(falls, positions, -1), starts)
+        last_text = np.where(last_fall >= 0, last_fall, patch_widths - 1)
+        flipped_first_text = patch_widths - 1 - last_text
+        # Same fix as _adjust_box for whitespace surrounded by text.
+        cut_off = first_text > last_text
+        last_text = np.where(
+            cut_off & (first_text <= flipped_first_text), width - 1, last_text
+        )
+        first_text = np.where(
+            cut_off & (first_text > flipped_first_text),
+            left - left_column,
+            first_text,
+        )
+        return list(
+            zip(
+                (left_column + first_text).tolist(),
+                top.tolist(),
+                (last_text - first_text + 1).tolist(),
+                height.tolist(),
+            )
+        )
+
     @staticmethod
     def _adjust_box(rect, image, x_offset, y_offset):
         """Fix bounding box so it is tight and relative to the cropped image,
         not the full screenshot.
+
+        Reference implementation of _adjust_boxes for a single rect.
         """
         # Adjust coordinates to be relative to the cropped image.
         left = rect.x - x_offset
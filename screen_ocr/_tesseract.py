@@ -1,13 +1,24 @@
+import asyncio
+import dataclasses
+import functools
+import math
+import os
+import subprocess
+import tempfile
+import threading
+from concurrent import futures
+
 import numpy as np
 import pytesseract
-import six
 from PIL import Image
 from skimage import filters, morphology, transform
 
-from . import _base
+from . import _base, _libtesseract
 
 
 class TesseractBackend(_base.OcrBackend):
+    accepts_arrays = True
+
     def __init__(
         self,
         tesseract_data_path=None,
@@ -18,6 +29,11 @@ class TesseractBackend(_base.OcrBackend):
         convert_grayscale=False,
         shift_channels=False,
         debug_image_callback=None,
+        engine="subprocess",
+        library_path=None,
+        bands=1,
+        band_overlap=120,
+        min_band_height=600,
     ):
         self.tesseract_data_path = (
             tesseract_data_path or r"C:\Program Files\Tesseract-OCR\tessdata"
@@ -25,11 +41,16 @@ class TesseractBackend(_base.OcrBackend):
         self.tesseract_command = (
             tesseract_command or r"C:\Program Files\Tesseract-OCR\tesseract.exe"
         )
+        # Avoid lambdas so that the backend can be pickled for process pools.
         if threshold_function == "otsu":
-            self.threshold_function = lambda data: filters.threshold_otsu(data)
+            self.threshold_function = filters.threshold_otsu
         elif threshold_function == "local_otsu":
-            self.threshold_function = lambda data: filters.rank.otsu(
-                data, morphology.square(threshold_block_size)
+            self.threshold_function = functools.partial(
+                _local_otsu, block_size=threshold_block_size
+            )
+        elif threshold_function == "tiled_otsu":
+            self.threshold_function = functools.partial(
+                _tiled_otsu, block_size=threshold_block_size
             )
         else:
             self.threshold_function = threshold_function
@@ -37,39 +58,356 @@ class TesseractBackend(_base.OcrBackend):
         self.convert_grayscale = convert_grayscale
         self.shift_channels = shift_channels
         self.debug_image_callback = debug_image_callback
+        # "subprocess" runs the tesseract binary via pytesseract for each call.
+        # "library" loads libtesseract in-process once per thread.
+        if engine == "library":
+            self._library_engine = _libtesseract.LibraryEngine(
+                self.tesseract_data_path, library_path=library_path
+            )
+        elif engine == "subprocess":
+            self._library_engine = None
+        else:
+            raise ValueError(f"Unsupported Tesseract engine: {engine}")
+        # Large images can be split into horizontal bands that are recognized
+        # concurrently. bands is the maximum number of bands (None to use the
+        # number of CPUs); images are only split into bands of at least
+        # min_band_height pixels. Bands overlap by band_overlap pixels of the
+        # preprocessed image, which must cover at least one line of text.
+        self.bands = bands
+        self.band_overlap = band_overlap
+        self.min_band_height = min_band_height
+        # Created on first use. Its threads are kept, so that each keeps its
+        # initialized library engine.
+        self._band_executor = None
+        self._band_executor_lock = threading.Lock()
+        self._buffers = _Buffers()
+        # Determined on first use by cache_key.
+        self._engine_version = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_buffers"], state["_band_executor"], state["_band_executor_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._band_executor = None
+        self._band_executor_lock = threading.Lock()
+        self._buffers = _Buffers()
+
+    def cache_key(self):
+        threshold_function = _function_key(self.threshold_function)
+        if threshold_function is None and self.threshold_function is not None:
+            return None
+        if self._engine_version is None:
+            try:
+                self._engine_version = self._get_engine_version()
+            except (OSError, subprocess.CalledProcessError):
+                # E.g. the binary isn't installed.
+                return None
+        return repr(
+            (
+                "tesseract",
+                self._engine_version,
+                self.tesseract_data_path,
+                _file_stamp(os.path.join(self.tesseract_data_path, "eng.traineddata")),
+                threshold_function,
+                self.correction_block_size,
+                self.convert_grayscale,
+                self.shift_channels,
+                self.bands or os.cpu_count(),
+                self.band_overlap,
+                self.min_band_height,
+            )
+        )
+
+    def _get_engine_version(self):
+        """Return the engine and its version, which determine its results along
+        with the language data."""
+        if self._library_engine:
+            return (
+                "library",
+                self._library_engine.library_path,
+                self._library_engine.version,
+            )
+        # Not pytesseract.get_tesseract_version, which only runs once per process
+        # regardless of the command.
+        output = subprocess.run(
+            [self.tesseract_command, "--version"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            check=True,
+        ).stdout
+        # E.g. "tesseract 5.3.0".
+        return (
+            "subprocess",
+            self.tesseract_command,
+            (output.decode("utf-8", "replace").splitlines() or [""])[0].strip(),
+        )
 
     def run_ocr(self, image):
         image = self._preprocess(image)
+        bands = self._band_count(_size(image)[1])
+        if bands > 1:
+            return self._recognize_bands(image, bands)
+        return self._recognize(image)
+
+    def _band_count(self, height):
+        bands = self.bands or os.cpu_count() or 1
+        return max(1, min(bands, height // self.min_band_height))
+
+    def _recognize_bands(self, image, bands):
+        """Recognize overlapping horizontal bands of the image concurrently and
+        merge the results."""
+        overlap = self.band_overlap
+        width, height = _size(image)
+        band_height = math.ceil((height + (bands - 1) * overlap) / bands)
+        tops = [
+            min(i * (band_height - overlap), height - band_height) for i in range(bands)
+        ]
+        if isinstance(image, Image.Image):
+            crops = [image.crop((0, top, width, top + band_height)) for top in tops]
+        else:
+            # Views of contiguous rows.
+            crops = [image[top : top + band_height] for top in tops]
+        # Recognition runs outside the GIL, either in a subprocess or libtesseract.
+        results = list(self._get_band_executor().map(self._recognize, crops))
+        return _merge_bands(results, tops, band_height, height, overlap)
+
+    def _get_band_executor(self):
+        with self._band_executor_lock:
+            if not self._band_executor:
+                self._band_executor = futures.ThreadPoolExecutor(
+                    self.bands or os.cpu_count() or 1,
+                    thread_name_prefix="tesseract-band",
+                )
+            return self._band_executor
+
+    def _recognize(self, image):
+        """Return the OcrResult of a preprocessed image."""
+        if self._library_engine:
+            return self._library_engine.recognize(image).sorted_lines()
         tessdata_dir_config = r'--tessdata-dir "{}"'.format(self.tesseract_data_path)
         pytesseract.pytesseract.tesseract_cmd = self.tesseract_command
-        results = pytesseract.image_to_data(
-            image, config=tessdata_dir_config, output_type=pytesseract.Output.DATAFRAME
+        tsv = pytesseract.image_to_data(
+            image, config=tessdata_dir_config, output_type=pytesseract.Output.STRING
         )
+        return self._parse_tsv(tsv)
+
+    async def run_ocr_async(self, image, executor=None):
+        if self._library_engine or self.bands != 1:
+            # Recognition releases the GIL, so a thread is as good as a subprocess.
+            return await super().run_ocr_async(image, executor)
+        loop = asyncio.get_running_loop()
+        image = await loop.run_in_executor(executor, self._preprocess, image)
+        input_filename = await loop.run_in_executor(executor, self._save_image, image)
+        try:
+            # Same arguments pytesseract.image_to_data uses, but writing to stdout.
+            process = await asyncio.create_subprocess_exec(
+                self.tesseract_command,
+                input_filename,
+                "stdout",
+                "-c",
+                "tessedit_create_tsv=1",
+                "--tessdata-dir",
+                self.tesseract_data_path,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            stdout, stderr = await process.communicate()
+        finally:
+            os.remove(input_filename)
+        if process.returncode:
+            raise pytesseract.TesseractError(
+                process.returncode, stderr.decode("utf-8", "replace").strip()
+            )
+        return self._parse_tsv(stdout.decode("utf-8"))
+
+    @staticmethod
+    def _save_image(image):
+        if not isinstance(image, Image.Image):
+            image = Image.fromarray(image)
+        with tempfile.NamedTemporaryFile(
+            prefix="tess_", suffix=".png", delete=False
+        ) as f:
+            image.save(f, format="PNG")
+            return f.name
+
+    @staticmethod
+    def _parse_tsv(tsv):
+        """Parse the TSV output of Tesseract into a ColumnarOcrResult in a single
+        pass."""
+        # Columns: level, page_num, block_num, par_num, line_num, word_num, left,
+        # top, width, height, conf, text. Text may contain spaces but not tabs.
         lines = []
         words = []
-        for _, box in results.iterrows():
+        rows = iter(tsv.splitlines())
+        # Skip header.
+        next(rows, None)
+        for row in rows:
+            level = row[:1]
             # Word
-            if box.level == 5:
-                text = box.text
-                text = (
-                    six.text_type(text, encoding="utf-8")
-                    if isinstance(text, six.binary_type)
-                    else six.text_type(text)
-                )
+            if level == "5":
+                columns = row.split("\t", 11)
                 words.append(
-                    _base.OcrWord(text, box.left, box.top, box.width, box.height)
+                    (
+                        columns[11] if len(columns) > 11 else "",
+                        int(columns[6]),
+                        int(columns[7]),
+                        int(columns[8]),
+                        int(columns[9]),
+                        float(columns[10]),
+                    )
                 )
             # End of line
-            if box.level == 4:
+            elif level == "4":
                 if words:
-                    lines.append(_base.OcrLine(words))
+                    lines.append(words)
                 words = []
         if words:
-            lines.append(_base.OcrLine(words))
-        lines.sort(key=lambda line: (line.words[0].top, line.words[0].left))
-        return _base.OcrResult(lines)
+            lines.append(words)
+        # By top, then left, of the first word.
+        lines.sort(key=lambda line: (line[0][2], line[0][1]))
+        return _base.ColumnarOcrResult.from_rows(lines)
 
     def _preprocess(self, image):
+        # The fused path never materializes the intermediate images, so the
+        # per-channel path is kept for debugging. Images may be PIL images or
+        # arrays.
+        if self.threshold_function and not self.debug_image_callback:
+            return self._preprocess_fused(image)
+        return self._preprocess_channels(image)
+
+    def _preprocess_fused(self, image):
+        """Equivalent to _preprocess_channels, but binarizes each channel in a few
+        vectorized passes.
+
+        Only the channel being binarized, its threshold and the output are the
+        size of the image. Everything else is computed in strips of rows, in
+        scratch buffers that are reused across calls.
+
+        Returns a uint8 array of 0 (text) and 255 (background), which
+        libtesseract can read without conversion.
+        """
+        # Not copied if already an array.
+        data = np.asarray(image)
+        height, width = data.shape[:2]
+        count = 1 if data.ndim == 2 or self.convert_grayscale else 3
+        output = np.empty((height, width), np.uint8)
+        # Each channel is copied into a contiguous, writable plane, which some
+        # threshold functions require, and then overwritten by its mask.
+        plane = np.empty((height, width), np.uint8)
+        try:
+            for i in range(count):
+                if data.ndim == 2:
+                    plane[:] = data
+                elif self.convert_grayscale:
+                    self._fused_grayscale(data, plane)
+                elif self.shift_channels:
+                    self._shift_channel_into(data[:, :, i], i, plane)
+                else:
+                    plane[:] = data[:, :, i]
+                # Necessary to avoid ValueError from Otsu threshold.
+                if plane.min() == plane.max():
+                    threshold = 0
+                else:
+                    threshold = self.threshold_function(plane)
+                mask = plane.view(bool)
+                np.greater(plane, threshold, out=mask)
+                del threshold
+                self._fused_backgrounds(mask, output.view(bool), first=i == 0)
+        finally:
+            self._buffers.trim()
+        output *= 255
+        return output
+
+    def _fused_grayscale(self, data, out):
+        """Write the luma of an RGB(A) array into out, matching PIL's
+        convert("L")."""
+        height, width = data.shape[:2]
+        for start in range(0, height, _STRIP_ROWS):
+            stop = min(start + _STRIP_ROWS, height)
+            shape = (stop - start, width)
+            luma = self._buffers.get("luma", shape, np.uint32)
+            scratch = self._buffers.get("scratch", shape, np.uint32)
+            luma.fill(0x8000)
+            # ITU-R 601-2 weights in 16-bit fixed point, as in PIL.
+            for i, weight in enumerate((19595, 38470, 7471)):
+                channel = data[start:stop, :, i]
+                if self.shift_channels:
+                    channel = self._shift_channel_into(
+                        channel, i, self._buffers.get("shifted", shape, np.uint8)
+                    )
+                np.multiply(channel, weight, out=scratch, dtype=np.uint32)
+                np.add(luma, scratch, out=luma)
+            np.right_shift(luma, 16, out=luma)
+            np.copyto(out[start:stop], luma, casting="unsafe")
+
+    def _fused_backgrounds(self, mask, output, first):
+        """Make the background of a (height, width) mask consistently True, where
+        the background is the value of most of the window around each pixel.
+
+        The result is written into output if first is True, and otherwise ANDed
+        into it.
+        """
+        height, width = mask.shape
+        radius = int((self.correction_block_size - 1) / 2)
+        # Sums wrap around, but differences are exact as long as twice the window
+        # area fits.
+        dtype = np.uint16 if 8 * radius * radius < 2**16 else np.uint32
+        buffers = self._buffers
+        # Windows are clipped to the image, as in _window_sums.
+        ys = np.arange(height)
+        top = np.maximum(ys - radius + 1, 0)
+        bottom = np.minimum(ys + radius, height - 1) + 1
+        xs = np.arange(width)
+        left = np.maximum(xs - radius + 1, 0)
+        right = np.minimum(xs + radius, width - 1) + 1
+        heights = (bottom - top).astype(dtype)
+        widths = (right - left).astype(dtype)
+        for start in range(0, height, _STRIP_ROWS):
+            stop = min(start + _STRIP_ROWS, height)
+            strip = (stop - start, width)
+            # Integral image of the rows covered by the windows of the strip.
+            first_row, last_row = top[start], bottom[stop - 1]
+            rows = buffers.get("rows", (last_row - first_row, width + 1), dtype)
+            rows[:, 0] = 0
+            # Cast first, since cumsum would allocate a converted copy of the mask.
+            np.copyto(rows[:, 1:], mask[first_row:last_row])
+            np.cumsum(rows[:, 1:], axis=1, out=rows[:, 1:])
+            integral = buffers.get(
+                "integral", (last_row - first_row + 1, width + 1), dtype
+            )
+            integral[0] = 0
+            np.cumsum(rows, axis=0, out=integral[1:])
+
+            columns = buffers.get("columns", (stop - start, width + 1), dtype)
+            columns_before = buffers.get(
+                "columns_before", (stop - start, width + 1), dtype
+            )
+            np.take(integral, bottom[start:stop] - first_row, axis=0, out=columns)
+            np.take(integral, top[start:stop] - first_row, axis=0, out=columns_before)
+            np.subtract(columns, columns_before, out=columns)
+            sums = buffers.get("sums", strip, dtype)
+            sums_before = buffers.get("sums_before", strip, dtype)
+            np.take(columns, right, axis=1, out=sums, mode="clip")
+            np.take(columns, left, axis=1, out=sums_before, mode="clip")
+            np.subtract(sums, sums_before, out=sums)
+            # White sums exceed black sums (area - white) when 2 * white > area.
+            np.left_shift(sums, 1, out=sums)
+            area = sums_before
+            np.multiply.outer(heights[start:stop], widths, out=area)
+            backgrounds = buffers.get("backgrounds", strip, bool)
+            np.greater(sums, area, out=backgrounds)
+            # Make the background consistently white (True).
+            if first:
+                np.equal(mask[start:stop], backgrounds, out=output[start:stop])
+            else:
+                np.equal(mask[start:stop], backgrounds, out=backgrounds)
+                output[start:stop] &= backgrounds
+
+    def _preprocess_channels(self, image):
         data = np.array(image)
         if self.shift_channels:
             channels = [self._shift_channel(data[:, :, i], i) for i in range(3)]
@@ -164,3 +502,242 @@ class TesseractBackend(_base.OcrBackend):
             elif channel_shift == 1:
                 data[:, 0] = data[:, 1]
         return data
+
+    @staticmethod
+    def _shift_channel_into(data, channel_index, out):
+        """Same as _shift_channel, but writes into out instead of allocating."""
+        channel_shift = channel_index - 1
+        if channel_shift == -1:
+            out[:, :-1] = data[:, 1:]
+            out[:, -1] = data[:, -1]
+        elif channel_shift == 1:
+            out[:, 1:] = data[:, :-1]
+            out[:, 0] = data[:, 0]
+        else:
+            out[:] = data
+        return out
+
+
+def _file_stamp(path):
+    """Return the size and modification time of the file, or None if it doesn't
+    exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _function_key(function):
+    """Return a description of a module-level function or partial of one that is
+    the same in every process, or None."""
+    if isinstance(function, functools.partial):
+        func = _function_key(function.func)
+        if func is None:
+            return None
+        return (func, function.args, sorted(function.keywords.items()))
+    name = getattr(function, "__qualname__", None)
+    if not name or "<" in name:
+        # Lambdas and nested functions aren't unique.
+        return None
+    return f"{function.__module__}.{name}"
+
+
+def _size(image):
+    """Return the (width, height) of a PIL image or array."""
+    if isinstance(image, Image.Image):
+        return image.size
+    return image.shape[1], image.shape[0]
+
+
+def _merge_bands(results, tops, band_height, height, overlap):
+    """Merge band results into one result in image coordinates.
+
+    Words that reach a cut edge of their band may be clipped, so they are dropped
+    in favor of the neighboring band, which sees them whole. Lines within the
+    overlaps are taken in order of their distance from cut edges, and words that
+    overlap an already kept word from another band (IoU of at least
+    _BAND_DUPLICATE_IOU) are dropped as duplicates.
+    """
+    candidates = []
+    for band, (result, top) in enumerate(zip(results, tops)):
+        bottom = top + band_height
+        for line in result.lines:
+            words = [
+                dataclasses.replace(word, top=word.top + top) for word in line.words
+            ]
+            margins = [_band_margin(word, top, bottom, height) for word in words]
+            words = [
+                word
+                for word, margin in zip(words, margins)
+                if margin > _BAND_EDGE_MARGIN
+            ]
+            if words:
+                candidates.append((min(margins), band, words))
+    candidates.sort(key=lambda candidate: -candidate[0])
+
+    lines = []
+    # Kept words that other bands may duplicate, with their band.
+    overlapping = []
+    for margin, band, words in candidates:
+        if margin < overlap:
+            words = [
+                word
+                for word in words
+                if not any(
+                    other_band != band and _iou(word, other) >= _BAND_DUPLICATE_IOU
+                    for other_band, other in overlapping
+                )
+            ]
+            overlapping.extend((band, word) for word in words)
+        if words:
+            lines.append(_base.OcrLine(words))
+    lines.sort(key=lambda line: (line.words[0].top, line.words[0].left))
+    return _base.OcrResult(lines)
+
+
+# Words closer than this many pixels to a cut edge of a band are dropped.
+_BAND_EDGE_MARGIN = 1
+# Words in different bands that overlap at least this much are duplicates.
+_BAND_DUPLICATE_IOU = 0.5
+
+
+def _band_margin(word, top, bottom, height):
+    """Return the distance from the word to the nearest edge where its band was
+    cut from the image, or infinity if the band wasn't cut."""
+    margin = math.inf
+    if top > 0:
+        margin = min(margin, word.top - top)
+    if bottom < height:
+        margin = min(margin, bottom - (word.top + word.height))
+    return margin
+
+
+def _iou(a, b):
+    """Return the intersection over union of two word boxes."""
+    width = min(a.left + a.width, b.left + b.width) - max(a.left, b.left)
+    height = min(a.top + a.height, b.top + b.height) - max(a.top, b.top)
+    if width <= 0 or height <= 0:
+        return 0
+    intersection = width * height
+    return intersection / (a.width * a.height + b.width * b.height - intersection)
+
+
+class _Buffers(threading.local):
+    """Scratch arrays for the fused preprocessing path, reused across calls.
+    Thread-local so that concurrent reads don't collide.
+
+    Arrays are views of buffers that only grow, so that alternating image sizes
+    doesn't reallocate them. If they total more than _MAX_BUFFER_BYTES after a
+    call, e.g. for a very wide image, they are freed.
+    """
+
+    def __init__(self):
+        self.arrays = {}
+
+    def get(self, name, shape, dtype):
+        size = math.prod(shape) * np.dtype(dtype).itemsize
+        buffer = self.arrays.get(name)
+        if buffer is None or buffer.size < size:
+            buffer = np.empty(size, np.uint8)
+            self.arrays[name] = buffer
+        return buffer[:size].view(dtype).reshape(shape)
+
+    def trim(self):
+        if sum(buffer.size for buffer in self.arrays.values()) > _MAX_BUFFER_BYTES:
+            self.arrays.clear()
+
+
+# Rows per strip in the fused preprocessing path.
+_STRIP_ROWS = 64
+# Maximum size of the scratch buffers kept by each thread between calls.
+_MAX_BUFFER_BYTES = 32 * 2**20
+
+
+def _local_otsu(data, block_size):
+    return filters.rank.otsu(data, morphology.square(block_size))
+
+
+# Minimum range of values within a tile for its Otsu threshold to be used.
+_MIN_TILE_CONTRAST = 24
+
+
+def _tiled_otsu(data, block_size):
+    """Approximates _local_otsu much faster: computes Otsu thresholds of
+    overlapping block_size tiles centered on a grid with half-block spacing, then
+    bilinearly interpolates them into a per-pixel threshold surface.
+    """
+    step = max(block_size // 2, 1)
+    height, width = data.shape
+    rows = -(-height // step)
+    columns = -(-width // step)
+    # Histograms of step x step cells, zero-padded by one cell on each side.
+    cells = np.zeros((rows + 2, columns + 2, 256), dtype=np.int32)
+    bins = (np.arange(width) // step * 256)[np.newaxis]
+    for row in range(rows):
+        band = data[row * step : (row + 1) * step]
+        cells[row + 1, 1:-1] = np.bincount(
+            (bins + band).ravel(), minlength=columns * 256
+        ).reshape(columns, 256)
+    # Each tile is 2 x 2 cells centered on a cell corner.
+    tiles = cells[:-1, :-1] + cells[1:, :-1] + cells[:-1, 1:] + cells[1:, 1:]
+    del cells
+    thresholds = np.empty(tiles.shape[:2], dtype=np.float32)
+    valid = np.empty(tiles.shape[:2], dtype=bool)
+    for row in range(0, len(tiles), 16):
+        chunk = tiles[row : row + 16]
+        thresholds[row : row + 16] = _otsu_thresholds(chunk)
+        # The threshold of a nearly uniform tile is meaningless, and
+        # interpolating toward it creates artifacts near edges.
+        nonzero = chunk > 0
+        lowest = np.argmax(nonzero, axis=-1)
+        highest = 255 - np.argmax(nonzero[..., ::-1], axis=-1)
+        valid[row : row + 16] = highest - lowest >= _MIN_TILE_CONTRAST
+    if valid.any():
+        _fill_thresholds(thresholds, valid)
+    else:
+        thresholds[:] = _otsu_thresholds(tiles.sum(axis=(0, 1)))
+
+    # Tile corners are at multiples of step, so interpolate separably.
+    ys = np.arange(height) / step
+    y0 = ys.astype(int)
+    wy = (ys - y0).astype(np.float32)[:, np.newaxis]
+    thresholds = thresholds[y0] * (1 - wy) + thresholds[y0 + 1] * wy
+    xs = np.arange(width) / step
+    x0 = xs.astype(int)
+    wx = (xs - x0).astype(np.float32)
+    return thresholds[:, x0] * (1 - wx) + thresholds[:, x0 + 1] * wx
+
+
+def _fill_thresholds(thresholds, valid):
+    """Replace invalid thresholds in-place, spreading the average of valid
+    4-neighbors outward until every threshold is valid."""
+    while not valid.all():
+        weighted = np.pad(np.where(valid, thresholds, 0), 1)
+        counts = np.pad(valid.astype(np.float32), 1)
+        sums = weighted[:-2, 1:-1] + weighted[2:, 1:-1]
+        sums += weighted[1:-1, :-2] + weighted[1:-1, 2:]
+        neighbors = counts[:-2, 1:-1] + counts[2:, 1:-1]
+        neighbors += counts[1:-1, :-2] + counts[1:-1, 2:]
+        filled = ~valid & (neighbors > 0)
+        thresholds[filled] = sums[filled] / neighbors[filled]
+        valid |= filled
+
+
+def _otsu_thresholds(histograms):
+    """Return the Otsu threshold of each 256-bin histogram along the last axis.
+
+    Values above the threshold are foreground, as with filters.threshold_otsu.
+    Uniform histograms have a threshold of 0.
+    """
+    weights = np.cumsum(histograms, axis=-1, dtype=np.float64)
+    moments = np.cumsum(histograms * np.arange(256), axis=-1, dtype=np.float64)
+    total_weight = weights[..., -1:]
+    total_moment = moments[..., -1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Between-class variance, up to a constant factor per histogram.
+        variances = (total_moment * weights - moments * total_weight) ** 2 / (
+            weights * (total_weight - weights)
+        )
+    variances[~np.isfinite(variances)] = -1
+    return np.argmax(variances, axis=-1)
@@ -1,5 +1,6 @@
 import asyncio
 import importlib.util
+import platform
 from concurrent import futures
 
 from . import _base
@@ -17,6 +18,12 @@ class WinRtBackend(_base.OcrBackend):
         # from import winrt.
         self._executor = futures.ThreadPoolExecutor(max_workers=1)
         self._executor.submit(self._init_winrt, language_tag).result()
+        self._os_version = _os_version()
+
+    def cache_key(self):
+        # The engine is updated with the OS, and the language may have been
+        # resolved from the user profile.
+        return repr(("winrt", self._os_version, self._recognizer_language))
 
     def _init_winrt(self, language_tag):
         import winrt
@@ -38,6 +45,7 @@ class WinRtBackend(_base.OcrBackend):
                 "Could not create OcrEngine. Try installing language packs: "
                 "https://github.com/wolfmanstout/screen-ocr/issues/8#issuecomment-1219610003"
             )
+        self._recognizer_language = engine.recognizer_language.language_tag
         # Define this in the constructor to avoid SyntaxError in Python 2.7.
         async def run_ocr_async(image):
             bytes = image.convert("RGBA").tobytes()
@@ -75,3 +83,25 @@ class WinRtBackend(_base.OcrBackend):
         return self._executor.submit(
             lambda: asyncio.run(self._run_ocr_async(image))
         ).result()
+
+    async def run_ocr_async(self, image, executor=None):
+        # The OCR engine already runs asynchronously on a private thread.
+        return await asyncio.wrap_future(
+            self._executor.submit(lambda: asyncio.run(self._run_ocr_async(image)))
+        )
+
+
+def _os_version():
+    """Return the Windows version including the update revision, e.g.
+    "10.0.22631.4317"."""
+    version = platform.version()
+    try:
+        import winreg
+
+        with winreg.OpenKey(
+            winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Microsoft\Windows NT\CurrentVersion"
+        ) as key:
+            revision, _ = winreg.QueryValueEx(key, "UBR")
+    except (ImportError, OSError):
+        return version
+    return f"{version}.{revision}"
@@ -0,0 +1,1001 @@
+"""Benchmarks for screen_ocr using synthetic screens.
+
+Example: python screen_ocr_benchmark.py tesseract_engine --tesseract-data-path /usr/share/tesseract-ocr/5/tessdata
+
+The suite benchmark measures every stage of a read with each installed backend
+and writes JSON for comparison between commits, e.g.:
+
+  python screen_ocr_benchmark.py suite --output before.json
+  python screen_ocr_benchmark.py suite --output after.json --compare before.json
+"""
+
+import argparse
+import csv
+import dataclasses
+import difflib
+import io
+import json
+import os
+import pickle
+import platform
+import random
+import shutil
+import statistics
+import string
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+import screen_ocr
+from screen_ocr import _base
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog file edit view selection go run "
+    "terminal help import return self def class print open close save window "
+    "settings search replace extensions debug source control explorer output "
+    "problems 0 1 2 42 100 ok cancel apply TestClass snake_case camelCase "
+    "ALLCAPS doesn't"
+).split()
+
+
+def render_screen(width, height, seed=0, font_size=14, dark=False):
+    """Return (image, text) of a deterministic screen filled with lines of text."""
+    rng = random.Random(seed)
+    background, foreground = ("#1e1e1e", "#d4d4d4") if dark else ("white", "black")
+    image = Image.new("RGB", (width, height), background)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=font_size)
+    line_height = int(font_size * 1.6)
+    lines = []
+    for top in range(line_height // 2, height - line_height, line_height):
+        left = rng.randrange(4, 40)
+        words = []
+        while True:
+            word = rng.choice(WORDS)
+            word_width = draw.textlength(word + " ", font=font)
+            if left + word_width > width - 4:
+                break
+            draw.text((left, top), word, fill=foreground, font=font)
+            words.append(word)
+            left += word_width
+        lines.append(" ".join(words))
+    return image, "\n".join(lines)
+
+
+def time_calls(function, repeat):
+    """Return per-call times in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def report(name, times, file=None):
+    print(
+        "{:<40} mean {:8.2f} ms  median {:8.2f} ms  min {:8.2f} ms".format(
+            name,
+            statistics.mean(times) * 1000,
+            statistics.median(times) * 1000,
+            min(times) * 1000,
+        ),
+        file=file,
+    )
+
+
+def benchmark_tesseract_engine(args):
+    """Compare per-call latency of the subprocess and in-process Tesseract
+    engines on a read_nearby-sized crop."""
+    image, _ = render_screen(400, 400, seed=1)
+    results = {}
+    for engine in ("subprocess", "library"):
+        reader = screen_ocr.Reader.create_reader(
+            "tesseract",
+            tesseract_engine=engine,
+            tesseract_data_path=args.tesseract_data_path,
+            tesseract_command=args.tesseract_command,
+        )
+        # Warm up, e.g. to load traineddata in the library engine.
+        results[engine] = reader.read_image(image).result
+        report(
+            f"tesseract {engine}",
+            time_calls(lambda: reader.read_image(image), args.repeat),
+        )
+    print("Identical results:", results["subprocess"] == results["library"])
+
+
+def synthetic_tsv(text, char_width=14, line_height=32):
+    """Return Tesseract TSV output for text laid out on a grid."""
+    rows = [
+        "level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop"
+        "\twidth\theight\tconf\ttext"
+    ]
+    for line_num, line in enumerate(text.splitlines(), 1):
+        top = line_num * line_height
+        rows.append(f"4\t1\t1\t1\t{line_num}\t0\t0\t{top}\t1920\t24\t-1\t")
+        left = 0
+        for word_num, word in enumerate(line.split(), 1):
+            width = len(word) * char_width
+            rows.append(
+                f"5\t1\t1\t1\t{line_num}\t{word_num}\t{left}\t{top}\t{width}"
+                f"\t24\t{90 + word_num % 10}.5\t{word}"
+            )
+            left += width + char_width
+    return "\n".join(rows) + "\n"
+
+
+def benchmark_tesseract_tsv(args):
+    """Compare parsing a dense full-screen TSV with the streaming parser and with
+    the previous pandas DataFrame + iterrows approach."""
+    from screen_ocr import _tesseract
+
+    _, text = render_screen(3840, 2160, seed=2)
+    tsv = synthetic_tsv(text)
+    print("Words:", sum(len(line.split()) for line in text.splitlines()))
+    report(
+        "streaming parser",
+        time_calls(lambda: _tesseract.TesseractBackend._parse_tsv(tsv), args.repeat),
+    )
+    try:
+        import pandas as pd
+    except ImportError:
+        return
+
+    def parse_with_pandas():
+        results = pd.read_csv(io.StringIO(tsv), sep="\t", quoting=csv.QUOTE_NONE)
+        for _, box in results.iterrows():
+            if box.level == 5:
+                _base.OcrWord(box.text, box.left, box.top, box.width, box.height)
+
+    report("pandas iterrows", time_calls(parse_with_pandas, args.repeat))
+
+
+def word_accuracy(expected, actual):
+    """Return the fraction of expected words matched in order by actual words."""
+    expected_words = expected.split()
+    matcher = difflib.SequenceMatcher(None, expected_words, actual.split())
+    matched = sum(block.size for block in matcher.get_matching_blocks())
+    return matched / max(len(expected_words), 1)
+
+
+def benchmark_tesseract_threshold(args):
+    """Compare local_otsu and tiled_otsu preprocessing latency on a full-screen
+    capture, and their accuracy on a synthetic corpus. Accuracy is measured by
+    agreement with local_otsu's binarized pixels and, if Tesseract is installed,
+    by OCR word accuracy against the rendered text."""
+    import numpy as np
+
+    from screen_ocr import _tesseract
+
+    threshold_functions = ("local_otsu", "tiled_otsu")
+    backends = {
+        threshold_function: _tesseract.TesseractBackend(
+            tesseract_data_path=args.tesseract_data_path,
+            tesseract_command=args.tesseract_command,
+            threshold_function=threshold_function,
+            threshold_block_size=41,
+            correction_block_size=31,
+            convert_grayscale=True,
+            shift_channels=True,
+        )
+        for threshold_function in threshold_functions
+    }
+    image, _ = render_screen(1920, 1080, seed=3)
+    for threshold_function, backend in backends.items():
+        report(
+            f"preprocess {threshold_function}",
+            time_calls(lambda: backend._preprocess(image), args.repeat),
+        )
+
+    run_ocr = bool(args.tesseract_command)
+    agreements = []
+    accuracies = {threshold_function: [] for threshold_function in backends}
+    for seed in range(4):
+        for dark in (False, True):
+            for font_size in (12, 16):
+                image, text = render_screen(640, 360, seed, font_size, dark)
+                # Tesseract reads are typically upscaled by Reader.
+                image = image.resize((1280, 720), Image.LANCZOS)
+                binarized = {
+                    threshold_function: backend._preprocess(image)
+                    for threshold_function, backend in backends.items()
+                }
+                agreements.append(
+                    np.mean(
+                        np.array(binarized["local_otsu"])
+                        == np.array(binarized["tiled_otsu"])
+                    )
+                )
+                if run_ocr:
+                    for threshold_function, backend in backends.items():
+                        result = backend._recognize(binarized[threshold_function])
+                        actual = "\n".join(
+                            " ".join(word.text for word in line.words)
+                            for line in result.lines
+                        )
+                        accuracies[threshold_function].append(
+                            word_accuracy(text, actual)
+                        )
+    print(
+        "Pixel agreement with local_otsu: mean {:.4f} min {:.4f}".format(
+            statistics.mean(agreements), min(agreements)
+        )
+    )
+    if run_ocr:
+        for threshold_function, values in accuracies.items():
+            print(
+                "Word accuracy {:<12} mean {:.4f} min {:.4f}".format(
+                    threshold_function, statistics.mean(values), min(values)
+                )
+            )
+
+
+def synthetic_result(text, char_width=14, line_height=32):
+    """Return an OcrResult for text laid out on a grid."""
+    lines = []
+    for line_num, line in enumerate(text.splitlines(), 1):
+        words = []
+        left = 0
+        for word in line.split():
+            width = len(word) * char_width
+            words.append(
+                _base.OcrWord(word, left, line_num * line_height, width, 24, 90.0)
+            )
+            left += width + char_width
+        lines.append(_base.OcrLine(words))
+    return _base.OcrResult(lines)
+
+
+def identifier(rng):
+    """Return a made-up lowercase identifier, e.g. a variable name."""
+    return rng.choice(WORDS).lower() + "".join(
+        rng.choice(string.ascii_lowercase) for _ in range(rng.randrange(1, 5))
+    )
+
+
+def matching_contents(width=3840, height=2160, search_radius=None):
+    """Return ScreenContents of a dense synthetic screen and query targets.
+
+    Half of the words are made-up identifiers, as in code, so that the screen
+    has thousands of distinct words.
+    """
+    rng = random.Random(5)
+    _, text = render_screen(width, height, seed=5)
+    text = "\n".join(
+        " ".join(
+            word if rng.random() < 0.5 else identifier(rng) for word in line.split()
+        )
+        for line in text.splitlines()
+    )
+    reader = screen_ocr.Reader(_base.OcrBackend())
+    contents = reader._screen_contents(
+        None,
+        synthetic_result(text),
+        (0, 0),
+        (width // 2, height // 2),
+        search_radius,
+    )
+    targets = ["ok", "go", "terminal", "quick brown", "settings search"]
+    return contents, targets
+
+
+def benchmark_matching(args):
+    """Compare find_matching_words with vectorized and per-window scoring, with
+    and without pruning candidates that can't reach the threshold, on a
+    full-screen result."""
+    contents, targets = matching_contents()
+    index = contents._candidate_index()
+    print("Words:", sum(len(line.words) for line in contents.result.lines))
+    print("Distinct subwords:", len(index.distinct_texts))
+    identical = True
+    for target in targets:
+        target_words = [
+            contents._normalize(subword)
+            for word in target.split()
+            for subword in contents._SUBWORD_REGEX.findall(word)
+        ]
+        results = []
+        for name, best_windows in [
+            (
+                "vectorized",
+                lambda index, words, prune: contents._best_windows_vectorized(
+                    index, [words], prune
+                )[0],
+            ),
+            ("per-window", contents._best_windows),
+        ]:
+            for prune in (True, False):
+                # Warm up, e.g. to build the candidate arrays.
+                results.append(best_windows(index, target_words, prune))
+                report(
+                    f"{name} {'pruned' if prune else 'unpruned'} {target!r}",
+                    time_calls(
+                        lambda: best_windows(index, target_words, prune), args.repeat
+                    ),
+                )
+        identical = identical and all(result == results[0] for result in results)
+    print("Identical results:", identical)
+
+
+def benchmark_matching_batch(args):
+    """Compare find_matching_words_batch with calling find_matching_words for
+    each target, for the words of a dictated phrase and a vocabulary list."""
+    contents, _ = matching_contents()
+    rng = random.Random(6)
+    targets = list(dict.fromkeys(rng.choice(WORDS) for _ in range(30)))
+    targets += [" ".join(rng.sample(WORDS, 2)) for _ in range(10)]
+    print("Targets:", len(targets))
+    # Warm up, e.g. to build the candidate index.
+    expected = {target: contents.find_matching_words(target) for target in targets}
+    report(
+        "find_matching_words",
+        time_calls(
+            lambda: [contents.find_matching_words(target) for target in targets],
+            args.repeat,
+        ),
+    )
+    report(
+        "find_matching_words_batch",
+        time_calls(lambda: contents.find_matching_words_batch(targets), args.repeat),
+    )
+    print("Identical results:", contents.find_matching_words_batch(targets) == expected)
+
+
+def benchmark_nearby(args):
+    """Time read_nearby-style queries on a full-screen result: matching within
+    the search radius, and finding the nearest words with the spatial index and
+    with a linear scan."""
+    contents, targets = matching_contents(search_radius=125)
+    # Warm up, e.g. to build the candidate index and grids.
+    contents.find_matching_words_batch(targets)
+    contents.nearest_word_locations()
+    for target in targets:
+        report(
+            f"find_matching_words {target!r}",
+            time_calls(lambda: contents.find_matching_words(target), args.repeat),
+        )
+    locations = contents._candidate_index().locations
+    x, y = contents.screen_coordinates
+
+    def linear_scan():
+        return sorted(
+            locations,
+            key=lambda location: contents._distance_squared(
+                (location.left + location.right) / 2.0,
+                (location.top + location.bottom) / 2.0,
+                x,
+                y,
+            ),
+        )[:5]
+
+    report(
+        "nearest_word_locations k=5",
+        time_calls(lambda: contents.nearest_word_locations(5), args.repeat),
+    )
+    report("linear scan k=5", time_calls(linear_scan, args.repeat))
+    print("Identical results:", contents.nearest_word_locations(5) == linear_scan())
+
+
+def benchmark_serialization(args):
+    """Compare the size and encode/decode time of a full-screen result with
+    encode_result, pickle and JSON."""
+    contents, _ = matching_contents()
+    result = contents.result
+    columnar = _base.ColumnarOcrResult.from_result(result)
+    print("Words:", sum(len(line.words) for line in result.lines))
+
+    def to_json(result):
+        return json.dumps(dataclasses.asdict(result)).encode("utf-8")
+
+    def from_json(data):
+        return _base.OcrResult(
+            [
+                _base.OcrLine([_base.OcrWord(**word) for word in line["words"]])
+                for line in json.loads(data)["lines"]
+            ]
+        )
+
+    for name, value, encode, decode in [
+        ("encode_result", result, screen_ocr.encode_result, screen_ocr.decode_result),
+        (
+            "encode_result columnar",
+            columnar,
+            screen_ocr.encode_result,
+            screen_ocr.decode_result,
+        ),
+        ("pickle", result, pickle.dumps, pickle.loads),
+        ("pickle columnar", columnar, pickle.dumps, pickle.loads),
+        ("json", result, to_json, from_json),
+    ]:
+        data = encode(value)
+        print(f"{name:<40} {len(data) / 1024:8.1f} KiB")
+        report(f"{name} encode", time_calls(lambda: encode(value), args.repeat))
+        report(f"{name} decode", time_calls(lambda: decode(data), args.repeat))
+        # Decoding may be lazy, so also time reading every word.
+        report(
+            f"{name} decode + words",
+            time_calls(
+                lambda: [
+                    word.text for line in decode(data).lines for word in line.words
+                ],
+                args.repeat,
+            ),
+        )
+        assert decode(data) == result
+
+
+def count_allocations(function, repeat):
+    """Return the mean number of Pillow image blocks allocated per call."""
+    before = Image.core.get_stats()["allocated_blocks"]
+    for _ in range(repeat):
+        function()
+    return (Image.core.get_stats()["allocated_blocks"] - before) / repeat
+
+
+def benchmark_preprocess(args):
+    """Compare Reader._preprocess with the previous resize + ImageOps.expand
+    approach at common capture sizes, using the Tesseract defaults of
+    create_reader."""
+    reader = screen_ocr.Reader(_base.OcrBackend(), margin=50, resize_factor=2)
+
+    def expand(image):
+        image = image.resize(
+            (image.width * reader.resize_factor, image.height * reader.resize_factor),
+            reader.resize_method,
+        )
+        image = ImageOps.expand(image, reader.margin, "white")
+        image.load()
+        return image
+
+    for width, height in [(400, 400), (1920, 1080), (3840, 2160)]:
+        image, _ = render_screen(width, height, seed=4)
+        repeat = max(1, args.repeat * 400 * 400 // (width * height))
+        for name, function in [
+            ("resize + expand", expand),
+            ("Reader._preprocess", reader._preprocess),
+        ]:
+            # Warm up, e.g. to allocate the canvas.
+            function(image)
+            allocations = count_allocations(lambda: function(image), repeat)
+            report(
+                f"{name} {width}x{height}",
+                time_calls(lambda: function(image), repeat),
+            )
+            print(f"{'':<40} {allocations:.1f} image blocks allocated per call")
+
+
+CODE_LINES = [
+    "def {name}(self, {arg}):",
+    "    if {arg} is None:",
+    "        return self.{name}_{suffix}",
+    "    for i in range(len({arg})):",
+    "        {name} = {arg}[i] + {number}",
+    "    result = {{'{name}': {number}, '{arg}': [{number}, {number}]}}",
+    "    self.{name}.append({arg}.{suffix}())",
+    "# TODO({arg}): handle {name} != {number}",
+    "import {name}_{suffix} as {arg}",
+    "class {Name}({Name}Base):",
+]
+
+UI_LABELS = [
+    "File",
+    "Edit",
+    "View",
+    "Selection",
+    "Go",
+    "Run",
+    "Terminal",
+    "Help",
+    "OK",
+    "Cancel",
+    "Apply",
+    "Save As...",
+    "Open Recent",
+    "Find in Files",
+    "Settings",
+    "Extensions",
+    "Source Control",
+    "Problems",
+    "Output",
+    "Debug Console",
+    "New Window",
+    "Close Editor",
+]
+
+# Fonts tried for the corpus in addition to Pillow's built-in fonts. Missing
+# fonts are skipped; the fonts used are recorded in the suite output.
+CORPUS_FONTS = [
+    "DejaVuSans.ttf",
+    "DejaVuSansMono.ttf",
+    "LiberationSans-Regular.ttf",
+    "arial.ttf",
+    "consola.ttf",
+    "segoeui.ttf",
+    "Menlo.ttc",
+]
+
+
+@dataclasses.dataclass
+class CorpusScreen:
+    name: str
+    image: Image.Image
+    # Rendered word boxes, in reading order.
+    result: _base.OcrResult
+
+    @property
+    def text(self):
+        return "\n".join(
+            " ".join(word.text for word in line.words) for line in self.result.lines
+        )
+
+
+def corpus_fonts():
+    """Return (name, function of size returning a font) for each available
+    font."""
+    fonts = [("pillow", lambda size: ImageFont.load_default(size=size))]
+    for name in CORPUS_FONTS:
+        try:
+            ImageFont.truetype(name, 12)
+        except OSError:
+            continue
+        fonts.append((name, lambda size, name=name: ImageFont.truetype(name, size)))
+    return fonts
+
+
+def code_lines(rng, count):
+    """Return lines of made-up Python code."""
+    lines = []
+    for _ in range(count):
+        name = identifier(rng)
+        lines.append(
+            rng.choice(CODE_LINES).format(
+                name=name,
+                Name=name.capitalize(),
+                arg=identifier(rng),
+                suffix=rng.choice(WORDS).lower(),
+                number=rng.randrange(1000),
+            )
+        )
+    return lines
+
+
+def render_corpus_screen(
+    name, kind, width, height, font, font_size, dark, subpixel, seed
+):
+    """Return a CorpusScreen of dense code or sparse UI labels.
+
+    With subpixel, text is rendered at three times the horizontal resolution and
+    each third of a pixel is mapped to a color channel, as with ClearType, which
+    gives glyphs colored fringes.
+    """
+    rng = random.Random(seed)
+    background, foreground = (
+        ((30, 30, 30), (212, 212, 212)) if dark else ((255,) * 3, (0,) * 3)
+    )
+    scale = 3 if subpixel else 1
+    # Coverage of text, at scale times the resolution in both directions.
+    mask = Image.new("L", (width * scale, height * scale), 0)
+    draw = ImageDraw.Draw(mask)
+    scaled_font = font(font_size * scale)
+    measure = ImageDraw.Draw(Image.new("L", (1, 1)))
+    base_font = font(font_size)
+    space = measure.textlength(" ", font=base_font)
+    line_height = int(font_size * 1.6)
+    lines = []
+    outlines = []
+    if kind == "code":
+        rows = [(4, text) for text in code_lines(rng, height // line_height)]
+    else:
+        rows = []
+        for _ in range(height // (line_height * 3)):
+            left = rng.randrange(4, 60)
+            labels = rng.sample(UI_LABELS, rng.randrange(1, 6))
+            rows.append((left, "  ".join(labels)))
+    top = line_height // 2
+    for left, text in rows:
+        if top + line_height > height:
+            break
+        words = []
+        for word in text.split(" "):
+            if not word:
+                left += space
+                continue
+            word_width = measure.textlength(word, font=base_font)
+            if left + word_width > width - 4:
+                break
+            draw.text((left * scale, top * scale), word, fill=255, font=scaled_font)
+            box = measure.textbbox((left, top), word, font=base_font)
+            words.append(
+                _base.OcrWord(word, box[0], box[1], box[2] - box[0], box[3] - box[1])
+            )
+            left += word_width + space
+        if words:
+            lines.append(_base.OcrLine(words))
+            if kind == "ui":
+                # Button or menu outline.
+                outlines.append(
+                    (words[0].left - 6, top - 4, left + 2, top + line_height)
+                )
+        top += line_height * (1 if kind == "code" else 3)
+    if subpixel:
+        # Average each row of subpixels, then take every third subpixel.
+        mask = mask.resize((width * scale, height), Image.Resampling.BOX)
+        channels = [
+            mask.transform(
+                (width, height),
+                Image.Transform.AFFINE,
+                (scale, 0, channel, 0, 1, 0),
+                Image.Resampling.BILINEAR,
+            )
+            for channel in range(3)
+        ]
+    else:
+        channels = [mask] * 3
+    image = Image.merge(
+        "RGB",
+        [
+            Image.composite(
+                Image.new("L", (width, height), fg),
+                Image.new("L", (width, height), bg),
+                channel,
+            )
+            for channel, fg, bg in zip(channels, foreground, background)
+        ],
+    )
+    outline_draw = ImageDraw.Draw(image)
+    for outline in outlines:
+        outline_draw.rectangle(outline, outline=foreground)
+    return CorpusScreen(name, image, _base.OcrResult(lines))
+
+
+def synthetic_corpus():
+    """Return a deterministic list of CorpusScreens covering fonts, sizes,
+    themes, subpixel rendering, and code and UI text, at read_nearby crop and full
+    screen sizes."""
+    screens = []
+    for font_index, (font_name, font) in enumerate(corpus_fonts()):
+        for kind, font_size, dark, subpixel in [
+            ("code", 13, True, False),
+            ("code", 16, False, True),
+            ("ui", 12, False, False),
+            ("ui", 18, True, True),
+        ]:
+            theme = "dark" if dark else "light"
+            rendering = "subpixel" if subpixel else "grayscale"
+            name = f"{kind} {font_name} {font_size}px {theme} {rendering}"
+            screens.append(
+                render_corpus_screen(
+                    f"{name} 400x400",
+                    kind,
+                    400,
+                    400,
+                    font,
+                    font_size,
+                    dark,
+                    subpixel,
+                    seed=font_index * 10 + len(screens),
+                )
+            )
+    _, font = corpus_fonts()[0]
+    screens.append(
+        render_corpus_screen(
+            "code pillow 14px dark subpixel 1920x1080",
+            "code",
+            1920,
+            1080,
+            font,
+            14,
+            True,
+            True,
+            seed=99,
+        )
+    )
+    return screens
+
+
+class SyntheticBackend(_base.OcrBackend):
+    """Returns the rendered word boxes of the screen being read, so that the
+    stages around OCR can be measured without an OCR engine."""
+
+    def __init__(self, margin, resize_factor):
+        self.margin = margin
+        self.resize_factor = resize_factor
+        self.result = _base.OcrResult([])
+
+    def set_screen(self, screen):
+        # In the coordinates of the preprocessed image.
+        self.result = _base.OcrResult(
+            [
+                _base.OcrLine(
+                    [
+                        _base.OcrWord(
+                            word.text,
+                            word.left * self.resize_factor + self.margin,
+                            word.top * self.resize_factor + self.margin,
+                            word.width * self.resize_factor,
+                            word.height * self.resize_factor,
+                        )
+                        for word in line.words
+                    ]
+                )
+                for line in screen.result.lines
+            ]
+        )
+
+    def run_ocr(self, image):
+        return self.result
+
+
+def suite_readers(args):
+    """Yield (name, Reader) for each installed backend, starting with the
+    synthetic backend."""
+    # Preprocessed as for Tesseract.
+    yield "synthetic", screen_ocr.Reader(
+        SyntheticBackend(margin=50, resize_factor=2), margin=50, resize_factor=2
+    )
+    try:
+        # If the Tesseract binary isn't installed, only preprocessing is measured.
+        yield "tesseract", screen_ocr.Reader.create_reader(
+            "tesseract",
+            tesseract_data_path=args.tesseract_data_path,
+            tesseract_command=args.tesseract_command,
+        )
+    except ValueError:
+        pass
+    try:
+        yield "tesseract library", screen_ocr.Reader.create_reader(
+            "tesseract",
+            tesseract_engine="library",
+            tesseract_data_path=args.tesseract_data_path,
+        )
+    except (ImportError, RuntimeError, ValueError):
+        pass
+    for backend in ("easyocr", "winrt"):
+        try:
+            yield backend, screen_ocr.Reader.create_reader(backend)
+        except (ImportError, RuntimeError, ValueError):
+            pass
+
+
+def stage_stats(times, peak_memory):
+    """Return summary statistics of per-call times in seconds."""
+    percentiles = statistics.quantiles(times, n=100, method="inclusive")
+    mean = statistics.mean(times)
+    return {
+        "calls": len(times),
+        "mean_ms": mean * 1000,
+        "p50_ms": percentiles[49] * 1000,
+        "p95_ms": percentiles[94] * 1000,
+        "p99_ms": percentiles[98] * 1000,
+        "min_ms": min(times) * 1000,
+        "max_ms": max(times) * 1000,
+        "throughput_per_s": 1 / mean if mean else None,
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+def peak_memory(function):
+    """Return the peak memory allocated through Python during a call, which
+    includes NumPy arrays but not Pillow images."""
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark_suite(args):
+    """Measure per-stage latency and peak memory of reading a synthetic corpus
+    with each installed backend, and write the results as JSON for comparison
+    between commits (see --output and --compare).
+
+    The synthetic backend returns the rendered word boxes, so the stages around
+    OCR are measured even without an OCR engine. Capture is skipped if the screen
+    can't be captured, e.g. without a display.
+    """
+    repeat = max(2, args.repeat)
+    corpus = synthetic_corpus()
+    rows = []
+    accuracy = {}
+
+    def measure(backend_name, stage, screen_name, function):
+        times = time_calls(function, repeat)
+        rows.append(
+            dict(
+                backend=backend_name,
+                stage=stage,
+                screen=screen_name,
+                **stage_stats(times, peak_memory(function)),
+            )
+        )
+        return times
+
+    for backend_name, reader in suite_readers(args):
+        stage_times = {}
+        try:
+            reader._screenshot((0, 0, 1, 1))
+            can_capture = True
+        except OSError as e:
+            print(f"{backend_name}: skipping capture: {e}", file=sys.stderr)
+            can_capture = False
+        for screen in corpus:
+            if isinstance(reader._backend, SyntheticBackend):
+                reader._backend.set_screen(screen)
+            width, height = screen.image.size
+            stages = []
+            if can_capture:
+                stages.append(
+                    ("capture", lambda: reader._screenshot((0, 0, width, height)))
+                )
+            stages.append(
+                ("Reader._preprocess", lambda: reader._preprocess(screen.image))
+            )
+            preprocessed = reader._preprocess(screen.image)
+            if reader._is_tesseract_backend():
+                stages.append(
+                    (
+                        "TesseractBackend._preprocess",
+                        lambda: reader._backend._preprocess(preprocessed),
+                    )
+                )
+            try:
+                # Also warms up, e.g. to load models.
+                result = reader._backend.run_ocr(preprocessed)
+            except OSError as e:
+                # E.g. the Tesseract binary isn't installed.
+                if screen is corpus[0]:
+                    print(f"{backend_name}: skipping run_ocr: {e}", file=sys.stderr)
+                result = None
+            if result is not None:
+                adjusted = reader._adjust_result(result, (0, 0))
+                targets = [
+                    word.text
+                    for word in random.Random(screen.name).sample(
+                        [word for line in screen.result.lines for word in line.words],
+                        3,
+                    )
+                ]
+
+                def find_matching_words():
+                    # Includes building the candidate index, as for the first
+                    # query after a read.
+                    contents = reader._screen_contents(
+                        screen.image, adjusted, (0, 0), None, None
+                    )
+                    for target in targets:
+                        contents.find_matching_words(target)
+
+                stages += [
+                    ("run_ocr", lambda: reader._backend.run_ocr(preprocessed)),
+                    ("_adjust_result", lambda: reader._adjust_result(result, (0, 0))),
+                    ("find_matching_words", find_matching_words),
+                ]
+                accuracy.setdefault(backend_name, {})[screen.name] = word_accuracy(
+                    screen.text,
+                    reader._screen_contents(
+                        None, adjusted, (0, 0), None, None
+                    ).as_string(),
+                )
+            for stage, function in stages:
+                # Warm up, e.g. to allocate buffers.
+                function()
+                stage_times.setdefault(stage, []).extend(
+                    measure(backend_name, stage, screen.name, function)
+                )
+        for stage, times in stage_times.items():
+            # Peak memory is reported per screen only.
+            rows.append(
+                dict(
+                    backend=backend_name,
+                    stage=stage,
+                    screen=None,
+                    **stage_stats(times, None),
+                )
+            )
+            report(f"{backend_name} {stage}", times, file=sys.stderr)
+        if backend_name in accuracy:
+            print(
+                "{:<40} word accuracy {:.3f}".format(
+                    backend_name, statistics.mean(accuracy[backend_name].values())
+                ),
+                file=sys.stderr,
+            )
+    output = {
+        "version": 1,
+        "metadata": {
+            "commit": git_commit(),
+            "python": sys.version,
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "fonts": [name for name, _ in corpus_fonts()],
+        },
+        "corpus": [
+            {
+                "name": screen.name,
+                "width": screen.image.width,
+                "height": screen.image.height,
+                "words": sum(len(line.words) for line in screen.result.lines),
+            }
+            for screen in corpus
+        ],
+        "results": rows,
+        "accuracy": accuracy,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=2)
+    else:
+        json.dump(output, sys.stdout, indent=2)
+    if args.compare:
+        compare_suite_results(args.compare, output)
+
+
+def compare_suite_results(baseline_path, output):
+    """Print the ratio of median stage latencies to those of a baseline suite
+    output, over all screens."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    baseline_rows = {
+        (row["backend"], row["stage"]): row
+        for row in baseline["results"]
+        if row["screen"] is None
+    }
+    print(f"Compared with {baseline['metadata']['commit']}:", file=sys.stderr)
+    for row in output["results"]:
+        baseline_row = baseline_rows.get((row["backend"], row["stage"]))
+        if row["screen"] is not None or not baseline_row:
+            continue
+        print(
+            "{:<40} p50 {:8.2f} ms -> {:8.2f} ms ({:+.1%})".format(
+                f"{row['backend']} {row['stage']}",
+                baseline_row["p50_ms"],
+                row["p50_ms"],
+                row["p50_ms"] / baseline_row["p50_ms"] - 1,
+            ),
+            file=sys.stderr,
+        )
+
+
+BENCHMARKS = {
+    "matching": benchmark_matching,
+    "matching_batch": benchmark_matching_batch,
+    "nearby": benchmark_nearby,
+    "preprocess": benchmark_preprocess,
+    "serialization": benchmark_serialization,
+    "suite": benchmark_suite,
+    "tesseract_engine": benchmark_tesseract_engine,
+    "tesseract_threshold": benchmark_tesseract_threshold,
+    "tesseract_tsv": benchmark_tesseract_tsv,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--tesseract-data-path")
+    parser.add_argument("--tesseract-command", default=shutil.which("tesseract"))
+    parser.add_argument("--output", help="Path to write suite results as JSON.")
+    parser.add_argument(
+        "--compare", help="Path of previous suite results to compare with."
+    )
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
@@ -19,7 +19,7 @@ setuptools.setup(
     ],
     # See README.md for backend recommendations.
     extras_require={
-        "tesseract": ["numpy", "pytesseract", "pandas", "scikit-image"],
+        "tesseract": ["numpy", "pytesseract", "scikit-image"],
         "winrt": ["winrt"],
         "easyocr": ["easyocr", "numpy"],
     },
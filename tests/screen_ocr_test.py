@@ -1,4 +1,18 @@
+import asyncio
+import importlib
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import types
+from dataclasses import dataclass
+
+import pytest
 import screen_ocr
+from PIL import Image, ImageDraw
 from screen_ocr import _base
 
 
@@ -132,3 +146,1580 @@ def test_generate_candidates_from_line():
             height=10,
         ),
     ]
+
+
+def _text_contents(text, screen_coordinates=None, search_radius=None):
+    """Return ScreenContents of text laid out on a grid."""
+    lines = []
+    for line_index, line in enumerate(text.splitlines()):
+        words = []
+        left = 0
+        for word in line.split():
+            words.append(
+                _base.OcrWord(
+                    text=word,
+                    left=left,
+                    top=line_index * 20,
+                    width=len(word) * 8,
+                    height=16,
+                )
+            )
+            left += (len(word) + 1) * 8
+        lines.append(_base.OcrLine(words))
+    return screen_ocr.ScreenContents(
+        screen_coordinates=screen_coordinates,
+        screen_offset=(0, 0),
+        screenshot=None,
+        result=_base.OcrResult(lines),
+        confidence_threshold=0.75,
+        homophones=screen_ocr.default_homophones(),
+        search_radius=search_radius,
+    )
+
+
+def _reference_matching_words(contents, target):
+    """Straightforward implementation of ScreenContents.find_matching_words."""
+    from rapidfuzz import fuzz
+
+    normalize = screen_ocr.ScreenContents._normalize
+    threshold = contents.confidence_threshold
+
+    def score_word(candidate, target_word):
+        homophones = contents.homophones.get(target_word, (target_word,))
+        return (
+            max(
+                fuzz.ratio(
+                    homophone, normalize(candidate.text), score_cutoff=threshold * 50
+                )
+                for homophone in homophones
+            )
+            / 100.0
+        )
+
+    target_words = [
+        normalize(subword)
+        for word in target.split()
+        for subword in screen_ocr.ScreenContents._SUBWORD_REGEX.findall(word)
+    ]
+    scored = []
+    for candidates in screen_ocr.ScreenContents._generate_candidates(
+        contents.result, len(target_words)
+    ):
+        if len(candidates) == 1:
+            score = score_word(candidates[0], "".join(target_words))
+        else:
+            score = sum(
+                score_word(candidate, word) * len(word)
+                for candidate, word in zip(candidates, target_words)
+            ) / sum(map(len, target_words))
+        if score >= threshold:
+            scored.append((score, candidates))
+    if not scored:
+        return []
+    max_score = max(score for score, _ in scored)
+    matches = [words for score, words in scored if score == max_score]
+    if not contents.search_radius or not contents.screen_coordinates:
+        return matches
+    x, y = contents.screen_coordinates
+    return [
+        words
+        for words in matches
+        if ((words[0].left + words[-1].right) / 2.0 - x) ** 2
+        + ((words[0].top + words[-1].bottom) / 2.0 - y) ** 2
+        <= contents.search_radius**2
+    ]
+
+
+MATCHING_TEXT = """\
+def find_matching_words(self, target: str) -> Sequence[WordLocation]:
+    Return the locations of all sequences of the provided words.
+File Edit Selection View Go Run Terminal Help
+their there they're 0K OK ok cancel Apply snake_case camelCase
+the quick brown fox jumps over the lazy dog
+"""
+
+MATCHING_TARGETS = [
+    "find",
+    "matching words",
+    "sequences of the",
+    "there",
+    "ok",
+    "snake case",
+    "camel case",
+    "fox jumps",
+    "brown box",
+    "words self target",
+    "lazy dogs",
+    "quickbrown",
+    "xyzzy",
+]
+
+
+@pytest.fixture(params=["vectorized", "python"])
+def scoring(request, monkeypatch):
+    """Runs the test with each implementation of candidate scoring."""
+    if request.param == "vectorized":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(
+            screen_ocr._screen_ocr, "_vectorized_scoring_available", lambda: False
+        )
+    return request.param
+
+
+def test_find_matching_words_uses_cached_index(scoring):
+    contents = _text_contents(MATCHING_TEXT)
+    for target in MATCHING_TARGETS:
+        assert contents.find_matching_words(target) == _reference_matching_words(
+            contents, target
+        )
+    index = contents._candidate_index()
+    contents.find_matching_words("the")
+    assert contents._candidate_index() is index
+    contents.result = _base.OcrResult([])
+    assert contents.find_matching_words("the") == []
+
+
+def test_find_matching_words_batch(scoring):
+    contents = _text_contents(
+        MATCHING_TEXT, screen_coordinates=(100, 40), search_radius=300
+    )
+    targets = MATCHING_TARGETS + ["their", "the", "find"]
+    matches = contents.find_matching_words_batch(targets)
+    assert list(matches) == list(dict.fromkeys(targets))
+    for target in targets:
+        assert matches[target] == _reference_matching_words(contents, target)
+    with pytest.raises(ValueError):
+        contents.find_matching_words_batch(["ok", ""])
+
+
+def test_find_matching_words_within_search_radius(scoring):
+    text = "helo world\n" + "\n" * 20 + "padding hello world"
+    contents = _text_contents(text, screen_coordinates=(10, 5), search_radius=100)
+    # The best match is out of range, so the nearby weaker match isn't returned.
+    assert contents.find_matching_words("hello") == []
+    matches = contents.find_matching_words("world")
+    assert [[word.text for word in words] for words in matches] == [["world"]]
+    assert matches == _reference_matching_words(contents, "world")
+    contents.screen_coordinates = (100, 430)
+    assert [
+        (words[0].text, words[0].top) for words in contents.find_matching_words("hello")
+    ] == [("hello", 420)]
+
+
+def test_grid_index():
+    np = pytest.importorskip("numpy")
+    from screen_ocr._screen_ocr import _GridIndex
+
+    rng = np.random.default_rng(0)
+    xs = rng.integers(0, 1000, 500).astype(np.float64)
+    ys = rng.integers(0, 600, 500).astype(np.float64)
+    grid = _GridIndex(xs, ys)
+    for x, y in [(0, 0), (500, 300), (-200, 50), (1500, 900), (999, 599)]:
+        distances = (xs - x) ** 2 + (ys - y) ** 2
+        for radius in (0, 10, 100, 2000):
+            expected = np.flatnonzero(distances <= radius * radius)
+            assert grid.within(x, y, radius).tolist() == expected.tolist()
+        for k in (1, 5, 500, 600):
+            expected = np.lexsort((np.arange(len(xs)), distances))[:k]
+            assert grid.nearest(x, y, k).tolist() == expected.tolist()
+    empty = _GridIndex(np.zeros(0), np.zeros(0))
+    assert len(empty.within(0, 0, 10)) == 0
+    assert len(empty.nearest(0, 0, 3)) == 0
+
+
+def test_nearest_word_locations(scoring):
+    contents = _text_contents(MATCHING_TEXT, screen_coordinates=(200, 45))
+    nearest = contents.nearest_word_locations(k=4)
+    assert [location.text for location in nearest] == ["Go", "all", "View", "OK"]
+    assert contents.nearest_word_locations(coordinates=(0, 0))[0].text == "def"
+    contents.screen_coordinates = None
+    assert contents.nearest_word_locations() == []
+
+
+def test_candidate_pruning_bounds():
+    pytest.importorskip("numpy")
+    import random
+
+    from rapidfuzz import fuzz
+
+    rng = random.Random(1)
+    words = [
+        "".join(rng.choice("abcdeo'") for _ in range(rng.randrange(1, 12)))
+        for _ in range(300)
+    ]
+    contents = _text_contents(" ".join(words))
+    index = contents._candidate_index()
+    arrays = index.arrays()
+    for query in words[:40] + ["ok", "there", "a"]:
+        for cutoff in (37.5, 75, 100):
+            possible = set(arrays.possible_matches(query, cutoff).tolist())
+            for text_id, text in enumerate(index.distinct_texts):
+                if fuzz.ratio(query, text) >= cutoff:
+                    assert text_id in possible, (query, text, cutoff)
+            assert len(possible) < len(index.distinct_texts)
+
+
+def test_candidate_pruning_skips_scoring(monkeypatch):
+    contents = _text_contents(MATCHING_TEXT)
+    calls = []
+    score_word = contents._score_word
+    monkeypatch.setattr(
+        contents, "_score_word", lambda *args: calls.append(args) or score_word(*args)
+    )
+    index = contents._candidate_index()
+    targets_words = [
+        [
+            contents._normalize(subword)
+            for word in target.split()
+            for subword in contents._SUBWORD_REGEX.findall(word)
+        ]
+        for target in MATCHING_TARGETS
+    ]
+    results = {}
+    call_counts = {}
+    for prune in (False, True):
+        calls.clear()
+        results[prune] = [
+            contents._best_windows(index, target_words, prune)
+            for target_words in targets_words
+        ]
+        call_counts[prune] = len(calls)
+    assert results[True] == results[False]
+    assert call_counts[True] < call_counts[False] / 2
+
+
+def test_vectorized_scoring_workers(monkeypatch):
+    pytest.importorskip("numpy")
+    from rapidfuzz import process
+    from screen_ocr import _screen_ocr
+
+    workers = []
+    cdist = process.cdist
+
+    def recording_cdist(*args, **kwargs):
+        workers.append(kwargs["workers"])
+        return cdist(*args, **kwargs)
+
+    monkeypatch.setattr(process, "cdist", recording_cdist)
+    contents = _text_contents(MATCHING_TEXT)
+    contents.find_matching_words("quick brown")
+    assert set(workers) == {1}
+    monkeypatch.setattr(_screen_ocr, "_PARALLEL_SCORING_PAIRS", 1)
+    contents.find_matching_words("lazy dog")
+    assert workers[-1] == -1
+
+
+def test_vectorized_scoring_matches_reference():
+    pytest.importorskip("numpy")
+    import random
+
+    rng = random.Random(0)
+    vocabulary = MATCHING_TEXT.split() + ["there's", "Their", "ok", "0k", "x"]
+    text = "\n".join(
+        " ".join(rng.choice(vocabulary) for _ in range(rng.randrange(0, 12)))
+        for _ in range(60)
+    )
+    contents = _text_contents(text, screen_coordinates=(200, 300), search_radius=400)
+    for target in MATCHING_TARGETS + [
+        " ".join(rng.choice(vocabulary) for _ in range(rng.randrange(1, 4)))
+        for _ in range(40)
+    ]:
+        assert contents.find_matching_words(target) == _reference_matching_words(
+            contents, target
+        ), target
+
+
+class FakeBackend(_base.OcrBackend):
+    def __init__(self):
+        self.calls = 0
+
+    def run_ocr(self, image):
+        self.calls += 1
+        return _base.OcrResult(
+            lines=[
+                _base.OcrLine(
+                    words=[
+                        _base.OcrWord(text="hello", left=0, top=0, width=10, height=10),
+                        _base.OcrWord(
+                            text="world", left=12, top=0, width=10, height=10
+                        ),
+                    ]
+                )
+            ]
+        )
+
+
+def test_result_cache():
+    backend = FakeBackend()
+    cache = screen_ocr.ResultCache(max_entries=1)
+    reader = screen_ocr.Reader.create_reader(backend, cache=cache)
+    image = Image.new("RGB", (40, 20), "white")
+    first = reader.read_image(image)
+    second = reader.read_image(image.copy(), offset=(100, 100))
+    assert backend.calls == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert second.as_string() == first.as_string()
+    assert second.result.lines[0].words[0].left == 100
+
+    # Different pixels miss and evict the previous entry.
+    reader.read_image(Image.new("RGB", (40, 20), "black"))
+    reader.read_image(image)
+    assert backend.calls == 3
+    assert cache.evictions == 2
+    assert len(cache) == 1
+
+
+class ColumnarBackend(FakeBackend):
+    def run_ocr(self, image):
+        return _base.ColumnarOcrResult.from_result(super().run_ocr(image))
+
+
+class PersistentBackend(FakeBackend):
+    def cache_key(self):
+        return "fake"
+
+
+class FractionalBackend(PersistentBackend):
+    def run_ocr(self, image):
+        self.calls += 1
+        return _base.OcrResult(
+            [_base.OcrLine([_base.OcrWord("hello", 10 / 3, 1.1, 7.7, 10, 90.5)])]
+        )
+
+
+def test_persistent_cache_hits_match_misses(tmp_path):
+    # Hits return exactly the coordinates a miss did, even with fractional
+    # coordinates and resize factors.
+    image = Image.new("RGB", (40, 20), "white")
+    cache = screen_ocr.PersistentCache(str(tmp_path / "cache.sqlite"))
+    reader = screen_ocr.Reader.create_reader(
+        FractionalBackend(), cache=cache, margin=5, resize_factor=3
+    )
+    miss = reader.read_image(image, offset=(7, 7)).result
+    hit = reader.read_image(image, offset=(7, 7)).result
+    assert cache.hits == 1
+    assert hit == miss
+
+
+def test_persistent_cache(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    images = [Image.new("RGB", (40, 20), color) for color in ("white", "black")]
+    backend = PersistentBackend()
+    cache = screen_ocr.PersistentCache(path, max_entries=1)
+    reader = screen_ocr.Reader.create_reader(backend, cache=cache)
+    expected = reader.read_image(images[0], offset=(100, 100)).result
+    assert (backend.calls, cache.hits, cache.misses) == (1, 0, 1)
+    assert len(cache) == 1
+
+    # A new instance, e.g. after a restart, reads the stored results.
+    backend = PersistentBackend()
+    cache.close()
+    cache = screen_ocr.PersistentCache(path, max_entries=1)
+    reader = screen_ocr.Reader.create_reader(backend, cache=cache)
+    assert reader.read_image(images[0], offset=(100, 100)).result == expected
+    assert (backend.calls, cache.hits, cache.misses) == (0, 1, 0)
+
+    # The least recently used entry is evicted.
+    reader.read_image(images[1])
+    reader.read_image(images[0])
+    assert backend.calls == 2
+    assert (len(cache), cache.evictions) == (1, 2)
+    assert cache.nbytes > 0
+
+    # Backends without a stable identity aren't cached.
+    backend = FakeBackend()
+    reader = screen_ocr.Reader.create_reader(backend, cache=cache)
+    reader.read_image(images[0])
+    reader.read_image(images[0])
+    assert backend.calls == 2
+
+
+def test_persistent_cache_touch_interval(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "cache.sqlite")
+    image = Image.new("RGB", (40, 20), "white")
+
+    def last_used():
+        with sqlite3.connect(path) as connection:
+            return connection.execute("SELECT last_used FROM results").fetchone()[0]
+
+    cache = screen_ocr.PersistentCache(path)
+    reader = screen_ocr.Reader.create_reader(PersistentBackend(), cache=cache)
+    reader.read_image(image)
+    stored = last_used()
+    reader.read_image(image)
+    assert cache.hits == 1
+    assert last_used() == stored
+    cache.touch_interval = 0
+    reader.read_image(image)
+    assert last_used() > stored
+
+
+def test_async_cache_runs_in_executor(tmp_path):
+    cache = screen_ocr.PersistentCache(str(tmp_path / "cache.sqlite"))
+    threads = []
+    for name in ("get", "put"):
+        method = getattr(cache, name)
+
+        def record(*args, method=method):
+            threads.append(threading.current_thread())
+            return method(*args)
+
+        setattr(cache, name, record)
+    reader = screen_ocr.Reader.create_reader(PersistentBackend(), cache=cache)
+    asyncio.run(reader.read_image_async(Image.new("RGB", (40, 20), "white")))
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Uses a shell script.")
+def test_tesseract_cache_key(tmp_path):
+    pytest.importorskip("pytesseract")
+    from screen_ocr import _tesseract
+
+    def fake_tesseract(version):
+        path = tmp_path / f"tesseract-{version}"
+        path.write_text(f"#!/bin/sh\necho tesseract {version}\n")
+        path.chmod(0o755)
+        return str(path)
+
+    def backend(version="5.3.0", **kwargs):
+        return _tesseract.TesseractBackend(
+            tesseract_data_path=str(tmp_path),
+            tesseract_command=fake_tesseract(version),
+            **dict({"threshold_function": "tiled_otsu"}, **kwargs),
+        )
+
+    key = backend().cache_key()
+    assert "0x" not in key
+    assert "tesseract 5.3.0" in key
+    assert key == backend().cache_key()
+    assert key != backend(threshold_function="otsu").cache_key()
+    assert backend(threshold_function=lambda x: 0).cache_key() is None
+    # Upgrades and new language data invalidate persisted results.
+    assert key.replace("5.3.0", "5.4.1") == backend("5.4.1").cache_key()
+    (tmp_path / "eng.traineddata").write_bytes(b"data")
+    assert backend().cache_key() != key
+    # Without the binary, results aren't persisted.
+    assert (
+        _tesseract.TesseractBackend(
+            tesseract_command=str(tmp_path / "missing")
+        ).cache_key()
+        is None
+    )
+
+
+def test_columnar_ocr_result():
+    pytest.importorskip("numpy")
+    import pickle
+
+    lines = [
+        _base.OcrLine([_base.OcrWord("second", 10, 50, 40, 12, 96.5)]),
+        _base.OcrLine(
+            [
+                _base.OcrWord("first", 10, 10, 40, 12, 95.1),
+                _base.OcrWord("line", 60, 10, 50, 12, 91.0),
+            ]
+        ),
+    ]
+    result = _base.ColumnarOcrResult.from_result(_base.OcrResult(lines))
+    assert result.text == "secondfirstline"
+    assert result.left.tolist() == [10, 10, 60]
+    assert result == _base.OcrResult(lines)
+    assert pickle.loads(pickle.dumps(result)) == result
+    assert result.sorted_lines() == _base.OcrResult(lines[::-1])
+    assert result.line_rows()[1] == [
+        ("first", 10, 10, 40, 12),
+        ("line", 60, 10, 50, 12),
+    ]
+
+    # Adjustment works on a copy, since results may be cached.
+    cache = screen_ocr.ResultCache()
+    reader = screen_ocr.Reader.create_reader(
+        ColumnarBackend(), cache=cache, margin=2, resize_factor=2
+    )
+    image = Image.new("RGB", (40, 20), "white")
+    contents = reader.read_image(image, offset=(100, 0))
+    contents = reader.read_image(image, offset=(100, 0))
+    assert cache.hits == 1
+    assert isinstance(contents.result, _base.ColumnarOcrResult)
+    assert [
+        (word.left, word.top, word.width) for word in contents.result.lines[0].words
+    ] == [(99, -1, 5), (105, -1, 5)]
+    assert contents.find_matching_words("world")[0][0].left == 105
+
+
+def test_encode_result(monkeypatch, tmp_path):
+    np = pytest.importorskip("numpy")
+    import mmap
+
+    result = _base.OcrResult(
+        [
+            _base.OcrLine(
+                [
+                    _base.OcrWord("naïve", 10, 10, 40, 12, 95.1),
+                    # Not representable as float32.
+                    _base.OcrWord("café", 10 / 3, 10, 50, 12, 91.0),
+                ]
+            ),
+            _base.OcrLine([_base.OcrWord("second", 10, 50, 40, 12, 96.5)]),
+        ]
+    )
+    encoded = screen_ocr.encode_result(result)
+    assert screen_ocr.decode_result(encoded) == result
+    # Float32 columns are stored as float32.
+    columnar = _base.ColumnarOcrResult.from_result(result)
+    decoded = screen_ocr.decode_result(screen_ocr.encode_result(columnar))
+    assert decoded == columnar
+    assert decoded.boxes.dtype == np.float32
+    assert len(screen_ocr.encode_result(columnar)) < len(encoded)
+    assert screen_ocr.decode_result(screen_ocr.encode_result(_base.OcrResult([]))) == (
+        _base.OcrResult([])
+    )
+
+    # Arrays are views of a mapped file.
+    path = tmp_path / "result"
+    path.write_bytes(encoded)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        decoded = screen_ocr.decode_result(m)
+        assert decoded == result
+        assert np.shares_memory(decoded.boxes, np.frombuffer(m, np.uint8))
+        del decoded
+
+    with pytest.raises(ValueError):
+        screen_ocr.decode_result(encoded[:-1])
+    with pytest.raises(ValueError):
+        screen_ocr.decode_result(b"x" + encoded[1:])
+
+    # Without NumPy, dataclasses are decoded instead.
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    decoded = screen_ocr.decode_result(encoded)
+    assert not isinstance(decoded, _base.ColumnarOcrResult)
+    assert decoded == result
+
+
+def test_encode_screen_contents(scoring):
+    contents = _text_contents(
+        MATCHING_TEXT, screen_coordinates=(300, 40), search_radius=200
+    )
+    decoded = screen_ocr.ScreenContents.from_bytes(contents.to_bytes())
+    assert decoded.result == contents.result
+    assert decoded.screen_offset == contents.screen_offset
+    assert decoded.screen_coordinates == (300, 40)
+    assert decoded.search_radius == 200
+    assert decoded.confidence_threshold == contents.confidence_threshold
+    for target in MATCHING_TARGETS:
+        assert decoded.find_matching_words(target) == contents.find_matching_words(
+            target
+        )
+
+
+def test_result_cache_hash_tolerance():
+    backend = FakeBackend()
+    cache = screen_ocr.ResultCache(hash_tolerance=2)
+    reader = screen_ocr.Reader.create_reader(backend, cache=cache)
+    image = Image.new("RGB", (200, 100), "white")
+    image.paste((0, 0, 0), (0, 0, 100, 100))
+    reader.read_image(image)
+    # A single changed pixel doesn't affect the average hash.
+    changed = image.copy()
+    changed.putpixel((150, 50), (0, 0, 0))
+    reader.read_image(changed)
+    assert backend.calls == 1
+    assert cache.hits == 1
+
+
+def test_preprocess_reuses_margin_canvas():
+    reader = screen_ocr.Reader(FakeBackend(), margin=5, resize_factor=2)
+    first = reader._preprocess(Image.new("RGB", (10, 10), "black"))
+    assert first.size == (30, 30)
+    assert first.getpixel((4, 4)) == (255, 255, 255)
+    assert first.getpixel((5, 5)) == (0, 0, 0)
+    second = reader._preprocess(Image.new("RGB", (10, 10), "red"))
+    assert second is first
+    assert second.getpixel((5, 5)) == (255, 0, 0)
+    assert second.getpixel((25, 25)) == (255, 255, 255)
+    assert (
+        reader._preprocess(Image.new("RGB", (10, 10)), reuse_canvas=False) is not first
+    )
+
+    np = pytest.importorskip("numpy")
+    backend = FakeBackend()
+    backend.accepts_arrays = True
+    reader = screen_ocr.Reader(backend, margin=5, resize_factor=2)
+    array = reader._preprocess(Image.new("RGB", (10, 10), "black"))
+    assert isinstance(array, np.ndarray)
+    assert array.shape == (30, 30, 3)
+    assert array[4, 4].tolist() == [255, 255, 255]
+    assert array[5, 5].tolist() == [0, 0, 0]
+
+
+def test_preprocess_palette_image():
+    image = Image.new("P", (20, 20))
+    image.putpalette([255, 255, 255, 200, 30, 30])
+    image.paste(1, (2, 2, 18, 18))
+    reader = screen_ocr.Reader(FakeBackend(), margin=5)
+    preprocessed = reader._preprocess(image)
+    assert preprocessed.size == (30, 30)
+    assert preprocessed.convert("RGB").getpixel((10, 7)) == (200, 30, 30)
+    assert preprocessed.convert("RGB").getpixel((2, 2)) == (255, 255, 255)
+
+
+class ArrayBackend(FakeBackend):
+    accepts_arrays = True
+
+    def run_ocr(self, image):
+        self.image = image
+        return super().run_ocr(image)
+
+
+def _allocated_copies(function, image):
+    """Return how many buffers the size of the image function allocates at once,
+    after a warm-up call."""
+    function(image)
+    tracemalloc.start()
+    try:
+        function(image)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak // image.nbytes
+
+
+def test_read_image_accepts_arrays():
+    np = pytest.importorskip("numpy")
+    array = np.zeros((100, 200, 3), dtype=np.uint8)
+    for image in [array, memoryview(array)]:
+        backend = ArrayBackend()
+        reader = screen_ocr.Reader(backend)
+        contents = reader.read_image(image)
+        assert contents.as_string() == "hello world\n"
+        # Passed straight through to the backend.
+        assert np.shares_memory(backend.image, array)
+    with pytest.raises(TypeError):
+        reader.read_image(array.astype(np.float32))
+    # PIL-only backends receive a PIL image.
+    backend = FakeBackend()
+    screen_ocr.Reader(backend, margin=5).read_image(array)
+    assert backend.calls == 1
+
+
+def test_array_pipeline_copies():
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("pytesseract")
+    from screen_ocr import _tesseract
+
+    array = np.full((300, 400, 3), 255, dtype=np.uint8)
+    array[100:120, 50:350] = 0
+    # Reader: passed through without a margin, or copied into a reused canvas.
+    reader = screen_ocr.Reader(ArrayBackend())
+    assert _allocated_copies(reader._preprocess, array) == 0
+    reader = screen_ocr.Reader(ArrayBackend(), margin=10)
+    canvas = reader._preprocess(array)
+    assert canvas.shape == (320, 420, 3) and not np.shares_memory(canvas, array)
+    assert reader._preprocess(array) is canvas
+    assert _allocated_copies(reader._preprocess, array) == 0
+    assert _allocated_copies(lambda image: reader._preprocess(image, False), array) == 1
+    # Tesseract binarization: only single-channel planes are allocated, one for
+    # the channel being binarized and one for the output.
+    backend = _tesseract.TesseractBackend(
+        threshold_function=lambda data: 128, correction_block_size=31
+    )
+    binarized = backend._preprocess(canvas)
+    assert binarized.shape == (320, 420) and binarized.dtype == np.uint8
+    assert _allocated_copies(backend._preprocess, canvas) == 0
+
+
+def test_tiled_reader_reuses_unchanged_tiles():
+    backend = FakeBackend()
+    reader = screen_ocr.Reader.create_reader(backend, tile_size=100, tile_overlap=10)
+    image = Image.new("RGB", (200, 100), "white")
+    first = reader.read_image(image, offset=(5, 5))
+    assert backend.calls == 2
+    # Each tile reads "hello world" at its top left, but the overlapping copy of
+    # "hello" in the second tile is owned by the first.
+    assert first.as_string() == "hello world\nworld\n"
+    assert first.result.lines[1].words[0].left == 90 + 12 + 5
+
+    assert reader.read_image(image, offset=(5, 5)).as_string() == first.as_string()
+    assert backend.calls == 2
+    changed = image.copy()
+    changed.putpixel((150, 50), (0, 0, 0))
+    reader.read_image(changed, offset=(5, 5))
+    assert backend.calls == 3
+
+
+def test_incremental_modes_accept_arrays():
+    np = pytest.importorskip("numpy")
+    backend = FakeBackend()
+    reader = screen_ocr.Reader.create_reader(backend, tile_size=100, tile_overlap=10)
+    array = np.full((100, 200, 3), 255, dtype=np.uint8)
+    first = reader.read_image(array)
+    assert backend.calls == 2
+    assert reader.read_image(array.copy()).as_string() == first.as_string()
+    assert backend.calls == 2
+
+    backend = RowBackend()
+    reader = screen_ocr.Reader.create_reader(backend, scroll_detection=True)
+    image = Image.new("L", (100, 300), 255)
+    _draw_text_lines(image, 0, 10, 10)
+    reader.read_image(np.asarray(image))
+    scrolled = Image.new("L", (100, 300), 255)
+    _draw_text_lines(scrolled, 1, 10, 10)
+    reader.read_image(np.asarray(scrolled))
+    # Only the exposed strip is read.
+    assert backend.image_sizes[-1][1] < 100
+
+
+def test_read_image_accepts_single_channel_arrays():
+    np = pytest.importorskip("numpy")
+    array = np.full((20, 40, 1), 255, dtype=np.uint8)
+    backend = ImageRecordingBackend()
+    reader = screen_ocr.Reader(backend, resize_factor=2, margin=5)
+    assert reader.read_image(array).as_string() == "hello world\n"
+    assert backend.images[0].size == (90, 50)
+    assert backend.images[0].mode == "L"
+
+
+class BatchBackend(FakeBackend):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def run_ocr_batch(self, images):
+        self.batches.append(len(images))
+        return super().run_ocr_batch(images)
+
+
+def test_tiled_reader_reads_changed_tiles_in_one_batch():
+    backend = BatchBackend()
+    reader = screen_ocr.Reader.create_reader(backend, tile_size=100, tile_overlap=10)
+    image = Image.new("RGB", (300, 100), "white")
+    assert reader.read_image(image).as_string() == "hello world\nworld\nworld\n"
+    changed = image.copy()
+    changed.putpixel((250, 50), (0, 0, 0))
+    reader.read_image(changed)
+    assert backend.batches == [3, 1]
+
+
+class RowBackend(_base.OcrBackend):
+    """Reads each run of rows containing dark pixels as a word named after the
+    width of its first row."""
+
+    def __init__(self):
+        self.image_sizes = []
+
+    def run_ocr(self, image):
+        self.image_sizes.append(image.size)
+        data = image.convert("L").tobytes()
+        lines = []
+        start = None
+        for y in range(image.height + 1):
+            row = data[y * image.width : (y + 1) * image.width]
+            dark = row.count(0)
+            if dark and start is None:
+                start, first_width = y, dark
+            elif not dark and start is not None:
+                word = _base.OcrWord(
+                    f"w{first_width}", 0, start, 50, y - start, confidence=90.0
+                )
+                lines.append(_base.OcrLine([word]))
+                start = None
+        return _base.OcrResult(lines)
+
+
+def _draw_text_lines(image, first_index, count, top):
+    for i in range(first_index, first_index + count):
+        y = top + (i - first_index) * 30
+        for k in range(8):
+            image.paste(0, (0, y + k, 10 + 8 * i + k, y + k + 1))
+
+
+def test_scroll_detection_reads_exposed_strip():
+    backend = RowBackend()
+    reader = screen_ocr.Reader.create_reader(backend, scroll_detection=True)
+    image = Image.new("L", (100, 300), 255)
+    _draw_text_lines(image, 0, 10, 10)
+    reader.read_image(image)
+
+    # Scroll down by one line.
+    scrolled = Image.new("L", (100, 300), 255)
+    _draw_text_lines(scrolled, 1, 10, 10)
+    contents = reader.read_image(scrolled, offset=(0, 100))
+    assert backend.image_sizes[-1][1] < 100
+    expected = screen_ocr.Reader.create_reader(RowBackend()).read_image(
+        scrolled, offset=(0, 100)
+    )
+    assert contents.result == expected.result
+    # Including the confidence of reused words.
+    assert all(
+        word.confidence == 90.0 for line in contents.result.lines for word in line.words
+    )
+
+
+def test_scroll_detection_reuses_unchanged_rows():
+    backend = RowBackend()
+    reader = screen_ocr.Reader.create_reader(backend, scroll_detection=True)
+    blank = Image.new("L", (100, 300), 255)
+    image = blank.copy()
+    _draw_text_lines(image, 0, 5, 10)
+    # Identical frames aren't read again, even without any unique rows.
+    for frame in [blank, image]:
+        first = reader.read_image(frame)
+        calls = len(backend.image_sizes)
+        assert reader.read_image(frame.copy()).result == first.result
+        assert len(backend.image_sizes) == calls
+
+    # Only the rows around an edit in place are read.
+    edited = image.copy()
+    _draw_text_lines(edited, 7, 1, 200)
+    contents = reader.read_image(edited)
+    assert backend.image_sizes[-1][1] < 100
+    expected = screen_ocr.Reader.create_reader(RowBackend()).read_image(edited)
+    assert contents.result == expected.result
+
+
+class ColumnBackend(_base.OcrBackend):
+    """Reads each run of columns with dark pixels in rows 20 to 40 as a word named
+    after its width, all on one line."""
+
+    def __init__(self):
+        self.image_sizes = []
+
+    def run_ocr(self, image):
+        from screen_ocr import _incremental
+
+        self.image_sizes.append(image.size)
+        data = image.crop((0, 20, image.width, 40)).transpose(Image.Transpose.TRANSPOSE)
+        columns = data.tobytes()
+        dark = [0 in columns[x * 20 : (x + 1) * 20] for x in range(image.width)]
+        words = [
+            _base.OcrWord(f"w{end - start}", start, 20, end - start, 20)
+            for start, end in _incremental._runs(dark)
+        ]
+        return _base.OcrResult([_base.OcrLine(words)] if words else [])
+
+
+def test_scroll_detection_merges_lines_after_horizontal_scroll():
+    # Rows 0 to 10 encode the x coordinate of each column, so that columns are
+    # unique, and words of different widths are in rows 20 to 40.
+    canvas = Image.new("L", (700, 60), 255)
+    for x in range(700):
+        for bit in range(10):
+            if x >> bit & 1:
+                canvas.putpixel((x, bit), 0)
+    for i, left in enumerate(range(10, 650, 60)):
+        canvas.paste(0, (left, 20, left + 20 + 3 * i, 40))
+    backend = ColumnBackend()
+    reader = screen_ocr.Reader.create_reader(backend, scroll_detection=True)
+    reader.read_image(canvas.crop((0, 0, 300, 60)))
+
+    # Scroll right.
+    scrolled = canvas.crop((40, 0, 340, 60))
+    contents = reader.read_image(scrolled)
+    assert reader._scroll_reader.scrolls_detected == 1
+    assert backend.image_sizes[-1][0] < 100
+    expected = screen_ocr.Reader.create_reader(ColumnBackend()).read_image(scrolled)
+    assert len(expected.result.lines) == 1
+    assert contents.result == expected.result
+
+
+class FakeScreenReader(screen_ocr.Reader):
+    """Reader that takes screenshots from a fixed image."""
+
+    def __init__(self, screen, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.screen = screen
+
+    def _screenshot(self, bounding_box):
+        bounding_box = (
+            max(0, bounding_box[0]),
+            max(0, bounding_box[1]),
+            min(self.screen.width, bounding_box[2]),
+            min(self.screen.height, bounding_box[3]),
+        )
+        return self.screen.crop(bounding_box), bounding_box
+
+
+def test_prefetching():
+    backend = FakeBackend()
+    screen = Image.new("RGB", (1000, 1000), "white")
+    reader = FakeScreenReader(screen, backend, radius=100)
+    reader.start_prefetching(lambda: (500, 500), interval=0.01, max_staleness=10)
+    try:
+        deadline = time.monotonic() + 10
+        while not backend.calls and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert backend.calls == 1
+        contents = reader.read_nearby((460, 450))
+        assert backend.calls == 1
+        # The prefetched region starts at (350, 350), so only "world" is in range.
+        assert contents.as_string() == "world\n"
+        assert contents.result.lines[0].words[0].left == 362
+        assert contents.screen_offset == (360, 350)
+    finally:
+        reader.stop_prefetching()
+
+    reader.read_nearby((460, 450))
+    assert backend.calls == 2
+
+
+def test_read_image_async():
+    backend = FakeBackend()
+    reader = screen_ocr.Reader.create_reader(
+        backend, cache=screen_ocr.ResultCache(), margin=10
+    )
+    images = [Image.new("RGB", (40, 20), color) for color in ("white", "black")]
+
+    async def read_all():
+        return await asyncio.gather(
+            *(reader.read_image_async(image, offset=(5, 5)) for image in images * 2)
+        )
+
+    results = asyncio.run(read_all())
+    assert [contents.result for contents in results] == [
+        reader.read_image(image, offset=(5, 5)).result for image in images * 2
+    ]
+    assert results[0].result.lines[0].words[0].left == -5
+    assert backend.calls <= 4
+
+
+def test_parse_tesseract_tsv():
+    pytest.importorskip("pytesseract")
+    from screen_ocr import _tesseract
+
+    tsv = "\n".join(
+        "\t".join(map(str, row))
+        for row in [
+            ["level", "page_num", "block_num", "par_num", "line_num", "word_num"]
+            + ["left", "top", "width", "height", "conf", "text"],
+            [1, 1, 0, 0, 0, 0, 0, 0, 500, 300, -1, ""],
+            [4, 1, 1, 1, 1, 0, 10, 50, 100, 12, -1, ""],
+            [5, 1, 1, 1, 1, 1, 10, 50, 40, 12, 96.5, "second"],
+            [4, 1, 1, 1, 2, 0, 10, 10, 100, 12, -1, ""],
+            [5, 1, 1, 1, 2, 1, 10, 10, 40, 12, 95.1, "first"],
+            [5, 1, 1, 1, 2, 2, 60, 10, 50, 12, 91.0, "line"],
+        ]
+    )
+    result = _tesseract.TesseractBackend._parse_tsv(tsv)
+    assert result == _base.OcrResult(
+        [
+            _base.OcrLine(
+                [
+                    _base.OcrWord("first", 10, 10, 40, 12, 95.1),
+                    _base.OcrWord("line", 60, 10, 50, 12, 91.0),
+                ]
+            ),
+            _base.OcrLine([_base.OcrWord("second", 10, 50, 40, 12, 96.5)]),
+        ]
+    )
+
+
+@pytest.mark.parametrize("convert_grayscale", [False, True])
+@pytest.mark.parametrize("shift_channels", [False, True])
+def test_tesseract_fused_preprocessing_matches_channels(
+    convert_grayscale, shift_channels, monkeypatch
+):
+    pytest.importorskip("pytesseract")
+    np = pytest.importorskip("numpy")
+    from screen_ocr import _tesseract
+
+    image = Image.new("RGB", (300, 120), "white")
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((150, 0, 300, 120), fill="#1e1e1e")
+    draw.text((10, 10), "dark on light", fill="black")
+    draw.text((160, 60), "light on dark", fill="#d4d4d4")
+    draw.text((10, 80), "colored", fill="#c04020")
+    backend = _tesseract.TesseractBackend(
+        threshold_function="otsu",
+        correction_block_size=31,
+        convert_grayscale=convert_grayscale,
+        shift_channels=shift_channels,
+    )
+    expected = np.array(backend._preprocess_channels(image))
+    # Second call runs with reused buffers, and the image spans several strips of
+    # rows.
+    monkeypatch.setattr(_tesseract, "_STRIP_ROWS", 16)
+    for _ in range(2):
+        fused = backend._preprocess(image)
+        assert fused.dtype == np.uint8
+        assert ((fused == 255) == expected).all()
+
+
+# skimage deprecates morphology.square, which _local_otsu uses.
+@pytest.mark.filterwarnings("ignore::FutureWarning")
+def test_tesseract_fused_preprocessing_memory():
+    pytest.importorskip("pytesseract")
+    np = pytest.importorskip("numpy")
+    from screen_ocr import _tesseract
+
+    # The defaults of Reader.create_reader.
+    backend = _tesseract.TesseractBackend(
+        threshold_function="local_otsu",
+        threshold_block_size=41,
+        correction_block_size=31,
+        convert_grayscale=True,
+        shift_channels=True,
+    )
+    image = Image.new("RGB", (800, 1200), "white")
+    draw = ImageDraw.Draw(image)
+    for y in range(0, 1200, 20):
+        draw.text((10, y), "The quick brown fox jumps over the lazy dog", fill="black")
+    image = np.asarray(image)
+
+    def traced(function, image):
+        tracemalloc.start()
+        try:
+            output = function(image)
+            _, peak = tracemalloc.get_traced_memory()
+            del output
+            retained, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return peak, retained
+
+    # Warm up, including with another size, as when alternating between nearby
+    # and full-screen reads.
+    backend._preprocess_channels(image)
+    backend._preprocess(image[:300, :500])
+    channels_peak, _ = traced(backend._preprocess_channels, image)
+    peak, retained = traced(backend._preprocess, image)
+    # The channel, its threshold and the output, plus strips of scratch space.
+    assert peak < 1.5 * image.nbytes
+    assert peak + retained < channels_peak / 4
+    # Buffers are freed above the size limit.
+    wide = np.zeros((200, 50000, 3), np.uint8)
+    _, retained = traced(backend._preprocess, wide)
+    assert retained < _tesseract._MAX_BUFFER_BYTES
+
+
+def test_tesseract_tiled_otsu_threshold():
+    pytest.importorskip("pytesseract")
+    np = pytest.importorskip("numpy")
+    from screen_ocr import _tesseract
+    from skimage import filters
+
+    rng = np.random.default_rng(0)
+    for _ in range(5):
+        data = rng.integers(0, 256, (50, 50)) // rng.integers(1, 80)
+        histogram = np.bincount(data.ravel(), minlength=256)
+        assert _tesseract._otsu_thresholds(histogram) == filters.threshold_otsu(data)
+
+    image = Image.new("L", (300, 120), 230)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((150, 0, 300, 120), fill=40)
+    text_boxes = []
+    for xy, text, fill in [
+        ((10, 10), "dark on light", 0),
+        ((160, 60), "light on dark", 210),
+    ]:
+        draw.text(xy, text, fill=fill)
+        text_boxes.append(draw.textbbox(xy, text))
+    tiled, local = (
+        np.array(
+            _tesseract.TesseractBackend(
+                threshold_function=threshold_function,
+                threshold_block_size=41,
+                correction_block_size=31,
+            )._preprocess(image)
+        )
+        for threshold_function in ["tiled_otsu", "local_otsu"]
+    )
+    # local_otsu leaves artifacts near the sharp edge, so only compare text.
+    for left, top, right, bottom in text_boxes:
+        same = tiled[top:bottom, left:right] == local[top:bottom, left:right]
+        assert same.mean() > 0.99
+
+
+def test_tesseract_banded_recognition():
+    pytest.importorskip("pytesseract")
+    np = pytest.importorskip("numpy")
+    from screen_ocr import _tesseract
+    from skimage import measure
+
+    class BoxBackend(_tesseract.TesseractBackend):
+        """Recognizes each dark box as a word named after its width."""
+
+        def _recognize(self, image):
+            labels = measure.label(np.array(image) < 128)
+            lines = {}
+            for region in measure.regionprops(labels):
+                top, left, bottom, right = region.bbox
+                lines.setdefault(top, []).append(
+                    _base.OcrWord(
+                        str(right - left), left, top, right - left, bottom - top
+                    )
+                )
+            return _base.OcrResult(
+                [
+                    _base.OcrLine(sorted(words, key=lambda word: word.left))
+                    for _, words in sorted(lines.items())
+                ]
+            )
+
+    image = Image.new("L", (400, 1000), 255)
+    draw = ImageDraw.Draw(image)
+    for top in range(5, 980, 37):
+        for left in range(10, 380, 60):
+            draw.rectangle((left, top, left + 20 + top % 23, top + 19), fill=0)
+    single = BoxBackend(threshold_function=None).run_ocr(image)
+    banded_backend = BoxBackend(
+        threshold_function=None, bands=4, band_overlap=60, min_band_height=200
+    )
+    assert banded_backend._band_count(image.height) == 4
+    assert banded_backend.run_ocr(image) == single
+    assert len(single.lines) == 27
+
+
+def test_tesseract_banded_recognition_keeps_library_engines():
+    pytest.importorskip("pytesseract")
+    pytest.importorskip("numpy")
+    from screen_ocr import _tesseract
+
+    class FakeLibraryEngine:
+        """Counts initializations of its per-thread API, as LibraryEngine."""
+
+        def __init__(self):
+            self._local = threading.local()
+            self.initializations = 0
+
+        def recognize(self, image):
+            if not hasattr(self._local, "api"):
+                self._local.api = object()
+                self.initializations += 1
+            return _base.ColumnarOcrResult.from_rows([])
+
+    backend = _tesseract.TesseractBackend(
+        threshold_function=None, bands=4, band_overlap=60, min_band_height=200
+    )
+    backend._library_engine = FakeLibraryEngine()
+    image = Image.new("L", (400, 1000), 255)
+    for _ in range(5):
+        backend.run_ocr(image)
+    # At most one per band thread, rather than one per band per call.
+    assert backend._library_engine.initializations <= 4
+
+
+@dataclass
+class FakeRect:
+    x: float
+    y: float
+    width: float
+    height: float
+
+    def __add__(self, other):
+        left = min(self.x, other.x)
+        top = min(self.y, other.y)
+        right = max(self.x + self.width, other.x + other.width)
+        bottom = max(self.y + self.height, other.y + other.height)
+        return FakeRect(left, top, right - left, bottom - top)
+
+
+class FakeTalonImage:
+    def __init__(self, image, x, y):
+        self._image = image
+        self.rect = FakeRect(x, y, image.width, image.height)
+
+    def __array__(self, dtype=None, copy=None):
+        np = pytest.importorskip("numpy")
+        return np.asarray(self._image)
+
+
+@pytest.fixture
+def talon_module(monkeypatch):
+    """Imports screen_ocr._talon with a stub of talon.experimental.ocr."""
+    pytest.importorskip("numpy")
+    ocr = types.ModuleType("talon.experimental.ocr")
+    experimental = types.ModuleType("talon.experimental")
+    experimental.ocr = ocr
+    talon = types.ModuleType("talon")
+    talon.experimental = experimental
+    for name, module in [
+        ("talon", talon),
+        ("talon.experimental", experimental),
+        ("talon.experimental.ocr", ocr),
+    ]:
+        monkeypatch.setitem(sys.modules, name, module)
+    try:
+        yield importlib.import_module("screen_ocr._talon")
+    finally:
+        sys.modules.pop("screen_ocr._talon", None)
+        del screen_ocr._talon
+
+
+# The reference implementation warns about the empty rect.
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+def test_talon_batched_box_tightening(talon_module):
+    np = pytest.importorskip("numpy")
+    image = Image.new("RGB", (400, 120), "white")
+    image.paste((30, 30, 30), (200, 0, 400, 120))
+    draw = ImageDraw.Draw(image)
+    x_offset, y_offset = 1000, 500
+    results = []
+    for left, top, text, fill in [
+        (10, 10, "hello   wide  world", "black"),
+        (210, 40, "light on dark", "white"),
+        (10, 60, "colored text", (200, 60, 20)),
+        # Runs off the image and over blank space.
+        (340, 90, "clipped words", "white"),
+    ]:
+        draw.text((left, top), text, fill=fill)
+        rects = []
+        for i, char in enumerate(text):
+            char_left = left + draw.textlength(text[:i])
+            rects.append(
+                FakeRect(
+                    x_offset + char_left,
+                    y_offset + top,
+                    draw.textlength(char),
+                    11,
+                )
+            )
+        results.append(
+            types.SimpleNamespace(text=text, bounds=types.SimpleNamespace(rects=rects))
+        )
+    # Rects over whitespace between text, cut off on either end.
+    draw.rectangle((20, 100, 29, 110), fill="black")
+    draw.rectangle((60, 100, 69, 110), fill="black")
+    results.append(
+        types.SimpleNamespace(
+            text="a b",
+            bounds=types.SimpleNamespace(
+                rects=[
+                    FakeRect(x_offset + 24, y_offset + 100, 40, 11),
+                    FakeRect(0, 0, 0, 0),
+                    FakeRect(x_offset + 27, y_offset + 100, 40, 11),
+                ]
+            ),
+        )
+    )
+    # Degenerate rects: empty, and entirely outside the image.
+    results.append(
+        types.SimpleNamespace(
+            text="x y",
+            bounds=types.SimpleNamespace(
+                rects=[
+                    FakeRect(x_offset + 5, y_offset + 5, 0, 0),
+                    FakeRect(0, 0, 3, 3),
+                    FakeRect(x_offset + 500, y_offset + 200, 5, 5),
+                ]
+            ),
+        )
+    )
+    talon_module.ocr.ocr = lambda _: results
+
+    result = talon_module.TalonBackend().run_ocr(
+        FakeTalonImage(image, x_offset, y_offset)
+    )
+    array = np.array(image)
+    grayscale = 0.299 * array[:, :, 0] + 0.587 * array[:, :, 1] + 0.114 * array[:, :, 2]
+    expected = []
+    for line, ocr_result in zip(result.lines, results):
+        assert [word.text for word in line.words] == ocr_result.text.split()
+        for word in line.words:
+            start = ocr_result.text.index(word.text)
+            rect = ocr_result.bounds.rects[start]
+            for char_rect in ocr_result.bounds.rects[
+                start + 1 : start + len(word.text)
+            ]:
+                rect = rect + char_rect
+            expected.append(
+                talon_module.TalonBackend._adjust_box(
+                    rect, grayscale, x_offset, y_offset
+                )
+            )
+    actual = [
+        (word.left, word.top, word.width, word.height)
+        for line in result.lines
+        for word in line.words
+    ]
+    assert actual == expected
+
+
+def test_talon_incremental_modes_match_async(talon_module):
+    images = []
+    talon_module.ocr.ocr = lambda image: images.append(image) or []
+    image = FakeTalonImage(Image.new("RGB", (300, 200), "white"), 0, 0)
+    for options in [{"tile_size": 100}, {"scroll_detection": True}]:
+        backend = talon_module.TalonBackend()
+        async_calls = []
+
+        def run_ocr_async(*args, run_ocr_async=backend.run_ocr_async):
+            async_calls.append(args)
+            return run_ocr_async(*args)
+
+        backend.run_ocr_async = run_ocr_async
+        reader = screen_ocr.Reader(backend, margin=0, **options)
+        images.clear()
+        reader.read_image(image)
+        asyncio.run(reader.read_image_async(image))
+        # Talon images are read whole by both APIs, as without incremental modes.
+        assert images == [image, image]
+        assert len(async_calls) == 1
+
+
+def test_talon_box_tightening_groups_by_height(talon_module, monkeypatch):
+    np = pytest.importorskip("numpy")
+    image = np.full((400, 400), 255_000, dtype=np.int32)
+    image[10:20, 10:30] = 0
+    image[0:400, 100:110] = 0
+    rects = [
+        FakeRect(5, 10, 30, 10),
+        FakeRect(95, 0, 20, 400),
+        FakeRect(200, 10, 30, 12),
+    ]
+    groups = []
+    adjust = talon_module.TalonBackend._adjust_similar_boxes
+
+    def record(rects, *args):
+        groups.append([rect.height for rect in rects])
+        return adjust(rects, *args)
+
+    monkeypatch.setattr(
+        talon_module.TalonBackend, "_adjust_similar_boxes", staticmethod(record)
+    )
+    boxes = talon_module.TalonBackend._adjust_boxes(rects, image, 0, 0)
+    # The tall rect isn't batched with the short ones.
+    assert groups == [[10, 12], [400]]
+    assert boxes == [
+        talon_module.TalonBackend._adjust_box(rect, image, 0, 0) for rect in rects
+    ]
+
+
+def test_read_images_in_process_pool():
+    from screen_ocr import _batch
+
+    images = [Image.new("RGB", (20 + i, 20), "white") for i in range(6)]
+    reader_args = {"backend": FakeBackend(), "margin": 5}
+    results = list(_batch.read_images(images, reader_args, max_workers=2))
+    assert [image for image, _ in results] == images
+    assert all(result == FakeBackend().run_ocr(None) for _, result in results)
+
+    unordered = _batch.read_images(images, reader_args, max_workers=2, ordered=False)
+    assert sorted(image.width for image, _ in unordered) == [
+        image.width for image in images
+    ]
+
+    np = pytest.importorskip("numpy")
+    arrays = [np.zeros((20, 20 + i, 3), dtype=np.uint8) for i in range(3)]
+    reader_args = {"backend": ArrayBackend(), "margin": 5}
+    results = list(_batch.read_images(arrays, reader_args, max_workers=2))
+    assert [image for image, _ in results] == arrays
+    assert all(result == FakeBackend().run_ocr(None) for _, result in results)
+
+
+def test_read_images_in_sequence():
+    backend = FakeBackend()
+    reader = screen_ocr.Reader.create_reader(backend)
+    images = [Image.new("RGB", (40, 20), "white") for _ in range(3)]
+    contents = list(reader.read_images(images))
+    assert [c.screenshot for c in contents] == images
+    assert backend.calls == 3
+
+
+def test_read_images_in_batches():
+    backend = BatchBackend()
+    cache = screen_ocr.ResultCache()
+    reader = screen_ocr.Reader.create_reader(backend, cache=cache)
+    images = [Image.new("RGB", (40, 20), "white") for _ in range(4)]
+    images.append(Image.new("RGB", (40, 20), "black"))
+    contents = list(reader.read_images(iter(images), batch_size=2))
+    assert [c.screenshot for c in contents] == images
+    assert all(c.as_string() == "hello world\n" for c in contents)
+    # The second batch is all cache hits and isn't passed to the backend.
+    assert backend.batches == [2, 1]
+
+
+class ImageRecordingBackend(FakeBackend):
+    def __init__(self):
+        super().__init__()
+        self.images = []
+
+    def run_ocr(self, image):
+        self.images.append(image)
+        return super().run_ocr(image)
+
+
+def test_read_images_without_batch_support():
+    # Images are preprocessed one at a time into the reused canvas.
+    backend = ImageRecordingBackend()
+    reader = screen_ocr.Reader.create_reader(backend, margin=5)
+    images = [Image.new("RGB", (40, 20), color) for color in ("white", "black")]
+    contents = list(reader.read_images(images, batch_size=2))
+    assert len(contents) == 2
+    assert backend.images[0] is backend.images[1]
+
+    backend = ImageRecordingBackend()
+    reader = screen_ocr.Reader.create_reader(
+        backend, margin=5, tile_size=100, tile_overlap=10
+    )
+    reader.read_image(Image.new("RGB", (300, 100), "white"))
+    assert len(backend.images) == 3
+
+
+def test_easyocr_batched_recognition(monkeypatch):
+    np = pytest.importorskip("numpy")
+    calls = []
+
+    class FakeEasyOcrReader:
+        def __init__(self, languages):
+            pass
+
+        def readtext(self, image, **kwargs):
+            calls.append(("readtext", image.shape, kwargs))
+            return [([[1, 2], [11, 2], [11, 7], [1, 7]], "hello", 0.9)]
+
+        def readtext_batched(self, images, **kwargs):
+            calls.append(("readtext_batched", len(images), kwargs))
+            return [
+                [
+                    (
+                        [
+                            [0, 0],
+                            [image.shape[1], 0],
+                            [image.shape[1], image.shape[0]],
+                            [0, 0],
+                        ],
+                        "hi",
+                        1,
+                    )
+                ]
+                for image in images
+            ]
+
+    threads = []
+    monkeypatch.setitem(
+        sys.modules, "easyocr", types.SimpleNamespace(Reader=FakeEasyOcrReader)
+    )
+    monkeypatch.setitem(
+        sys.modules, "torch", types.SimpleNamespace(set_num_threads=threads.append)
+    )
+    try:
+        _easyocr = importlib.import_module("screen_ocr._easyocr")
+        backend = _easyocr.EasyOcrBackend(threads=2, batch_size=4, canvas_size=1280)
+        assert threads == [2]
+        options = {"batch_size": 4, "canvas_size": 1280}
+
+        word = backend.run_ocr(Image.new("RGB", (40, 20))).lines[0].words[0]
+        assert (word.text, word.left, word.top, word.width, word.height) == (
+            "hello",
+            1,
+            2,
+            10,
+            5,
+        )
+        assert calls == [("readtext", (20, 40, 3), options)]
+
+        calls.clear()
+        images = [
+            np.zeros((20, 40, 3), np.uint8),
+            np.zeros((30, 40, 3), np.uint8),
+            np.zeros((20, 40, 3), np.uint8),
+        ]
+        results = backend.run_ocr_batch(images)
+        assert [result.lines[0].words[0].height for result in results] == [20, 30, 20]
+        assert calls == [
+            ("readtext_batched", 2, options),
+            ("readtext_batched", 1, options),
+        ]
+    finally:
+        sys.modules.pop("screen_ocr._easyocr", None)
+        if hasattr(screen_ocr, "_easyocr"):
+            del screen_ocr._easyocr
+
+
+def test_tesseract_library_engine_matches_subprocess():
+    pytest.importorskip("pytesseract")
+    from screen_ocr import _libtesseract
+
+    tesseract_command = shutil.which("tesseract")
+    tesseract_data_path = os.environ.get("TESSDATA_PREFIX")
+    if not tesseract_command or not tesseract_data_path:
+        pytest.skip("Requires tesseract on the PATH and TESSDATA_PREFIX")
+    try:
+        _libtesseract.load_library()
+    except (ImportError, OSError):
+        pytest.skip("Requires libtesseract")
+    # Columns, which are only grouped into separate blocks with the same page
+    # segmentation mode.
+    image = Image.new("RGB", (800, 200), "white")
+    draw = ImageDraw.Draw(image)
+    draw.multiline_text(
+        (10, 10),
+        "The quick brown fox\njumps over the lazy dog\nwhile the cat sleeps",
+        fill="black",
+    )
+    draw.multiline_text(
+        (420, 40), "Pack my box with\nfive dozen liquor jugs", fill="black"
+    )
+    results = [
+        [
+            [
+                (word.text, word.left, word.top, word.width, word.height)
+                for word in line.words
+            ]
+            for line in screen_ocr.Reader.create_reader(
+                "tesseract",
+                tesseract_engine=engine,
+                tesseract_command=tesseract_command,
+                tesseract_data_path=tesseract_data_path,
+            )
+            .read_image(image)
+            .result.lines
+        ]
+        # Confidences are formatted differently in the TSV output.
+        for engine in ("subprocess", "library")
+    ]
+    assert results[0] == results[1]
+
+
+def test_tesseract_library_engine_page_segmentation_mode():
+    pytest.importorskip("numpy")
+    from screen_ocr import _libtesseract
+
+    calls = []
+
+    def record(name, result=None):
+        return lambda *args: calls.append((name, *args)) or result
+
+    lib = types.SimpleNamespace(
+        TessBaseAPICreate=record("TessBaseAPICreate", "handle"),
+        TessBaseAPIInit3=record("TessBaseAPIInit3", 0),
+        TessBaseAPISetPageSegMode=record("TessBaseAPISetPageSegMode"),
+        TessBaseAPIEnd=record("TessBaseAPIEnd"),
+        TessBaseAPIDelete=record("TessBaseAPIDelete"),
+    )
+    _libtesseract._Api(lib, "tessdata", "eng")
+    # PSM_AUTO, as the tesseract binary uses.
+    assert ("TessBaseAPISetPageSegMode", "handle", 3) in calls
+
+
+def test_import_does_not_load_backends():
+    # Guards against regressions in startup time: importing heavy backend
+    # dependencies should be deferred until a reader is created.
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import screen_ocr"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    imported = {
+        line.split("|")[-1].strip()
+        for line in output.splitlines()
+        if line.startswith("import time:")
+    }
+    assert "screen_ocr" in imported
+    heavy_modules = {
+        "asyncio",
+        "easyocr",
+        "numpy",
+        "pandas",
+        "pytesseract",
+        "screen_ocr._easyocr",
+        "screen_ocr._tesseract",
+        "skimage",
+        "torch",
+    }
+    assert not heavy_modules & imported